@@ -0,0 +1,6 @@
+"""pytest setup: the parser modules import each other as top-level modules."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "transaction_parser"))
@@ -0,0 +1,88 @@
+"""
+Tests for the transaction JSON state machine (constrained_decoding.py).
+
+Usage:
+    python -m pytest backend/tests/test_constrained_decoding.py
+"""
+
+import json
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from constrained_decoding import TransactionJsonConstraint, feed, is_finished
+
+START = (0, "")
+VALID = ('{"amount": 120000.5, "transaction_type": "expense", "category": "Rent", '
+         '"merchant_name": "Sharma Estates", "payment_method": "Bank Transfer", '
+         '"transaction_date": "2024-03-02", "transaction_time": "14:30"}')
+
+
+def test_accepts_schema_valid_output():
+    state = feed(START, VALID)
+    assert state is not None
+    assert is_finished(state)
+    assert json.loads(VALID)["amount"] == 120000.5
+
+
+def test_accepts_null_amount_and_empty_payment():
+    output = VALID.replace("120000.5", "null").replace('"Bank Transfer"', '""')
+    assert is_finished(feed(START, output))
+
+
+def test_token_by_token_matches_whole_text():
+    state = START
+    for i in range(0, len(VALID), 3):
+        state = feed(state, VALID[i:i + 3])
+        assert state is not None
+    assert state == feed(START, VALID)
+
+
+@pytest.mark.parametrize("amount", ["1,20,000", "120,000"])
+def test_rejects_digit_grouping_in_number(amount):
+    assert feed(START, '{"amount": ' + amount) is None
+
+
+@pytest.mark.parametrize("output", [
+    '{"amount": 12.345',                                     # three decimals
+    '{"amount": -5',                                         # negative
+    '{"amount": 5, "transaction_type": "refund"',            # not in the enum
+    '{"amount": 5, "transaction_type": "expense", "category": "Snacks"',
+    '{"total": 5',                                           # wrong key
+])
+def test_rejects_invalid_output(output):
+    assert feed(START, output) is None
+
+
+def test_finishes_only_when_object_closes():
+    before_brace = feed(START, VALID[:-1])
+    assert before_brace is not None
+    assert not is_finished(before_brace)
+
+    closed = feed(before_brace, "}")
+    assert is_finished(closed)
+    # Nothing may follow the closing brace
+    assert feed(closed, " ") is None
+    assert not is_finished(None)
+
+
+def test_logits_processor_masks_invalid_tokens_and_forces_eos():
+    token_strings = ['{"amount": ', "1", ",", "5", None, "}"]
+    eos = 4
+    constraint = TransactionJsonConstraint(token_strings, prompt_length=1, eos_token_id=eos)
+    scores = torch.zeros((1, len(token_strings)))
+
+    masked = constraint(torch.tensor([[99]]), scores)
+    assert torch.isfinite(masked[0]).tolist() == [True, False, False, False, False, False]
+
+    masked = constraint(torch.tensor([[99, 0]]), scores)
+    assert torch.isfinite(masked[0]).tolist() == [False, True, False, True, False, False]
+
+    # Once the object is complete only EOS is allowed, and generation stops
+    finished = TransactionJsonConstraint(token_strings, prompt_length=1, eos_token_id=eos)
+    finished.state = feed(START, VALID)
+    masked = finished(torch.tensor([[99]]), scores)
+    assert torch.isfinite(masked[0]).tolist() == [False, False, False, False, True, False]
+    assert finished.stopping_criteria()(torch.tensor([[99]]), scores).tolist() == [True]
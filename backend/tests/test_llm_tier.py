@@ -0,0 +1,65 @@
+"""
+Tier 2 of TransactionParser._parse_text_to_transaction: when the rules are
+not confident, the extractor backend must run and its fields must win over
+the unsure rule-based ones (not the rules-only fallback).
+
+Usage:
+    python -m pytest backend/tests/test_llm_tier.py
+"""
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+import transaction_parser
+from extractors import ExtractorBackend
+from result_cache import NO_CACHE
+from rule_extractor import extract_transaction, needs_llm
+
+TEXT = "Bought tea for 20"
+LLM_FIELDS = {"amount": 20, "transaction_type": "expense", "category": "Food", "merchant_name": "Chai Point"}
+
+
+class StubExtractor(ExtractorBackend):
+    name = "stub"
+
+    def __init__(self):
+        self.calls = []
+
+    def extract(self, text):
+        self.calls.append(text)
+        return dict(LLM_FIELDS)
+
+
+@pytest.fixture
+def parser(monkeypatch):
+    monkeypatch.setattr(transaction_parser, "PARSER_CACHE", False)
+    monkeypatch.setattr(transaction_parser, "MERCHANT_INDEX", False)
+    return transaction_parser.TransactionParser(extractor="causal-lm")
+
+
+def test_text_needs_the_llm():
+    assert needs_llm(extract_transaction(TEXT))
+
+
+def test_stub_extractor_result_is_used(parser):
+    parser.extractor = StubExtractor()
+
+    result = parser._parse_text_to_transaction(TEXT)
+
+    assert parser.extractor.calls == [TEXT]
+    assert result["category"] == "Food"
+    assert result["merchant_name"] == "Chai Point"
+    assert NO_CACHE not in result
+
+
+def test_causal_lm_backend_calls_the_generator(parser, monkeypatch):
+    calls = []
+    monkeypatch.setattr(parser, "_generate_fields", lambda text: calls.append(text) or dict(LLM_FIELDS))
+
+    result = parser._parse_text_to_transaction(TEXT)
+
+    assert calls == [TEXT]
+    assert result["category"] == "Food"
+    assert NO_CACHE not in result
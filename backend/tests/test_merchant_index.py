@@ -0,0 +1,80 @@
+"""
+Tests for the per-user merchant index (merchant_index.py), with two
+MerchantIndex instances (two SQLite connections) on one database file as
+forked parser workers use it.
+
+Usage:
+    python -m pytest backend/tests/test_merchant_index.py
+"""
+
+import pytest
+
+from merchant_index import MerchantIndex
+
+DMART = {"merchant_name": "DMart", "category": "Groceries", "amount": 845.0,
+         "payment_method": "UPI", "verified": True}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "merchant_index.sqlite")
+
+
+def test_other_connection_sees_the_merge(db_path):
+    writer = MerchantIndex(db_path)
+    reader = MerchantIndex(db_path)
+    assert reader.version("u1") == 0
+    assert reader.lookup("u1", "DMART\nTotal 845.00") is None
+
+    assert writer.record("u1", DMART)
+
+    assert reader.version("u1") > 0
+    assert reader.version("u1") == writer.version("u1")
+    profile = reader.lookup("u1", "DMART\nTotal 845.00")
+    assert profile["merchant_name"] == "DMart"
+    assert profile["category"] == "Groceries"
+    assert profile["count"] == 1
+
+
+def test_writes_from_both_connections_merge(db_path):
+    first = MerchantIndex(db_path)
+    second = MerchantIndex(db_path)
+
+    first.record("u1", DMART)
+    version = first.version("u1")
+    # second has not looked at the file since first wrote; its write must merge, not overwrite
+    second.record("u1", {**DMART, "amount": 120.0})
+
+    assert first.version("u1") > version
+    profile = first.lookup("u1", "dmart")
+    assert profile["count"] == 2
+    assert (profile["amount_min"], profile["amount_max"]) == (120.0, 845.0)
+
+
+def test_versions_are_per_user(db_path):
+    first = MerchantIndex(db_path)
+    second = MerchantIndex(db_path)
+
+    first.record("u1", DMART)
+    u1_version = second.version("u1")
+    first.record("u2", {**DMART, "merchant_name": "Zomato", "category": "Food"})
+
+    assert second.version("u1") == u1_version
+    assert second.version("u2") > u1_version
+    assert second.lookup("u1", "zomato order 250") is None
+
+
+def test_unverified_transactions_are_ignored(db_path):
+    index = MerchantIndex(db_path)
+    assert not index.record("u1", {**DMART, "verified": False})
+    assert not index.record("u1", {key: value for key, value in DMART.items() if key != "verified"})
+    assert index.version("u1") == 0
+
+
+def test_memory_only_index_bumps_version():
+    index = MerchantIndex(None)
+    index.record("u1", DMART)
+    version = index.version("u1")
+    index.record("u1", DMART)
+    assert index.version("u1") > version
+    assert index.lookup("u1", "DMART")["count"] == 2
@@ -0,0 +1,122 @@
+"""
+Tests for the dynamic request batcher (micro_batcher.py).
+
+Usage:
+    python -m pytest backend/tests/test_micro_batcher.py
+"""
+
+import asyncio
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+class Recorder:
+    """Batch function that records each batch and doubles every item."""
+
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self.delay = delay
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(self.delay)
+        return [item * 2 for item in items]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_submits_form_one_batch():
+    recorder = Recorder()
+
+    async def scenario():
+        batcher = MicroBatcher(recorder, max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        await batcher.stop()
+        return results, batcher.stats()
+
+    results, stats = run(scenario())
+    assert results == [0, 2, 4, 6, 8]
+    assert recorder.batches == [[0, 1, 2, 3, 4]]
+    assert stats["batches"] == 1 and stats["max_batch"] == 5
+
+
+def test_batches_are_capped_at_max_batch_size():
+    recorder = Recorder(delay=0.01)
+
+    async def scenario():
+        batcher = MicroBatcher(recorder, max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+        await batcher.stop()
+        return results
+
+    assert run(scenario()) == [i * 2 for i in range(10)]
+    assert [len(batch) for batch in recorder.batches] == [4, 4, 2]
+    assert sorted(item for batch in recorder.batches for item in batch) == list(range(10))
+
+
+def test_wait_limit_closes_the_batch():
+    recorder = Recorder()
+
+    async def scenario():
+        batcher = MicroBatcher(recorder, max_batch_size=8, max_wait_ms=20)
+        first = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.2)
+        second = await batcher.submit(2)
+        results = [await first, second]
+        await batcher.stop()
+        return results
+
+    assert run(scenario()) == [2, 4]
+    assert recorder.batches == [[1], [2]]
+
+
+def test_batch_error_reaches_every_caller():
+    async def failing(items):
+        raise ValueError("model crashed")
+
+    async def scenario():
+        batcher = MicroBatcher(failing, max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = run(scenario())
+    assert len(results) == 3
+    assert all(isinstance(result, ValueError) and str(result) == "model crashed" for result in results)
+
+
+def test_wrong_result_count_fails_the_batch():
+    async def short(items):
+        return items[:1]
+
+    async def scenario():
+        batcher = MicroBatcher(short, max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(2)), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    assert all(isinstance(result, RuntimeError) for result in run(scenario()))
+
+
+def test_batcher_keeps_working_after_a_failed_batch():
+    calls = []
+
+    async def flaky(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise ValueError("transient")
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(flaky, max_batch_size=8, max_wait_ms=5)
+        with pytest.raises(ValueError):
+            await batcher.submit("a")
+        result = await batcher.submit("b")
+        await batcher.stop()
+        return result
+
+    assert run(scenario()) == "b"
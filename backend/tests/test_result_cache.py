@@ -0,0 +1,110 @@
+"""
+Tests for the parse result cache (result_cache.py) and the rule that
+degraded results (mark_uncacheable / NO_CACHE) are never stored.
+
+Usage:
+    python -m pytest backend/tests/test_result_cache.py
+"""
+
+import pytest
+
+import result_cache
+from result_cache import NO_CACHE, ResultCache, mark_uncacheable
+
+RESULT = {"amount": 845.0, "category": "Groceries", "padding": "x" * 100}
+
+
+def key(n: int) -> str:
+    return ResultCache.make_key(bytes([n]), "image", "test")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Deterministic time.time() for the disk tier's LRU timestamps."""
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_memory_lru_evicts_least_recently_used():
+    cache = ResultCache(memory_items=2, disk_path=None)
+    cache.put(key(1), RESULT)
+    cache.put(key(2), RESULT)
+    assert cache.get(key(1)) == RESULT  # 1 is now the most recent
+    cache.put(key(3), RESULT)
+
+    assert cache.get(key(2)) is None
+    assert cache.get(key(1)) == RESULT
+    assert cache.get(key(3)) == RESULT
+    assert cache.counters()["memory_items"] == 2
+
+
+def test_get_returns_a_copy():
+    cache = ResultCache(disk_path=None)
+    cache.put(key(1), RESULT)
+    cache.get(key(1))["amount"] = 0
+    assert cache.get(key(1))["amount"] == 845.0
+
+
+def test_disk_tier_stays_under_its_size_bound(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    entry_size = len(result_cache.json.dumps(RESULT))
+    cache = ResultCache(memory_items=1, disk_path=path, disk_max_bytes=2 * entry_size)
+    for n in range(1, 4):
+        clock[0] += 1
+        cache.put(key(n), RESULT)
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["disk_items"] == 2
+    assert stats["disk_bytes"] <= 2 * entry_size
+
+    # A fresh process (empty memory tier) only finds the two newest entries on disk
+    reopened = ResultCache(memory_items=1, disk_path=path, disk_max_bytes=2 * entry_size)
+    assert reopened.get(key(1)) is None
+    assert reopened.get(key(2)) == RESULT
+    assert reopened.get(key(3)) == RESULT
+
+
+def test_disk_hits_refresh_lru_order(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    entry_size = len(result_cache.json.dumps(RESULT))
+    cache = ResultCache(memory_items=1, disk_path=path, disk_max_bytes=2 * entry_size)
+    cache.put(key(1), RESULT)
+    clock[0] += 1
+    cache.put(key(2), RESULT)
+
+    clock[0] += result_cache.ACCESS_RESOLUTION + 1
+    assert cache.get(key(1)) == RESULT  # from disk, refreshes its timestamp
+    clock[0] += 1
+    cache.put(key(3), RESULT)
+
+    reopened = ResultCache(memory_items=1, disk_path=path)
+    assert reopened.get(key(1)) == RESULT
+    assert reopened.get(key(2)) is None
+
+
+def test_uncacheable_results_are_not_stored(tmp_path):
+    cache = ResultCache(disk_path=str(tmp_path / "cache.sqlite"))
+    cache.put(key(1), mark_uncacheable(dict(RESULT)))
+
+    assert cache.get(key(1)) is None
+    assert cache.stats()["writes"] == 0
+    assert cache.stats()["disk_items"] == 0
+
+
+def test_parser_cache_result_drops_marker_and_skips_fallbacks(monkeypatch):
+    pytest.importorskip("PIL")
+    pytest.importorskip("requests")
+    import transaction_parser_inference_api
+
+    monkeypatch.setattr(transaction_parser_inference_api, "MERCHANT_INDEX", False)
+    cache = ResultCache(disk_path=None)
+    parser = transaction_parser_inference_api.TransactionParser(cache=cache)
+    fallback = mark_uncacheable(dict(RESULT))
+    parser._cache_result(key(1), fallback)
+    parser._cache_result(key(2), dict(RESULT))
+
+    assert NO_CACHE not in fallback
+    assert cache.get(key(1)) is None
+    assert cache.get(key(2)) == RESULT
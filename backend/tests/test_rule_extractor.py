@@ -0,0 +1,131 @@
+"""
+Regression tests for the rule-based extractor (rule_extractor.py).
+
+Usage:
+    python -m pytest backend/tests/test_rule_extractor.py
+"""
+
+from datetime import datetime
+
+import pytest
+
+from rule_extractor import CONFIDENCE_THRESHOLD, extract_transaction, extract_transactions, needs_llm
+
+
+# --- whole-word keyword matching ---
+
+def test_keyword_inside_a_word_does_not_match():
+    result = extract_transaction("paid 200 to Olamide for cardamom")
+    assert result["category"] == "Misc"
+    assert result["payment_method"] == ""
+    assert needs_llm(result)
+
+
+def test_rent_does_not_match_current():
+    result = extract_transaction("paid 900 current account charges")
+    assert result["category"] != "Rent"
+
+
+def test_whole_keywords_match():
+    result = extract_transaction("Paid 120 for an ola ride by upi")
+    assert result["category"] == "Delivery"
+    assert result["payment_method"] == "UPI"
+    assert result["field_confidence"]["category"] == 0.9
+
+
+def test_keyword_at_end_of_text_matches():
+    assert extract_transaction("spent 450 on petrol")["category"] == "Fuel"
+
+
+def test_keyword_before_punctuation_matches():
+    assert extract_transaction("I spent 500 rupees on food at McDonald's today")["category"] == "Food"
+
+
+# --- amounts and digit grouping ---
+
+@pytest.mark.parametrize("text, amount", [
+    ("Paid ₹1,20,000 for rent", 120000.0),
+    ("Paid Rs 120,000 for rent", 120000.0),
+    ("Total: 12,34,567.50", 1234567.5),
+    ("spent 1,200.50 on groceries", 1200.5),
+    ("received 4500 rupees salary", 4500.0),
+])
+def test_digit_grouping(text, amount):
+    result = extract_transaction(text)
+    assert result["amount"] == amount
+    assert result["field_confidence"]["amount"] >= CONFIDENCE_THRESHOLD
+
+
+def test_several_amounts_are_ambiguous():
+    result = extract_transaction("Milk Rs 45\nBread Rs 30\nTotal Rs 75")
+    assert result["amount"] == 75.0
+    assert result["field_confidence"]["amount"] < CONFIDENCE_THRESHOLD
+
+
+# --- dates and times ---
+
+@pytest.mark.parametrize("text, expected", [
+    ("paid 200 on 2024-03-02", "2024-03-02"),
+    ("paid 200 on 15/01/2024", "2024-01-15"),
+    ("paid 200 on 15-01-2024", "2024-01-15"),
+])
+def test_dates(text, expected):
+    result = extract_transaction(text)
+    assert result["transaction_date"] == expected
+    assert result["field_confidence"]["transaction_date"] == 0.9
+
+
+def test_invalid_date_falls_back_to_today():
+    now = datetime.now()
+    result = extract_transactions(["paid 200 on 31/02/2024"])[0]
+    assert result["transaction_date"] == now.strftime("%Y-%m-%d")
+    assert result["field_confidence"]["transaction_date"] == 0.0
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("paid 200 at 14:30", "14:30"),
+    ("paid 200 at 9:05", "09:05"),
+])
+def test_times(text, expected):
+    result = extract_transaction(text)
+    assert result["transaction_time"] == expected
+    assert result["field_confidence"]["transaction_time"] == 0.9
+
+
+# --- merchants ---
+
+@pytest.mark.parametrize("text, merchant", [
+    ("I spent 500 rupees on food at McDonald's today", "McDonald's"),
+    ("paid 200 to Ramesh Kumar by cash", "Ramesh Kumar"),
+    ("Haldiram's restaurant bill 340", "Haldiram's"),
+])
+def test_merchant_names(text, merchant):
+    assert extract_transaction(text)["merchant_name"] == merchant
+
+
+# --- needs_llm threshold ---
+
+def test_confident_result_skips_llm():
+    result = extract_transaction("Spent ₹250 on petrol")
+    assert not needs_llm(result)
+
+
+def test_low_category_confidence_needs_llm():
+    result = extract_transaction("Bought tea for 20")
+    assert result["field_confidence"]["category"] < CONFIDENCE_THRESHOLD
+    assert needs_llm(result)
+
+
+def test_missing_amount_needs_llm():
+    result = extract_transaction("bought petrol")
+    assert result["amount"] is None
+    assert needs_llm(result)
+
+
+def test_threshold_is_inclusive_and_configurable():
+    result = {
+        "amount": 100.0, "transaction_type": "expense", "category": "Food",
+        "field_confidence": {"amount": CONFIDENCE_THRESHOLD, "transaction_type": 0.9, "category": 0.9},
+    }
+    assert not needs_llm(result)
+    assert needs_llm(result, threshold=0.85)
@@ -9,7 +9,10 @@ Usage:
     python test_transaction_parser.py
 """
 
+import os
 import json
+import tempfile
+from datetime import date
 from transaction_parser import TransactionParser
 
 def test_image_parsing():
@@ -24,6 +27,13 @@ def test_image_parsing():
     image_path = "sample_receipt.jpg"  # Change this to your image path
     
     try:
+        if not os.path.exists(image_path):
+            # No real receipt at hand: render a synthetic one outside the working tree
+            from synthetic_corpus import RECEIPT_SPECS, render_receipt
+            image_path = os.path.join(tempfile.gettempdir(), "sample_receipt.jpg")
+            render_receipt(RECEIPT_SPECS[0], date.today()).save(image_path)
+            print(f"Rendered synthetic receipt to {image_path}")
+        
         result = parser.parse_image(image_path)
         print("\nResult:")
         print(json.dumps(result, indent=2))
@@ -0,0 +1,144 @@
+"""
+Audio Decode Benchmark - soundfile + Polyphase vs librosa.load
+==============================================================
+
+Compares the Whisper input front-end (audio_preprocessing.decode_audio) with
+the previous librosa.load(..., sr=16000) path: import cost in a fresh
+interpreter, per-file decode+resample latency, and the difference between
+the two waveforms.
+
+Without arguments a set of synthetic recordings is generated in memory
+(speech-band tones at common phone rates, mono and stereo, 5-60 s).
+
+Usage:
+    python audio_decode_benchmark.py
+    python audio_decode_benchmark.py voice/*.wav --repeats 20 --output decode_report.json
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Dict, List, Tuple, Any
+
+import numpy as np
+import soundfile as sf
+
+from audio_preprocessing import decode_audio, TARGET_SAMPLE_RATE
+from benchmark_utils import percentile
+
+# (sample rate, channels, seconds) of the generated recordings
+SYNTHETIC_CLIPS = [
+    (16000, 1, 5),
+    (44100, 1, 10),
+    (44100, 2, 30),
+    (48000, 2, 60),
+    (8000, 1, 15),
+]
+
+
+def _synthetic_clip(sr: int, channels: int, seconds: float) -> bytes:
+    """Render a WAV of gated speech-band tones with a little noise."""
+    t = np.arange(int(sr * seconds)) / sr
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.2 * np.sin(2 * np.pi * 1250 * t)
+    signal *= (np.sin(2 * np.pi * 0.5 * t) > -0.3)
+    signal += 0.01 * np.random.default_rng(0).standard_normal(len(t))
+    audio = np.stack([signal] * channels, axis=1).astype(np.float32)
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sr, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def _import_seconds(statement: str) -> float:
+    """Time an import in a fresh interpreter (cold module cache in Python)."""
+    code = f"import time; s = time.perf_counter(); {statement}; print(time.perf_counter() - s)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip())
+
+
+def _time_decoder(decode, data: bytes, repeats: int) -> Tuple[List[float], np.ndarray]:
+    """Decode the same bytes repeatedly; return latencies and the last waveform."""
+    latencies = []
+    audio = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        audio = decode(data)
+        latencies.append(time.perf_counter() - start)
+    return latencies, audio
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark Whisper audio decoding")
+    arg_parser.add_argument("files", nargs="*", help="Audio files (default: synthetic clips)")
+    arg_parser.add_argument("--repeats", type=int, default=10)
+    arg_parser.add_argument("--output", help="Write the JSON report to this file")
+    args = arg_parser.parse_args()
+
+    if args.files:
+        clips = []
+        for path in args.files:
+            with open(path, "rb") as f:
+                clips.append((path, f.read()))
+    else:
+        clips = [
+            (f"synthetic_{sr}hz_{channels}ch_{seconds}s.wav", _synthetic_clip(sr, channels, seconds))
+            for sr, channels, seconds in SYNTHETIC_CLIPS
+        ]
+
+    report: Dict[str, Any] = {
+        "import_seconds": {
+            "soundfile+scipy": round(_import_seconds("import soundfile, scipy.signal"), 3),
+        },
+        "files": [],
+    }
+
+    try:
+        import librosa
+        report["import_seconds"]["librosa"] = round(_import_seconds("import librosa"), 3)
+    except ImportError:
+        librosa = None
+        print("librosa not installed, timing the new decoder only")
+
+    for name, data in clips:
+        fast, fast_audio = _time_decoder(lambda d: decode_audio(d, TARGET_SAMPLE_RATE), data, args.repeats)
+        entry = {
+            "file": name,
+            "seconds": round(len(fast_audio) / TARGET_SAMPLE_RATE, 2),
+            "soundfile_p50_ms": round(percentile(fast, 50) * 1000, 2),
+            "soundfile_p95_ms": round(percentile(fast, 95) * 1000, 2),
+        }
+
+        if librosa is not None:
+            slow, slow_audio = _time_decoder(
+                lambda d: librosa.load(io.BytesIO(d), sr=TARGET_SAMPLE_RATE)[0], data, args.repeats
+            )
+            length = min(len(fast_audio), len(slow_audio))
+            entry.update({
+                "librosa_p50_ms": round(percentile(slow, 50) * 1000, 2),
+                "librosa_p95_ms": round(percentile(slow, 95) * 1000, 2),
+                "speedup": round(percentile(slow, 50) / max(percentile(fast, 50), 1e-9), 2),
+                "max_abs_diff": round(float(np.max(np.abs(fast_audio[:length] - slow_audio[:length]))), 4)
+                if length else 0.0,
+            })
+        report["files"].append(entry)
+
+    print("\n" + "=" * 78)
+    print("Import time: " + ", ".join(f"{k} {v:.3f}s" for k, v in report["import_seconds"].items()))
+    print("-" * 78)
+    print(f"{'file':<36} {'len (s)':>8} {'sf p50 (ms)':>12} {'librosa p50':>12} {'speedup':>8}")
+    for entry in report["files"]:
+        print(f"{entry['file'][:36]:<36} {entry['seconds']:>8.1f} {entry['soundfile_p50_ms']:>12.2f} "
+              f"{entry.get('librosa_p50_ms', float('nan')):>12.2f} {entry.get('speedup', float('nan')):>8.2f}")
+    print("=" * 78)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
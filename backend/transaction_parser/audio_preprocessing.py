@@ -0,0 +1,185 @@
+"""
+Audio Preprocessing - Decoding, Energy-based VAD and Whisper Windowing
+======================================================================
+
+Uploads are decoded with soundfile (libsndfile), downmixed to mono and
+brought to Whisper's 16 kHz with a polyphase resampler. This replaces
+librosa.load, whose import alone costs seconds of cold start and whose
+default resampler is much slower.
+
+Whisper only sees the first 30 s of its input and decodes silence just like
+speech. This module trims silence with a cheap frame-energy voice activity
+detector and packs the remaining speech into windows of at most 30 s, so long
+voice notes can be transcribed as one batch and stitched back together.
+
+Usage:
+    from audio_preprocessing import decode_audio, split_speech_windows
+
+    audio = decode_audio(upload_bytes)
+    windows = split_speech_windows(audio, sr=16000)
+"""
+
+import io
+from math import gcd
+from typing import List, Tuple
+import numpy as np
+import soundfile as sf
+
+try:
+    from scipy.signal import resample_poly
+except ImportError:
+    resample_poly = None
+
+# Whisper's expected input rate
+TARGET_SAMPLE_RATE = 16000
+
+# Analysis frame length for the energy detector (seconds)
+FRAME_SECONDS = 0.03
+# Frames quieter than this many dB below the loudest frame count as silence
+VAD_THRESHOLD_DB = 35.0
+# Absolute RMS floor, so near-silent recordings are not "all speech"
+VAD_MIN_RMS = 1e-3
+# Pauses shorter than this are kept inside a speech segment (seconds)
+MAX_PAUSE_SECONDS = 0.4
+# Speech kept on either side of each segment to avoid clipping words (seconds)
+SPEECH_PADDING_SECONDS = 0.15
+# Whisper's receptive field
+WINDOW_SECONDS = 30.0
+
+
+def to_mono(audio: np.ndarray) -> np.ndarray:
+    """Downmix a (samples, channels) array to a float32 mono waveform."""
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Resample a mono waveform with a polyphase filter.
+
+    The rate ratio is reduced to up/down integers (44.1 kHz -> 16 kHz is
+    160/441), so only the output samples are ever computed. Without scipy a
+    linear interpolation is used instead, which is fast but aliases more.
+    """
+    if orig_sr == target_sr or len(audio) == 0:
+        return audio
+    if resample_poly is not None:
+        factor = gcd(orig_sr, target_sr)
+        return resample_poly(audio, target_sr // factor, orig_sr // factor).astype(np.float32)
+
+    num_samples = int(round(len(audio) * target_sr / orig_sr))
+    positions = np.arange(num_samples) * (orig_sr / target_sr)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def decode_audio(data: bytes, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode an audio file held in memory to a mono waveform at target_sr.
+
+    Args:
+        data: Encoded audio (WAV, FLAC, OGG, MP3 with libsndfile >= 1.1)
+        target_sr: Output sample rate
+
+    Returns:
+        float32 mono waveform
+    """
+    try:
+        audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except RuntimeError:  # sf.LibsndfileError: format not supported by libsndfile
+        # Containers libsndfile cannot read (e.g. m4a) go through librosa/audioread,
+        # imported only here so it stays off the normal import path
+        import librosa
+        return librosa.load(io.BytesIO(data), sr=target_sr, mono=True)[0]
+    return resample(to_mono(audio), sr, target_sr)
+
+
+def frame_rms(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """Compute RMS energy of non-overlapping frames."""
+    num_frames = len(audio) // frame_length
+    if num_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:num_frames * frame_length].reshape(num_frames, frame_length)
+    return np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+
+def detect_speech(audio: np.ndarray, sr: int) -> List[Tuple[int, int]]:
+    """
+    Find speech segments with a frame-energy threshold.
+
+    Args:
+        audio: Mono waveform
+        sr: Sample rate
+
+    Returns:
+        List of (start, end) sample offsets, in order
+    """
+    frame_length = max(1, int(sr * FRAME_SECONDS))
+    rms = frame_rms(audio, frame_length)
+    if rms.size == 0:
+        return []
+
+    threshold = max(VAD_MIN_RMS, float(rms.max()) * 10 ** (-VAD_THRESHOLD_DB / 20))
+    voiced = rms > threshold
+
+    # Collect voiced runs, bridging pauses shorter than MAX_PAUSE_SECONDS
+    max_gap = int(MAX_PAUSE_SECONDS / FRAME_SECONDS)
+    segments = []
+    start = None
+    gap = 0
+    for i, is_voiced in enumerate(voiced):
+        if is_voiced:
+            if start is None:
+                start = i
+            gap = 0
+        elif start is not None:
+            gap += 1
+            if gap > max_gap:
+                segments.append((start, i - gap + 1))
+                start = None
+                gap = 0
+    if start is not None:
+        segments.append((start, len(voiced) - gap))
+
+    padding = int(sr * SPEECH_PADDING_SECONDS)
+    return [
+        (max(0, s * frame_length - padding), min(len(audio), e * frame_length + padding))
+        for s, e in segments
+    ]
+
+
+def split_speech_windows(audio: np.ndarray, sr: int) -> List[np.ndarray]:
+    """
+    Trim silence and pack speech into windows of at most WINDOW_SECONDS.
+
+    Segments are packed greedily so a window boundary falls in a pause
+    whenever possible; a single segment longer than a window is cut hard.
+
+    Args:
+        audio: Mono waveform
+        sr: Sample rate
+
+    Returns:
+        List of waveforms, each no longer than WINDOW_SECONDS (empty if the
+        recording is silent)
+    """
+    window_length = int(sr * WINDOW_SECONDS)
+    windows = []
+    current = []
+    current_length = 0
+
+    for start, end in detect_speech(audio, sr):
+        # Cut segments longer than a whole window into window-sized pieces
+        for piece_start in range(start, end, window_length):
+            piece = audio[piece_start:min(end, piece_start + window_length)]
+            if current_length + len(piece) > window_length and current:
+                windows.append(np.concatenate(current))
+                current = []
+                current_length = 0
+            current.append(piece)
+            current_length += len(piece)
+
+    if current:
+        windows.append(np.concatenate(current))
+
+    return windows
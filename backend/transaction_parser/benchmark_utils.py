@@ -0,0 +1,43 @@
+"""
+Benchmark Utilities
+===================
+
+Shared helpers for the parser benchmark/report scripts: field comparison,
+percentiles and peak RSS measurement.
+"""
+
+import sys
+from typing import List, Any
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def field_matches(expected: Any, actual: Any) -> bool:
+    """Compare one expected field with the parser output."""
+    if isinstance(expected, (int, float)):
+        try:
+            return abs(float(actual) - float(expected)) < 0.01
+        except (TypeError, ValueError):
+            return False
+    return str(actual or "").strip().lower() == str(expected).strip().lower()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (0 if unavailable)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,241 @@
+"""
+Bulk Ingestion - Pipelined Parsing of Many Receipts and Voice Notes
+===================================================================
+
+Onboarding parses months of old receipts at once. Instead of one request
+per file, the whole set runs through a three-stage pipeline:
+
+    decode     thread pool: cache lookup, image normalization / audio decode
+    recognize  batched OCR (TrOCR) or ASR (Whisper) over whatever is decoded
+    extract    rules-first field extraction (LLM only when needed)
+
+Stages are connected by bounded queues, so decoding runs ahead of the
+models without holding the whole upload decoded in memory, and extraction
+of one batch overlaps recognition of the next. Results are yielded as soon
+as each file finishes, in completion order, for NDJSON streaming.
+
+Model stages are run through a `run_model(method, *args)` coroutine, which
+lets the API server route them to its model thread or worker pool and the
+CLI run them on local threads.
+
+Usage:
+    items = expand_uploads([("receipts.zip", "application/zip", data)])
+    pipeline = BulkPipeline(parser, run_model)
+    async for record in pipeline.run(items):
+        print(json.dumps(record))
+"""
+
+import io
+import os
+import asyncio
+import zipfile
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a"}
+
+# Files recognized per OCR/ASR batch
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "16"))
+# Concurrent decode jobs (also bounds how far decoding runs ahead of the models)
+BULK_DECODE_WORKERS = int(os.getenv("BULK_DECODE_WORKERS", "4"))
+# Zip archives are expanded up to these limits
+MAX_ZIP_MEMBERS = 2000
+MAX_ZIP_BYTES = 512 * 1024 * 1024
+
+# (name, kind, data); kind is "image", "voice" or None for unsupported files
+BulkItem = Tuple[str, Optional[str], bytes]
+
+
+def classify_upload(name: str, content_type: Optional[str] = None) -> Optional[str]:
+    """Return "image", "voice" or None from a file's extension / content type."""
+    extension = os.path.splitext(name.lower())[1]
+    if extension in IMAGE_EXTENSIONS or (content_type or "").startswith("image/"):
+        return "image"
+    if extension in AUDIO_EXTENSIONS or (content_type or "").startswith("audio/"):
+        return "voice"
+    return None
+
+
+def _is_zip(name: str, content_type: Optional[str], data: bytes) -> bool:
+    return (
+        name.lower().endswith(".zip")
+        or content_type in ("application/zip", "application/x-zip-compressed")
+        or data[:4] == b"PK\x03\x04"
+    )
+
+
+def expand_uploads(uploads: List[Tuple[str, Optional[str], bytes]]) -> List[BulkItem]:
+    """
+    Turn uploaded files into pipeline items, expanding zip archives.
+
+    Args:
+        uploads: (filename, content_type, data) per uploaded file
+
+    Returns:
+        One item per image/audio file, in upload (and archive) order;
+        unsupported files are kept with kind None so they get an error record
+    """
+    items: List[BulkItem] = []
+    for name, content_type, data in uploads:
+        if not _is_zip(name, content_type, data):
+            items.append((name, classify_upload(name, content_type), data))
+            continue
+
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not info.is_dir()
+                    and not info.filename.startswith("__MACOSX/")
+                    and not os.path.basename(info.filename).startswith(".")
+                ]
+                if len(members) > MAX_ZIP_MEMBERS or sum(info.file_size for info in members) > MAX_ZIP_BYTES:
+                    raise ValueError(f"archive exceeds {MAX_ZIP_MEMBERS} files or {MAX_ZIP_BYTES >> 20} MB")
+                for info in members:
+                    member_name = f"{name}/{info.filename}"
+                    items.append((member_name, classify_upload(info.filename), archive.read(info)))
+        except (zipfile.BadZipFile, ValueError) as e:
+            print(f"Could not expand archive {name}: {e}")
+            items.append((name, None, b""))
+    return items
+
+
+def _error(message: str) -> Dict[str, Any]:
+    return {"error": message, "confidence": 0.0}
+
+
+def _failure(kind: str, e: Exception) -> Dict[str, Any]:
+    """Error result in the same wording as parse_image/parse_voice."""
+    return _error(f"Failed to process {'image' if kind == 'image' else 'audio'}: {str(e)}")
+
+
+class BulkPipeline:
+    """Decode -> recognize -> extract pipeline over many uploads."""
+
+    # Parser methods run per model stage, by item kind
+    RECOGNIZE_METHODS = {"image": "_extract_text_from_images", "voice": "_transcribe_audios"}
+    DECODE_METHODS = {"image": "_decode_image", "voice": "_decode_audio"}
+    EMPTY_TEXT_ERRORS = {
+        "image": "Could not extract sufficient text from image. Please ensure the image is clear and contains readable text.",
+        "voice": "Could not transcribe audio. Please ensure the recording is clear.",
+    }
+
+    def __init__(
+        self,
+        parser,
+        run_model: Callable[..., Awaitable[Any]],
+        batch_size: int = BULK_BATCH_SIZE,
+        decode_workers: int = BULK_DECODE_WORKERS,
+        extract_concurrency: int = 1,
+        user_id: Optional[str] = None
+    ):
+        """
+        Args:
+            parser: TransactionParser (used for decoding and the result cache)
+            run_model: Coroutine `run_model(method_name, *args)` that runs a
+                parser method where the models live
+            batch_size: Maximum files per OCR/ASR call
+            decode_workers: Concurrent decode jobs
+            extract_concurrency: Extraction calls allowed in flight at once
+            user_id: Uploading user, for their merchant index (optional)
+        """
+        self.parser = parser
+        self.run_model = run_model
+        self.batch_size = max(1, batch_size)
+        self.decode_workers = max(1, decode_workers)
+        self.extract_concurrency = max(1, extract_concurrency)
+        self.user_id = user_id
+
+    def _prepare(self, kind: str, data: bytes) -> Tuple[Optional[str], Optional[Dict[str, Any]], Any]:
+        """Decode stage (runs on a thread): cache lookup, then decode on a miss."""
+        cache_key = self.parser._cache_key(data, kind, self.user_id)
+        if cache_key:
+            cached = self.parser.cache.get(cache_key)
+            if cached is not None:
+                return cache_key, cached, None
+        return cache_key, None, getattr(self.parser, self.DECODE_METHODS[kind])(data)
+
+    async def run(self, items: List[BulkItem]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Parse all items, yielding one record per item as soon as it is done.
+
+        Records look like {"index": 3, "name": "march/dmart.jpg", "kind": "image",
+        "result": {...parse_image-style dict...}}.
+        """
+        loop = asyncio.get_running_loop()
+        results: asyncio.Queue = asyncio.Queue()
+        recognize_queues = {kind: asyncio.Queue(maxsize=2 * self.batch_size) for kind in self.RECOGNIZE_METHODS}
+        decode_slots = asyncio.Semaphore(self.decode_workers)
+        extract_slots = asyncio.Semaphore(self.extract_concurrency)
+        tasks = []
+
+        def emit(index: int, result: Dict[str, Any]):
+            name, kind, _ = items[index]
+            results.put_nowait({"index": index, "name": name, "kind": kind, "result": result})
+
+        async def decode_one(index: int):
+            name, kind, data = items[index]
+            try:
+                cache_key, cached, decoded = await loop.run_in_executor(None, self._prepare, kind, data)
+                if cached is not None:
+                    emit(index, cached)
+                else:
+                    # Still holding the decode slot: bounds decoded items waiting for the model
+                    await recognize_queues[kind].put((index, cache_key, decoded))
+            except Exception as e:
+                print(f"Error decoding {name}: {e}")
+                emit(index, _failure(kind, e))
+            finally:
+                decode_slots.release()
+
+        async def feed():
+            for index, (_, kind, _) in enumerate(items):
+                if kind is None:
+                    emit(index, _error("Unsupported or unreadable file (expected an image, audio file or zip archive)"))
+                    continue
+                await decode_slots.acquire()
+                tasks.append(loop.create_task(decode_one(index)))
+
+        async def extract_one(kind: str, index: int, cache_key: Optional[str], text: str):
+            try:
+                if not text or len(text.strip()) < 5:
+                    emit(index, _error(self.EMPTY_TEXT_ERRORS[kind]))
+                    return
+                result = await self.run_model("_parse_text_to_transaction", text, self.user_id)
+                self.parser._cache_result(cache_key, result)
+                emit(index, result)
+            except Exception as e:
+                emit(index, _failure(kind, e))
+            finally:
+                extract_slots.release()
+
+        async def recognize(kind: str):
+            queue = recognize_queues[kind]
+            while True:
+                # Take whatever is decoded, up to a full batch, without waiting for more
+                batch = [await queue.get()]
+                while len(batch) < self.batch_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+
+                try:
+                    texts = await self.run_model(self.RECOGNIZE_METHODS[kind], [decoded for _, _, decoded in batch])
+                except Exception as e:
+                    for index, _, _ in batch:
+                        emit(index, _failure(kind, e))
+                    continue
+
+                # Extraction runs in the background while the next batch is recognized
+                for (index, cache_key, _), text in zip(batch, texts):
+                    await extract_slots.acquire()
+                    tasks.append(loop.create_task(extract_one(kind, index, cache_key, text)))
+
+        tasks.append(loop.create_task(feed()))
+        for kind in self.RECOGNIZE_METHODS:
+            tasks.append(loop.create_task(recognize(kind)))
+
+        try:
+            for _ in range(len(items)):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
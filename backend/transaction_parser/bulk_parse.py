@@ -0,0 +1,133 @@
+"""
+Bulk Parse CLI - Parse a Folder or Archive of Receipts/Voice Notes
+==================================================================
+
+Command-line counterpart of POST /api/parse-batch. Runs the pipelined bulk
+ingestion (see bulk_ingest.py) with a local TransactionParser, or streams the
+files to a running parser server. Results are written as NDJSON, one line
+per file, as soon as each file is parsed.
+
+Usage:
+    python bulk_parse.py receipts/ voice_notes.zip --output results.ndjson
+    python bulk_parse.py receipts.zip --server http://localhost:8000
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional
+
+from bulk_ingest import BulkPipeline, expand_uploads, BULK_BATCH_SIZE, BULK_DECODE_WORKERS
+
+
+def _collect_files(paths: List[str]) -> List[str]:
+    """Expand directories into the files below them, sorted."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names if not name.startswith("."))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def _read_uploads(files: List[str]) -> List[Tuple[str, Optional[str], bytes]]:
+    """Read files as (name, guessed content type, bytes) uploads."""
+    uploads = []
+    for path in files:
+        with open(path, "rb") as f:
+            uploads.append((path, mimetypes.guess_type(path)[0], f.read()))
+    return uploads
+
+
+async def _run_local(files: List[str], output, batch_size: int, decode_workers: int) -> int:
+    """Parse with a local TransactionParser; returns the number of records written."""
+    from transaction_parser import TransactionParser
+
+    parser = TransactionParser()
+    # Recognition and extraction each get their own thread so the stages overlap
+    executors = {
+        "recognize": ThreadPoolExecutor(max_workers=1, thread_name_prefix="recognize"),
+        "extract": ThreadPoolExecutor(max_workers=1, thread_name_prefix="extract"),
+    }
+
+    async def run_model(method: str, *args):
+        executor = executors["extract" if method == "_parse_text_to_transaction" else "recognize"]
+        return await asyncio.get_running_loop().run_in_executor(executor, getattr(parser, method), *args)
+
+    pipeline = BulkPipeline(parser, run_model, batch_size=batch_size, decode_workers=decode_workers)
+    count = 0
+    try:
+        async for record in pipeline.run(expand_uploads(_read_uploads(files))):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            count += 1
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=False)
+    return count
+
+
+def _run_remote(files: List[str], output, server: str) -> int:
+    """Stream the files to POST /api/parse-batch; returns the number of records written."""
+    import requests
+
+    handles = [open(path, "rb") for path in files]
+    try:
+        multipart = [
+            ("files", (os.path.basename(path), handle, mimetypes.guess_type(path)[0] or "application/octet-stream"))
+            for path, handle in zip(files, handles)
+        ]
+        count = 0
+        with requests.post(f"{server.rstrip('/')}/api/parse-batch", files=multipart, stream=True, timeout=None) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    output.write(line.decode() + "\n")
+                    output.flush()
+                    count += 1
+        return count
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Parse many receipts/voice notes into NDJSON")
+    arg_parser.add_argument("paths", nargs="+", help="Files, directories or zip archives")
+    arg_parser.add_argument("--output", help="NDJSON output file (default: stdout)")
+    arg_parser.add_argument("--server", help="Parser server URL; parse remotely via /api/parse-batch")
+    arg_parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    arg_parser.add_argument("--decode-workers", type=int, default=BULK_DECODE_WORKERS)
+    args = arg_parser.parse_args()
+
+    files = _collect_files(args.paths)
+    if not files:
+        arg_parser.error("no input files found")
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        # Parser progress prints go to stderr so stdout stays valid NDJSON
+        with contextlib.redirect_stdout(sys.stderr):
+            if args.server:
+                count = _run_remote(files, output, args.server)
+            else:
+                count = asyncio.run(_run_local(files, output, args.batch_size, args.decode_workers))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Parsed {count} files in {elapsed:.1f}s ({count / elapsed:.2f} files/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
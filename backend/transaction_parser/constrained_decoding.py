@@ -0,0 +1,228 @@
+"""
+Constrained Decoding - Schema-guided JSON Generation
+====================================================
+
+Free-running generation spends up to 256 tokens and sometimes produces text
+that is not valid JSON, which then falls back to regex extraction. This module
+constrains the LLM to the transaction JSON schema character by character and
+stops generation the moment the object closes.
+
+The schema is a fixed sequence of elements (literal keys/punctuation, a
+number, enums and bounded strings). At each step only tokens whose text keeps
+the output a valid prefix of that sequence are allowed. Candidates are checked
+among the top-k logits first, and the whole vocabulary is scanned only when
+none of them fit.
+
+Usage:
+    from constrained_decoding import TransactionJsonConstraint, build_token_strings
+
+    token_strings = build_token_strings(tokenizer)  # once per tokenizer
+    constraint = TransactionJsonConstraint(token_strings, prompt_length, tokenizer.eos_token_id)
+    model.generate(..., logits_processor=LogitsProcessorList([constraint]),
+                   stopping_criteria=StoppingCriteriaList([constraint.stopping_criteria()]))
+"""
+
+import re
+from typing import List, Optional, Tuple
+import torch
+from transformers import LogitsProcessor, StoppingCriteria
+
+VALID_CATEGORIES = [
+    "Food", "Fuel", "Rent", "Groceries", "Maintenance", "Phone",
+    "EMI", "Misc", "Delivery", "Freelance", "Salary", "Other"
+]
+VALID_PAYMENT_METHODS = ["UPI", "Cash", "Card", "Bank Transfer", ""]
+
+# Number of highest-scoring tokens checked before scanning the full vocabulary
+TOP_K_CANDIDATES = 64
+
+_NUMBER_PREFIX = re.compile(r'\d{1,12}(\.\d{0,2})?')
+_NUMBER_FULL = re.compile(r'\d{1,12}(\.\d{1,2})?')
+
+
+class _Literal:
+    """Fixed text such as keys and punctuation."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def valid_prefix(self, buffer: str) -> bool:
+        return self.text.startswith(buffer)
+
+    def complete(self, buffer: str) -> bool:
+        return buffer == self.text
+
+
+class _Number:
+    """A non-negative amount with up to two decimals, or null."""
+
+    def valid_prefix(self, buffer: str) -> bool:
+        return "null".startswith(buffer) or _NUMBER_PREFIX.fullmatch(buffer) is not None
+
+    def complete(self, buffer: str) -> bool:
+        return buffer == "null" or _NUMBER_FULL.fullmatch(buffer) is not None
+
+
+class _Enum:
+    """A JSON string restricted to a fixed set of values."""
+
+    def __init__(self, values: List[str]):
+        self.options = [f'"{value}"' for value in values]
+
+    def valid_prefix(self, buffer: str) -> bool:
+        return any(option.startswith(buffer) for option in self.options)
+
+    def complete(self, buffer: str) -> bool:
+        return buffer in self.options
+
+
+class _String:
+    """A JSON string without escapes, bounded in length."""
+
+    def __init__(self, max_length: int):
+        self.prefix = re.compile(r'"[^"\\\x00-\x1f]{0,%d}"?' % max_length)
+        self.full = re.compile(r'"[^"\\\x00-\x1f]{0,%d}"' % max_length)
+
+    def valid_prefix(self, buffer: str) -> bool:
+        return buffer == "" or self.prefix.fullmatch(buffer) is not None
+
+    def complete(self, buffer: str) -> bool:
+        return self.full.fullmatch(buffer) is not None
+
+
+# Field order matches the prompt; description/location are left to the validator
+TRANSACTION_SCHEMA = [
+    _Literal('{"amount": '), _Number(),
+    _Literal(', "transaction_type": '), _Enum(["income", "expense"]),
+    _Literal(', "category": '), _Enum(VALID_CATEGORIES),
+    _Literal(', "merchant_name": '), _String(60),
+    _Literal(', "payment_method": '), _Enum(VALID_PAYMENT_METHODS),
+    _Literal(', "transaction_date": '), _String(10),
+    _Literal(', "transaction_time": '), _String(5),
+    _Literal('}'),
+]
+
+State = Tuple[int, str]
+
+
+def feed(state: Optional[State], text: str, schema=TRANSACTION_SCHEMA) -> Optional[State]:
+    """
+    Advance the schema state by the given text.
+
+    Returns:
+        The new (element index, element buffer) state, or None if the text
+        is not a valid continuation
+    """
+    for char in text:
+        if state is None:
+            return None
+        index, buffer = state
+        while True:
+            if index >= len(schema):
+                return None
+            element = schema[index]
+            if element.valid_prefix(buffer + char):
+                state = (index, buffer + char)
+                break
+            # The element cannot take this char; move on if it is already complete
+            if element.complete(buffer):
+                index, buffer = index + 1, ""
+                continue
+            return None
+    return state
+
+
+def is_finished(state: Optional[State], schema=TRANSACTION_SCHEMA) -> bool:
+    """Return True once the closing brace of the object has been produced."""
+    if state is None:
+        return False
+    index, buffer = state
+    return index == len(schema) - 1 and schema[index].complete(buffer)
+
+
+def build_token_strings(tokenizer) -> List[Optional[str]]:
+    """
+    Decode every vocabulary entry to the text it appends mid-sequence.
+
+    Tokens are decoded after an anchor token so leading spaces survive
+    (decoding a lone SentencePiece token drops them). Special tokens and
+    partial UTF-8 byte tokens map to None and are never allowed.
+    """
+    anchor_id = tokenizer("a", add_special_tokens=False).input_ids[-1]
+    anchor_text = tokenizer.decode([anchor_id])
+    vocab_size = len(tokenizer)
+    decoded = tokenizer.batch_decode(
+        [[anchor_id, token_id] for token_id in range(vocab_size)],
+        clean_up_tokenization_spaces=False
+    )
+
+    special_ids = set(tokenizer.all_special_ids)
+    strings: List[Optional[str]] = []
+    for token_id, text in enumerate(decoded):
+        if token_id in special_ids or not text.startswith(anchor_text):
+            strings.append(None)
+            continue
+        piece = text[len(anchor_text):]
+        strings.append(piece if piece and "\ufffd" not in piece else None)
+    return strings
+
+
+class TransactionJsonConstraint(LogitsProcessor):
+    """Mask logits to tokens that keep the output a valid transaction JSON prefix."""
+
+    def __init__(self, token_strings: List[Optional[str]], prompt_length: int, eos_token_id: int):
+        """
+        Args:
+            token_strings: Output of build_token_strings for the tokenizer
+            prompt_length: Number of prompt tokens (generated tokens follow them)
+            eos_token_id: Forced once the object is complete
+        """
+        self.token_strings = token_strings
+        self.prompt_length = prompt_length
+        self.eos_token_id = eos_token_id
+        self.state: Optional[State] = (0, "")
+        self._consumed = 0
+
+    def _sync(self, input_ids: torch.LongTensor):
+        """Feed tokens generated since the last call into the schema state."""
+        generated = input_ids[0, self.prompt_length:].tolist()
+        for token_id in generated[self._consumed:]:
+            text = self.token_strings[token_id] if token_id < len(self.token_strings) else None
+            self.state = feed(self.state, text) if text else None
+        self._consumed = len(generated)
+
+    def _allowed(self, token_id: int) -> bool:
+        text = self.token_strings[token_id] if token_id < len(self.token_strings) else None
+        return bool(text) and feed(self.state, text) is not None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        if input_ids.shape[0] != 1:
+            raise ValueError("TransactionJsonConstraint supports batch size 1 only")
+        self._sync(input_ids)
+
+        mask = torch.full_like(scores, float("-inf"))
+        if is_finished(self.state) or self.state is None:
+            mask[0, self.eos_token_id] = 0
+            return scores + mask
+
+        top_ids = torch.topk(scores[0], min(TOP_K_CANDIDATES, scores.shape[-1])).indices.tolist()
+        allowed = [token_id for token_id in top_ids if self._allowed(token_id)]
+        if not allowed:
+            allowed = [token_id for token_id in range(scores.shape[-1]) if self._allowed(token_id)]
+        if not allowed:
+            allowed = [self.eos_token_id]
+
+        mask[0, allowed] = 0
+        return scores + mask
+
+    def stopping_criteria(self) -> StoppingCriteria:
+        """Stopping criterion that ends generation as soon as the JSON object closes."""
+        constraint = self
+
+        class _JsonComplete(StoppingCriteria):
+            def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+                constraint._sync(input_ids)
+                done = is_finished(constraint.state)
+                return torch.full((input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device)
+
+        return _JsonComplete()
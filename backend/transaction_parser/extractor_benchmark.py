@@ -0,0 +1,127 @@
+"""
+Extractor Benchmark - Latency, Memory and Field Accuracy per Backend
+====================================================================
+
+Compares the second-tier extractor backends (see extractors.py) on a fixed
+set of texts. The rule-based first tier is bypassed so every sample measures
+the backend itself, so token-classification (merchant and location only)
+scores no amount/type/category matches. Each backend runs in a fresh
+process so load time and peak RSS are isolated.
+
+The dataset is a JSON list of texts with the fields expected from them; a
+small built-in set is used when none is given:
+
+    [{"text": "Paid 1500 for fuel at Indian Oil", "expected": {"amount": 1500, "category": "Fuel"}}]
+
+Usage:
+    python extractor_benchmark.py --backends causal-lm token-classification seq2seq rules
+    python extractor_benchmark.py --dataset texts.json --output extractor_report.json
+"""
+
+import json
+import time
+import argparse
+import multiprocessing
+from typing import Dict, List, Any
+
+from benchmark_utils import field_matches, percentile, peak_rss_mb
+
+SAMPLE_DATASET = [
+    {"text": "I spent 500 rupees on food at McDonald's today",
+     "expected": {"amount": 500, "transaction_type": "expense", "category": "Food"}},
+    {"text": "Received 2000 from Uber delivery",
+     "expected": {"amount": 2000, "transaction_type": "income", "category": "Delivery"}},
+    {"text": "Paid 1500 for fuel at Indian Oil",
+     "expected": {"amount": 1500, "transaction_type": "expense", "category": "Fuel"}},
+    {"text": "Bought groceries worth 800 rupees from Big Bazaar",
+     "expected": {"amount": 800, "transaction_type": "expense", "category": "Groceries"}},
+    {"text": "₹1200 debited from account for rent payment",
+     "expected": {"amount": 1200, "transaction_type": "expense", "category": "Rent"}},
+    {"text": "DMART\nMilk 45.00\nBread 30.00\nTotal 75.00\n12/03/2024",
+     "expected": {"amount": 75, "category": "Groceries", "transaction_date": "2024-03-12"}},
+    {"text": "Swiggy payout credited 3450 for this week",
+     "expected": {"amount": 3450, "transaction_type": "income", "category": "Delivery"}},
+    {"text": "Puncture repair 150 cash",
+     "expected": {"amount": 150, "category": "Maintenance", "payment_method": "Cash"}},
+]
+
+
+def _run_backend(backend: str, dataset: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Benchmark one backend (in a child process)."""
+    from transaction_parser import TransactionParser
+
+    parser = TransactionParser(extractor=backend)
+
+    start = time.perf_counter()
+    parser.extractor.load()
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    matched = 0
+    total = 0
+    failures = 0
+    for item in dataset:
+        start = time.perf_counter()
+        try:
+            fields = parser.extractor.extract(item["text"])
+            result = parser._validate_and_clean_transaction(fields, item["text"])
+        except Exception as e:
+            print(f"[{backend}] extraction failed: {e}")
+            failures += 1
+            result = {}
+        latencies.append(time.perf_counter() - start)
+
+        for field, expected in item.get("expected", {}).items():
+            total += 1
+            if field_matches(expected, result.get(field)):
+                matched += 1
+
+    return {
+        "backend": backend,
+        "samples": len(dataset),
+        "failures": failures,
+        "load_seconds": round(load_seconds, 3),
+        "field_accuracy": round(matched / total, 4) if total else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare extractor backends")
+    arg_parser.add_argument("--backends", nargs="+", default=["causal-lm", "token-classification", "seq2seq", "rules"])
+    arg_parser.add_argument("--dataset", help="JSON list of {text, expected} samples (default: built-in set)")
+    arg_parser.add_argument("--output", help="Write the JSON report to this file")
+    args = arg_parser.parse_args()
+
+    dataset = SAMPLE_DATASET
+    if args.dataset:
+        with open(args.dataset) as f:
+            dataset = json.load(f)
+
+    # Spawn (not fork) so each backend starts from a clean process
+    context = multiprocessing.get_context("spawn")
+    reports = []
+    for backend in args.backends:
+        print(f"\n--- Benchmarking extractor: {backend} ---")
+        with context.Pool(1) as pool:
+            reports.append(pool.apply(_run_backend, (backend, dataset)))
+
+    print("\n" + "=" * 80)
+    print(f"{'backend':<22} {'accuracy':>9} {'p50 (ms)':>10} {'p95 (ms)':>10} {'load (s)':>9} {'RSS (MB)':>10}")
+    print("-" * 80)
+    for report in reports:
+        accuracy = report["field_accuracy"] if report["field_accuracy"] is not None else float("nan")
+        print(f"{report['backend']:<22} {accuracy:>9.2%} {report['p50_ms']:>10.2f} {report['p95_ms']:>10.2f} "
+              f"{report['load_seconds']:>9.2f} {report['peak_rss_mb']:>10.1f}")
+    print("=" * 80)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
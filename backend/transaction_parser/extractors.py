@@ -0,0 +1,237 @@
+"""
+Extractor Backends - Pluggable Field Extraction
+===============================================
+
+Second tier of the extraction pipeline, used when the rule-based extractor
+is not confident. Every backend turns OCR/ASR text into a (possibly partial)
+dictionary of raw transaction fields; TransactionParser validates the result
+and merges it with the rule-based fields.
+
+Backends:
+    causal-lm             Phi-3-mini (Phi-2 fallback) JSON generation (default)
+    token-classification  Small NER tagger; fills merchant_name and location
+                          only, amount/type/category stay with the rules
+    seq2seq               Small text-to-text model (e.g. Flan-T5)
+    rules                 Rule-based extractor only, never loads a model
+
+Select with the EXTRACTOR_BACKEND env var or TransactionParser(extractor=...).
+
+Usage:
+    extractor = create_extractor("token-classification", parser)
+    fields = extractor.extract("Paid 450 at Cafe Coffee Day on 2024-03-02")
+"""
+
+import os
+import re
+from typing import Dict, Any
+from rule_extractor import extract_transaction
+
+HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN", None)
+
+NER_MODEL_NAME = os.getenv("EXTRACTOR_NER_MODEL", "dslim/bert-base-NER")
+SEQ2SEQ_MODEL_NAME = os.getenv("EXTRACTOR_SEQ2SEQ_MODEL", "google/flan-t5-small")
+
+# Entity labels mapped to transaction fields. Generic NER models (PER/ORG/LOC/MISC)
+# have no labels for amount, type or category, so the tagger only names the
+# merchant and place; the rule-based fields are kept for everything else.
+NER_LABEL_FIELDS = {
+    "ORG": "merchant_name",
+    "MERCHANT": "merchant_name",
+    "LOC": "location",
+}
+
+SEQ2SEQ_PROMPT = (
+    "Extract the transaction from the text. Answer as 'amount: <number>; "
+    "type: <income or expense>; category: <Food, Fuel, Rent, Groceries, Maintenance, "
+    "Phone, EMI, Misc, Delivery, Freelance, Salary or Other>; merchant: <name>; "
+    "date: <YYYY-MM-DD>'.\nText: {text}"
+)
+
+SEQ2SEQ_KEY_FIELDS = {
+    "amount": "amount",
+    "type": "transaction_type",
+    "category": "category",
+    "merchant": "merchant_name",
+    "date": "transaction_date",
+}
+
+VALID_CATEGORIES = [
+    "Food", "Fuel", "Rent", "Groceries", "Maintenance", "Phone",
+    "EMI", "Misc", "Delivery", "Freelance", "Salary", "Other"
+]
+_CATEGORY_LOOKUP = {category.lower(): category for category in VALID_CATEGORIES}
+
+_AMOUNT = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def _parse_amount(text: str):
+    """Pull a float out of an entity/answer such as 'Rs. 1,200.50'."""
+    match = _AMOUNT.search(text)
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _normalize_category(text: str) -> str:
+    """Map a model's category answer onto the canonical spelling ('fuel' -> 'Fuel')."""
+    return _CATEGORY_LOOKUP.get(text.strip().lower(), "")
+
+
+class ExtractorBackend:
+    """Interface for second-tier field extractors."""
+
+    name = "base"
+
+    def load(self):
+        """Load model weights (called lazily before the first extract)."""
+
+    def warmup(self):
+        """Run a throwaway extraction so the first request skips lazy init."""
+        self.extract("spent 10 on tea")
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        """
+        Extract raw transaction fields from text.
+
+        Returns:
+            Dictionary with any subset of the transaction fields; raises on
+            failure so the parser can fall back to the rules result
+        """
+        raise NotImplementedError
+
+
+class RulesExtractor(ExtractorBackend):
+    """Rule-based extraction only; no model is loaded."""
+
+    name = "rules"
+
+    def __init__(self, parser=None):
+        self.parser = parser
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        result = extract_transaction(text)
+        result.pop("field_confidence", None)
+        return result
+
+
+class CausalLMExtractor(ExtractorBackend):
+    """Phi-3-mini JSON generation, run through the parser's LLM machinery."""
+
+    name = "causal-lm"
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def load(self):
+        self.parser._load_llm_models()
+
+    def warmup(self):
+        self.parser._warmup_llm()
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        return self.parser._generate_fields(text)
+
+
+class TokenClassificationExtractor(ExtractorBackend):
+    """Tag the merchant and location with a small token-classification model (~100M params)."""
+
+    name = "token-classification"
+
+    def __init__(self, parser, model_name: str = NER_MODEL_NAME):
+        self.parser = parser
+        self.model_name = model_name
+        self.pipeline = None
+
+    def load(self):
+        if self.pipeline is None:
+            from transformers import pipeline
+            print(f"Loading token-classification extractor ({self.model_name})...")
+            self.pipeline = pipeline(
+                "token-classification",
+                model=self.model_name,
+                aggregation_strategy="simple",
+                device=0 if self.parser.device == "cuda" else -1,
+                token=HF_TOKEN
+            )
+            labels = {label.upper().split("-")[-1] for label in self.pipeline.model.config.id2label.values()}
+            if not labels & set(NER_LABEL_FIELDS):
+                raise ValueError(
+                    f"{self.model_name} has none of the entity labels {sorted(NER_LABEL_FIELDS)} "
+                    f"(its labels: {sorted(labels)})"
+                )
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        self.load()
+        fields: Dict[str, Any] = {}
+        best_scores: Dict[str, float] = {}
+
+        for entity in self.pipeline(text):
+            label = entity["entity_group"].upper().split("-")[-1]
+            field = NER_LABEL_FIELDS.get(label)
+            if field is None or entity["score"] <= best_scores.get(field, 0.0):
+                continue
+            fields[field] = entity["word"].strip()
+            best_scores[field] = entity["score"]
+
+        return fields
+
+
+class Seq2SeqExtractor(ExtractorBackend):
+    """Generate 'key: value' pairs with a small text-to-text model."""
+
+    name = "seq2seq"
+
+    def __init__(self, parser, model_name: str = SEQ2SEQ_MODEL_NAME):
+        self.parser = parser
+        self.model_name = model_name
+        self.pipeline = None
+
+    def load(self):
+        if self.pipeline is None:
+            from transformers import pipeline
+            print(f"Loading seq2seq extractor ({self.model_name})...")
+            self.pipeline = pipeline(
+                "text2text-generation",
+                model=self.model_name,
+                device=0 if self.parser.device == "cuda" else -1,
+                token=HF_TOKEN
+            )
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        self.load()
+        answer = self.pipeline(SEQ2SEQ_PROMPT.format(text=text), max_new_tokens=64)[0]["generated_text"]
+
+        fields: Dict[str, Any] = {}
+        for key, value in re.findall(r'(\w+)\s*:\s*([^;\n]+)', answer):
+            field = SEQ2SEQ_KEY_FIELDS.get(key.lower())
+            if field is None:
+                continue
+            value = value.strip()
+            if field == "amount":
+                value = _parse_amount(value)
+            elif field == "transaction_type":
+                value = value.lower()
+            elif field == "category":
+                value = _normalize_category(value)
+            if value:
+                fields[field] = value
+
+        return fields
+
+
+EXTRACTOR_BACKENDS = {
+    "causal-lm": CausalLMExtractor,
+    "token-classification": TokenClassificationExtractor,
+    "seq2seq": Seq2SeqExtractor,
+    "rules": RulesExtractor,
+}
+
+
+def create_extractor(name: str, parser) -> ExtractorBackend:
+    """Instantiate an extractor backend by name."""
+    if name not in EXTRACTOR_BACKENDS:
+        raise ValueError(f"Unknown extractor backend '{name}', expected one of {list(EXTRACTOR_BACKENDS)}")
+    return EXTRACTOR_BACKENDS[name](parser)
@@ -0,0 +1,167 @@
+"""
+Fake Inference API Server - Offline Stand-in for Load Testing
+=============================================================
+
+Speaks the request/response shapes transaction_parser_inference_api.py uses
+against api-inference.huggingface.co, so the Inference API parser and its
+server can be benchmarked offline and in CI:
+
+    POST /models/microsoft/trocr-base-printed       {"inputs": "<base64 image>"}
+        -> [{"generated_text": "..."}]
+    POST /models/openai/whisper-small               <raw audio bytes>
+        -> {"text": "..."}
+    POST /models/microsoft/Phi-3-mini-4k-instruct   {"inputs": "<prompt>", "parameters": {...}}
+        -> [{"generated_text": "{\"amount\": ...}"}]
+
+Behaviour is configurable per run:
+    - latency: lognormal around a per-model median; sigma sets the tail
+    - cold start: like the real API, a model starts "loading" on its first
+      request and answers 503 {"error": "... loading", "estimated_time": N}
+      until COLD_START seconds have passed
+    - error rate: fraction of requests answered with 500 / 503
+
+Point the parser at it with HF_API_BASE:
+
+    python fake_inference_server.py --port 8900 --median-ms 300 --cold-start 5 --error-rate 0.02
+    HF_API_BASE=http://localhost:8900/models uvicorn simple_api_server_inference:app --port 8000
+"""
+
+import os
+import re
+import json
+import time
+import base64
+import random
+import asyncio
+import argparse
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+# Latency per model call: lognormal with this median and spread (sigma)
+FAKE_MEDIAN_MS = float(os.getenv("FAKE_MEDIAN_MS", "250"))
+FAKE_LATENCY_SIGMA = float(os.getenv("FAKE_LATENCY_SIGMA", "0.5"))
+# Seconds after its first request during which each model answers 503 "loading"
+FAKE_COLD_START_SECONDS = float(os.getenv("FAKE_COLD_START_SECONDS", "0"))
+# Fraction of requests failed with a 500 (half) or 503 (half)
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+# Per-model latency multipliers, roughly matching relative model cost
+MODEL_COST = {
+    "microsoft/trocr-base-printed": 1.0,
+    "openai/whisper-small": 2.0,
+    "microsoft/Phi-3-mini-4k-instruct": 4.0,
+}
+
+RECEIPT_TEXTS = [
+    "DMART\nMilk 45.00\nBread 30.00\nTotal 75.00",
+    "INDIAN OIL PETROL PUMP\nPetrol 1500.00\nPaid by UPI",
+    "CAFE COFFEE DAY\nCappuccino 180.00\nTotal Rs. 180",
+]
+VOICE_TEXTS = [
+    "I spent 500 rupees on food at McDonald's today",
+    "Received 2000 from Uber delivery",
+    "Paid 1500 for fuel at Indian Oil",
+]
+
+app = FastAPI()
+# When each model was first requested (its simulated load start)
+load_started: Dict[str, float] = {}
+stats: Dict[str, int] = {"requests": 0, "cold_start_503": 0, "injected_errors": 0}
+
+
+def _latency(model: str) -> float:
+    """Sample one call's latency in seconds."""
+    median = FAKE_MEDIAN_MS / 1000 * MODEL_COST.get(model, 1.0)
+    return random.lognormvariate(0, FAKE_LATENCY_SIGMA) * median
+
+
+def _pick(texts, payload: bytes) -> str:
+    """Deterministic choice per input, so repeated uploads get the same answer."""
+    return texts[sum(payload[:64]) % len(texts)]
+
+
+def _llm_answer(prompt: str) -> str:
+    """Build a plausible JSON answer from the text embedded in the prompt."""
+    match = re.search(r"Text: (.*?)\n\nReturn ONLY", prompt, re.DOTALL)
+    text = match.group(1) if match else prompt
+    amount = re.search(r"\d+(?:\.\d{1,2})?", text)
+    income = any(word in text.lower() for word in ("received", "credited", "salary", "payout"))
+    return json.dumps({
+        "amount": float(amount.group(0)) if amount else None,
+        "transaction_type": "income" if income else "expense",
+        "category": "Other",
+        "merchant_name": "",
+        "payment_method": "",
+        "transaction_date": time.strftime("%Y-%m-%d"),
+        "transaction_time": time.strftime("%H:%M"),
+    })
+
+
+@app.get("/stats")
+def get_stats():
+    """Request counters (for asserting retry behaviour in load tests)."""
+    return stats
+
+
+@app.post("/models/{model:path}")
+async def infer(model: str, request: Request):
+    """Answer like the Inference API would for the given model."""
+    stats["requests"] += 1
+    body = await request.body()
+
+    started = load_started.setdefault(model, time.monotonic())
+    cold_left = FAKE_COLD_START_SECONDS - (time.monotonic() - started)
+    if cold_left > 0:
+        stats["cold_start_503"] += 1
+        return JSONResponse(status_code=503, content={
+            "error": f"Model {model} is currently loading",
+            "estimated_time": round(cold_left, 1),
+        })
+
+    if random.random() < FAKE_ERROR_RATE:
+        stats["injected_errors"] += 1
+        if random.random() < 0.5:
+            return JSONResponse(status_code=500, content={"error": "Internal server error"})
+        return JSONResponse(status_code=503, content={"error": "Service unavailable", "estimated_time": 1.0})
+
+    await asyncio.sleep(_latency(model))
+
+    if model == "openai/whisper-small":
+        return {"text": _pick(VOICE_TEXTS, body)}
+
+    payload: Any = json.loads(body or b"{}")
+    inputs = payload.get("inputs", "") if isinstance(payload, dict) else ""
+    if "trocr" in model:
+        image = base64.b64decode(inputs) if inputs else b""
+        return [{"generated_text": _pick(RECEIPT_TEXTS, image)}]
+    return [{"generated_text": _llm_answer(inputs)}]
+
+
+def main():
+    global FAKE_MEDIAN_MS, FAKE_LATENCY_SIGMA, FAKE_COLD_START_SECONDS, FAKE_ERROR_RATE
+
+    arg_parser = argparse.ArgumentParser(description="Fake Hugging Face Inference API server")
+    arg_parser.add_argument("--port", type=int, default=8900)
+    arg_parser.add_argument("--median-ms", type=float, default=FAKE_MEDIAN_MS)
+    arg_parser.add_argument("--sigma", type=float, default=FAKE_LATENCY_SIGMA, help="Lognormal spread of latency")
+    arg_parser.add_argument("--cold-start", type=float, default=FAKE_COLD_START_SECONDS,
+                            help="Seconds of 503 'model loading' after a model's first request")
+    arg_parser.add_argument("--error-rate", type=float, default=FAKE_ERROR_RATE)
+    args = arg_parser.parse_args()
+
+    FAKE_MEDIAN_MS = args.median_ms
+    FAKE_LATENCY_SIGMA = args.sigma
+    FAKE_COLD_START_SECONDS = args.cold_start
+    FAKE_ERROR_RATE = args.error_rate
+
+    print(f"Fake Inference API on http://localhost:{args.port}/models "
+          f"(median {FAKE_MEDIAN_MS:g} ms, sigma {FAKE_LATENCY_SIGMA:g}, "
+          f"cold start {FAKE_COLD_START_SECONDS:g}s, error rate {FAKE_ERROR_RATE:.1%})")
+    print(f"Use with: HF_API_BASE=http://localhost:{args.port}/models")
+    uvicorn.run(app, host="0.0.0.0", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Hybrid Router - Local/Remote Inference with Hedged Requests
+===========================================================
+
+The local parser (transaction_parser.py, torch on this machine) and the
+Inference API parser (transaction_parser_inference_api.py) fail and slow
+down independently: local latency grows with its queue, the remote API has
+cold starts and rate limits. HybridParser routes each stage separately:
+
+    ocr  image bytes -> text
+    asr  audio bytes -> text
+    llm  text -> transaction fields from the LLM (rules and the user's
+         merchant index run first, locally, and skip it when possible)
+
+For every stage call it picks the backend with the lowest expected latency
+(observed p50 scaled by its current queue depth). If the call is still
+running after that backend's observed p95, a hedged copy is sent to the
+other backend and whichever answers first wins. A failure falls back to the
+other backend straight away, and a backend that keeps failing is skipped
+for a cooldown period. Only when both backends fail does the llm stage fall
+back to the rules-only result (which is then not cached).
+
+Usage:
+    router = HybridParser(TransactionParser(), InferenceApiParser())
+    result = router.parse_image("receipt.jpg")
+    print(router.stats())
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from uploads import UploadSource, read_upload, describe_upload
+from result_cache import mark_uncacheable
+from parser_metrics import METRICS
+
+STAGES = ("ocr", "asr", "llm")
+
+# Hedge after this long while a backend has too few samples for a p95
+HEDGE_DEFAULT_SECONDS = float(os.getenv("ROUTER_HEDGE_DEFAULT_SECONDS", "5"))
+# Never hedge sooner than this, so fast calls don't double the load
+HEDGE_MIN_SECONDS = float(os.getenv("ROUTER_HEDGE_MIN_SECONDS", "0.2"))
+# Latency samples kept per backend and stage
+LATENCY_WINDOW = 200
+MIN_SAMPLES_FOR_P95 = 20
+# Consecutive failures before a backend is skipped, and for how long (seconds)
+FAILURE_THRESHOLD = 3
+FAILURE_COOLDOWN_SECONDS = float(os.getenv("ROUTER_FAILURE_COOLDOWN_SECONDS", "30"))
+# Latency assumed before the first sample; the local side is preferred on ties
+PRIOR_SECONDS = {"local": 1.0, "remote": 2.0}
+
+
+class _BackendStage:
+    """Live latency, queue depth and health of one backend for one stage."""
+
+    def __init__(self, name: str, concurrency: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.in_flight = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.failures = 0
+        self.down_until = 0.0
+        self.calls = 0
+        self.wins = 0
+        self.errors = 0
+
+    def _quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def expected_seconds(self) -> float:
+        """Typical latency scaled by how many calls are queued ahead."""
+        p50 = self._quantile(0.5) or PRIOR_SECONDS.get(self.name, 1.0)
+        return p50 * (1 + self.in_flight / self.concurrency)
+
+    def hedge_after(self) -> float:
+        if len(self.latencies) < MIN_SAMPLES_FOR_P95:
+            return HEDGE_DEFAULT_SECONDS
+        return max(HEDGE_MIN_SECONDS, self._quantile(0.95))
+
+    def record(self, seconds: Optional[float]):
+        """Record a finished call; None marks a failure."""
+        if seconds is None:
+            self.errors += 1
+            self.failures += 1
+            if self.failures >= FAILURE_THRESHOLD:
+                self.down_until = time.monotonic() + FAILURE_COOLDOWN_SECONDS
+                print(f"Router: {self.name} failing, skipping it for {FAILURE_COOLDOWN_SECONDS:.0f}s")
+        else:
+            self.latencies.append(seconds)
+            self.failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy(),
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "wins": self.wins,
+            "errors": self.errors,
+            "p50_seconds": round(self._quantile(0.5) or 0.0, 3),
+            "p95_seconds": round(self._quantile(0.95) or 0.0, 3),
+        }
+
+
+class HybridParser:
+    """Route OCR, ASR and LLM stages between a local and a remote parser."""
+
+    def __init__(
+        self,
+        local,
+        remote,
+        local_executor: Optional[ThreadPoolExecutor] = None,
+        remote_concurrency: int = 8,
+        hedging: bool = True
+    ):
+        """
+        Args:
+            local: transaction_parser.TransactionParser
+            remote: transaction_parser_inference_api.TransactionParser
+            local_executor: Executor running local model calls (default: one
+                dedicated thread, since local models run one call at a time)
+            remote_concurrency: Remote calls in flight at once
+            hedging: Send a hedged copy to the other backend after p95
+        """
+        self.local = local
+        self.remote = remote
+        self.hedging = hedging
+        self.cache = local.cache
+        self.fingerprint = f"hybrid|{local.fingerprint}|{remote.fingerprint}"
+
+        self._executors = {
+            "local": local_executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="router-local"),
+            "remote": ThreadPoolExecutor(max_workers=remote_concurrency, thread_name_prefix="router-remote"),
+        }
+        # A caller-provided local executor is shared (e.g. the server's model thread), not ours to stop
+        self._owned = ["remote"] if local_executor else ["local", "remote"]
+        self._stages = {
+            stage: {
+                "local": _BackendStage("local", 1),
+                "remote": _BackendStage("remote", remote_concurrency),
+            }
+            for stage in STAGES
+        }
+        self._lock = threading.Lock()
+        self._hedges = 0
+
+        # Stage implementations per backend
+        self._calls: Dict[str, Dict[str, Callable[[Any], Any]]] = {
+            "ocr": {
+                "local": lambda data: local._extract_text_from_images([local._decode_image(data)])[0],
+                "remote": remote._extract_text_from_image,
+            },
+            "asr": {
+                "local": lambda data: local._transcribe_audios([local._decode_audio(data)])[0],
+                "remote": remote._transcribe_audio,
+            },
+            # (text, rules_result) pairs; raises on model/API failure so the router can fall back
+            "llm": {
+                "local": lambda args: local._llm_extract(*args),
+                "remote": lambda args: remote._llm_extract(*args),
+            },
+        }
+
+    def _order(self, stage: str) -> List[str]:
+        """Backends for a stage, best first; unhealthy ones go last."""
+        backends = self._stages[stage]
+        return sorted(backends, key=lambda name: (not backends[name].healthy(), backends[name].expected_seconds()))
+
+    def _submit(self, stage: str, name: str, arg: Any) -> Future:
+        backend = self._stages[stage][name]
+        with self._lock:
+            backend.in_flight += 1
+            backend.calls += 1
+        call = self._calls[stage][name]
+
+        def run():
+            start = time.perf_counter()
+            try:
+                result = call(arg)
+            except Exception:
+                with self._lock:
+                    backend.record(None)
+                raise
+            else:
+                with self._lock:
+                    backend.record(time.perf_counter() - start)
+                return result
+            finally:
+                with self._lock:
+                    backend.in_flight -= 1
+
+        future = self._executors[name].submit(run)
+        future.backend = name
+        return future
+
+    def run_stage(self, stage: str, arg: Any) -> Any:
+        """
+        Run one stage on the best backend, hedging and falling back as needed.
+
+        Raises the last error only if both backends fail.
+        """
+        primary, secondary = self._order(stage)
+        pending = {self._submit(stage, primary, arg)}
+        hedge_at = time.monotonic() + self._stages[stage][primary].hedge_after()
+        spare = secondary
+        error = None
+
+        while pending:
+            timeout = None
+            if spare is not None and self.hedging:
+                timeout = max(0.0, hedge_at - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is None:
+                    with self._lock:
+                        self._stages[stage][future.backend].wins += 1
+                    # The losing copy (if any) finishes in the background and is discarded
+                    return future.result()
+                error = future.exception()
+                print(f"Router: {stage} failed on {future.backend}: {error}")
+
+            if spare is not None and (not pending or time.monotonic() >= hedge_at):
+                # Fallback after a failure, or hedge after the primary's p95
+                if pending:
+                    with self._lock:
+                        self._hedges += 1
+                pending.add(self._submit(stage, spare, arg))
+                spare = None
+
+        raise error
+
+    def _extract(self, text: str, user_id: Optional[str]) -> Dict[str, Any]:
+        """Rules and merchant index locally, then the llm stage on the best backend."""
+        rules_result, final = self.local._rules_tiers(text, user_id)
+        if final:
+            return rules_result
+        try:
+            return self.run_stage("llm", (text, rules_result))
+        except Exception as e:
+            print(f"Router: llm failed on both backends, using rules only: {e}")
+            METRICS.count("parser_extraction_total", parser="hybrid", path="fallback_error")
+            return mark_uncacheable(rules_result)
+
+    def _parse(self, source: UploadSource, kind: str, stage: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Shared parse flow for images and voice notes."""
+        noun = "image" if kind == "image" else "audio"
+        try:
+            print(f"Processing {noun}: {describe_upload(source)}")
+            data = read_upload(source)
+
+            fingerprint = self.fingerprint
+            if user_id and self.local.merchant_index is not None:
+                # Same scoping as TransactionParser._cache_key: per user and index version
+                fingerprint = f"{fingerprint}|user={user_id}@{self.local.merchant_index.version(user_id)}"
+            cache_key = self.cache.make_key(data, kind, fingerprint) if self.cache is not None else None
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+            text = self.run_stage(stage, data)
+            if not text or len(text.strip()) < 5:
+                if kind == "image":
+                    message = "Could not extract sufficient text from image. Please ensure the image is clear and contains readable text."
+                else:
+                    message = "Could not transcribe audio. Please ensure the recording is clear."
+                return {"error": message, "confidence": 0.0}
+
+            transaction_data = self._extract(text, user_id)
+            self.local._cache_result(cache_key, transaction_data)
+            return transaction_data
+
+        except Exception as e:
+            print(f"Error parsing {noun}: {e}")
+            return {
+                "error": f"Failed to process {noun}: {str(e)}",
+                "confidence": 0.0
+            }
+
+    def parse_image(self, image: UploadSource, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Parse a receipt/bill image (same result format as TransactionParser.parse_image)."""
+        return self._parse(image, "image", "ocr", user_id)
+
+    def parse_voice(self, audio: UploadSource, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Parse a voice recording (same result format as TransactionParser.parse_voice)."""
+        return self._parse(audio, "voice", "asr", user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage backend latency, queue depth, wins and errors, plus the hedge count."""
+        with self._lock:
+            return {
+                "hedging": self.hedging,
+                "hedges": self._hedges,
+                "stages": {
+                    stage: {name: backend.stats() for name, backend in backends.items()}
+                    for stage, backends in self._stages.items()
+                },
+            }
+
+    def shutdown(self):
+        """Stop the router's own executors."""
+        for name in self._owned:
+            self._executors[name].shutdown(wait=False)
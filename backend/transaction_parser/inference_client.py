@@ -0,0 +1,200 @@
+"""
+Inference Client - Pooled HTTP Client for the Hugging Face Inference API
+========================================================================
+
+A fresh requests.post per call pays a TCP + TLS handshake every time, gives
+up on the 503 the Inference API returns while a model is loading, and
+blocks the event loop when called from FastAPI. This module provides:
+
+    InferenceClient       requests.Session with a keep-alive connection pool
+    AsyncInferenceClient  httpx.AsyncClient variant the servers can await
+
+Both bound the number of concurrent requests and retry 503/429/502/504 and
+connection errors with jittered exponential backoff, honouring the API's
+`estimated_time` / Retry-After hints.
+
+Usage:
+    client = InferenceClient("https://api-inference.huggingface.co/models", headers)
+    result = client.post("openai/whisper-small", data=audio_bytes)
+
+    async_client = AsyncInferenceClient(base_url, headers)
+    result = await async_client.post("microsoft/trocr-base-printed", json={"inputs": b64})
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Keep-alive connections kept per host
+INFERENCE_POOL_SIZE = int(os.getenv("INFERENCE_POOL_SIZE", "16"))
+# Requests allowed in flight at once per client
+INFERENCE_MAX_CONCURRENCY = int(os.getenv("INFERENCE_MAX_CONCURRENCY", "8"))
+# Retries after the first attempt for retryable failures
+INFERENCE_MAX_RETRIES = int(os.getenv("INFERENCE_MAX_RETRIES", "4"))
+# Backoff: full jitter over min(BACKOFF_MAX, BACKOFF_BASE * 2^attempt) seconds
+INFERENCE_BACKOFF_BASE = float(os.getenv("INFERENCE_BACKOFF_BASE", "0.5"))
+INFERENCE_BACKOFF_MAX = float(os.getenv("INFERENCE_BACKOFF_MAX", "20"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "60"))
+
+# 503: model loading, 429: rate limited, 502/504: gateway hiccups
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def retry_delay(attempt: int, status: Optional[int] = None, headers=None, body: Any = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+
+    Uses full jitter so many clients hitting the same cold model don't retry
+    in lockstep; a Retry-After header or the 503 `estimated_time` raises the
+    lower bound.
+    """
+    delay = random.uniform(0, min(INFERENCE_BACKOFF_MAX, INFERENCE_BACKOFF_BASE * 2 ** attempt))
+
+    hint = None
+    if headers is not None and headers.get("Retry-After"):
+        try:
+            hint = float(headers["Retry-After"])
+        except ValueError:
+            hint = None
+    if hint is None and status == 503 and isinstance(body, dict):
+        hint = body.get("estimated_time")
+    if isinstance(hint, (int, float)):
+        delay = max(delay, min(float(hint), INFERENCE_BACKOFF_MAX))
+    return delay
+
+
+def _json_or_none(response) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+class InferenceClient:
+    """Blocking Inference API client with connection pooling and retries."""
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        pool_size: int = INFERENCE_POOL_SIZE,
+        max_concurrency: int = INFERENCE_MAX_CONCURRENCY,
+        max_retries: int = INFERENCE_MAX_RETRIES,
+        timeout: float = INFERENCE_TIMEOUT
+    ):
+        """
+        Args:
+            base_url: API root, e.g. https://api-inference.huggingface.co/models
+                or a local stub server
+            headers: Sent with every request (Authorization)
+            pool_size: Keep-alive connections kept per host
+            max_concurrency: Requests in flight at once; further callers wait
+            max_retries: Retries for retryable statuses and connection errors
+            timeout: Default per-request timeout (seconds)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(headers or {})
+
+    def post(self, path: str, json: Any = None, data: Optional[bytes] = None,
+             params: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> Any:
+        """POST to base_url/path and return the decoded JSON response."""
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        with self._slots:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = self.session.post(url, json=json, data=data, params=params,
+                                                 timeout=timeout or self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = retry_delay(attempt)
+                    print(f"API connection error ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    delay = retry_delay(attempt, response.status_code, response.headers, _json_or_none(response))
+                    print(f"API returned {response.status_code} for {path}, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+
+                response.raise_for_status()
+                return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncInferenceClient:
+    """httpx.AsyncClient-based Inference API client for use inside the event loop."""
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        pool_size: int = INFERENCE_POOL_SIZE,
+        max_concurrency: int = INFERENCE_MAX_CONCURRENCY,
+        max_retries: int = INFERENCE_MAX_RETRIES,
+        timeout: float = INFERENCE_TIMEOUT
+    ):
+        """Same arguments as InferenceClient."""
+        import httpx
+
+        self._httpx = httpx
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.client = httpx.AsyncClient(
+            headers=headers or {},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=timeout
+        )
+
+    async def post(self, path: str, json: Any = None, data: Optional[bytes] = None,
+                   params: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> Any:
+        """POST to base_url/path and return the decoded JSON response."""
+        # Created lazily so the semaphore binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        async with self._slots:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await self.client.post(url, json=json, content=data, params=params,
+                                                      timeout=timeout or self.timeout)
+                except (self._httpx.ConnectError, self._httpx.TimeoutException) as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = retry_delay(attempt)
+                    print(f"API connection error ({e}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    delay = retry_delay(attempt, response.status_code, response.headers, _json_or_none(response))
+                    print(f"API returned {response.status_code} for {path}, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                response.raise_for_status()
+                return response.json()
+
+    async def aclose(self):
+        await self.client.aclose()
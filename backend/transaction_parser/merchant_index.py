@@ -0,0 +1,347 @@
+"""
+Merchant Index - Per-user Merchant Profiles from Verified Transactions
+======================================================================
+
+Gig workers hit the same dozen merchants over and over, and once a user has
+verified a transaction from a merchant its category is known. This index
+keeps, per user and normalized merchant key:
+
+    - category, transaction type and payment method counts
+    - the amount range seen so far
+
+TransactionParser consults it after the rule-based tier and before the LLM:
+a known merchant found in the OCR/ASR text fills category (and type,
+payment method) from the user's own history, so most repeat receipts
+resolve without any model call.
+
+The index is updated incrementally on each verified transaction (rows of
+the `transactions` table with verified = true) and persisted in SQLite.
+Other processes sharing the file (forked parser workers) pick up changes on
+their next lookup.
+
+Usage:
+    index = MerchantIndex()
+    index.record("user-1", {"merchant_name": "DMart", "category": "Groceries",
+                            "amount": 845.0, "payment_method": "UPI", "verified": True})
+    profile = index.lookup("user-1", "DMART\\nMilk 45.00\\nTotal 845.00")
+"""
+
+import os
+import re
+import copy
+import json
+import sqlite3
+import argparse
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rule_extractor import KeywordAutomaton, REQUIRED_FIELDS, CONFIDENCE_THRESHOLD
+
+DEFAULT_INDEX_PATH = os.path.expanduser("~/.cache/agente/merchant_index.sqlite")
+
+# Share of a merchant's verified transactions a category needs to be trusted
+DOMINANT_SHARE = float(os.getenv("MERCHANT_INDEX_DOMINANT_SHARE", "0.75"))
+# Amounts within [min / SLACK, max * SLACK] of the merchant's history count as typical
+AMOUNT_RANGE_SLACK = 2.0
+# Shorter keys match too much text by accident
+MIN_KEY_LENGTH = 3
+# Seconds a writer waits for another process's write transaction
+DISK_BUSY_TIMEOUT = 5.0
+
+# Legal/store suffixes that vary between receipts of the same merchant
+_STOP_WORDS = {"the", "pvt", "private", "ltd", "limited", "llp", "inc", "co", "store", "stores", "shop"}
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def _tokens(text: str) -> List[str]:
+    return _NON_ALNUM.sub(" ", text.lower()).split()
+
+
+def normalize_merchant(name: str) -> str:
+    """Merchant key: lowercase words without punctuation or legal/store suffixes."""
+    key = " ".join(token for token in _tokens(name or "") if token not in _STOP_WORDS)
+    return key if len(key) >= MIN_KEY_LENGTH else ""
+
+
+def _dominant(counts: Dict[str, int]) -> Optional[str]:
+    """Most frequent value if it has at least DOMINANT_SHARE of the counts."""
+    if not counts:
+        return None
+    value = max(counts, key=counts.get)
+    return value if counts[value] / sum(counts.values()) >= DOMINANT_SHARE else None
+
+
+def _new_profile(name: str) -> Dict[str, Any]:
+    return {"name": name, "count": 0, "categories": {}, "types": {}, "payment_methods": {},
+            "amount_min": None, "amount_max": None}
+
+
+class MerchantIndex:
+    """Per-user merchant -> category/payment/amount index (memory + SQLite)."""
+
+    def __init__(self, disk_path: Optional[str] = DEFAULT_INDEX_PATH):
+        """
+        Args:
+            disk_path: SQLite file shared across restarts and worker
+                processes, or None for memory only
+        """
+        self.disk_path = disk_path
+        self._profiles: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+        self._matchers: Dict[str, KeywordAutomaton] = {}
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "records": 0}
+        self._seq = 0
+        # Per user: sequence number of their latest change (see version())
+        self._versions: Dict[str, int] = {}
+        self._data_version = None
+
+        self._db = None
+        if disk_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+                self._db = sqlite3.connect(disk_path, timeout=DISK_BUSY_TIMEOUT, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS merchants ("
+                    "user_id TEXT NOT NULL, merchant_key TEXT NOT NULL, profile TEXT NOT NULL, "
+                    "seq INTEGER NOT NULL, PRIMARY KEY (user_id, merchant_key))"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS merchants_seq ON merchants (seq)")
+                self._db.commit()
+                self._sync()
+            except sqlite3.Error as e:
+                print(f"Merchant index store unavailable ({disk_path}): {e}, using memory only")
+                self._db = None
+
+    def _sync(self):
+        """Load rows other processes wrote since the last sync (lock held)."""
+        version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        rows = self._db.execute(
+            "SELECT user_id, merchant_key, profile, seq FROM merchants WHERE seq > ? ORDER BY seq", (self._seq,)
+        ).fetchall()
+        for user_id, key, profile, seq in rows:
+            self._profiles[user_id][key] = json.loads(profile)
+            self._matchers.pop(user_id, None)
+            self._seq = max(self._seq, seq)
+            self._versions[user_id] = max(self._versions.get(user_id, 0), seq)
+
+    def _matcher(self, user_id: str) -> Optional[KeywordAutomaton]:
+        """Keyword automaton over the user's merchant keys, rebuilt after changes (lock held)."""
+        profiles = self._profiles.get(user_id)
+        if not profiles:
+            return None
+        if user_id not in self._matchers:
+            # Padded with spaces so keys only match whole words of the padded text
+            self._matchers[user_id] = KeywordAutomaton({f" {key} ": [key] for key in profiles})
+        return self._matchers[user_id]
+
+    def _merge(self, user_id: str, transactions: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """
+        Copies of the user's profiles updated with their verified transactions (lock held).
+
+        Returns:
+            ({merchant_key: profile} for every profile changed, transactions used)
+        """
+        current = self._profiles.get(user_id, {})
+        updated: Dict[str, Dict[str, Any]] = {}
+        used = 0
+        for transaction in transactions:
+            key = normalize_merchant(transaction.get("merchant_name", ""))
+            if not transaction.get("verified", False) or not key:
+                continue
+
+            profile = updated.get(key) or copy.deepcopy(current.get(key)) or _new_profile(transaction["merchant_name"])
+            profile["count"] += 1
+            for field, counts in (("category", "categories"), ("transaction_type", "types"),
+                                  ("payment_method", "payment_methods")):
+                value = transaction.get(field)
+                if value:
+                    profile[counts][value] = profile[counts].get(value, 0) + 1
+            try:
+                amount = float(transaction.get("amount"))
+                profile["amount_min"] = amount if profile["amount_min"] is None else min(profile["amount_min"], amount)
+                profile["amount_max"] = amount if profile["amount_max"] is None else max(profile["amount_max"], amount)
+            except (TypeError, ValueError):
+                pass
+            updated[key] = profile
+            used += 1
+        return updated, used
+
+    def _store(self, user_id: str, profiles: Dict[str, Dict[str, Any]]) -> int:
+        """Upsert profiles with fresh sequence numbers inside the open write transaction; returns the last one."""
+        seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM merchants").fetchone()[0]
+        for key, profile in profiles.items():
+            seq += 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO merchants (user_id, merchant_key, profile, seq) VALUES (?, ?, ?, ?)",
+                (user_id, key, json.dumps(profile), seq)
+            )
+        return seq
+
+    def record(self, user_id: str, transaction: Dict[str, Any]) -> bool:
+        """
+        Update the index with one transaction (ignored unless verified).
+
+        Returns:
+            True if the transaction had a usable merchant and was indexed
+        """
+        return self.record_many(user_id, [transaction]) > 0
+
+    def record_many(self, user_id: str, transactions: Iterable[Dict[str, Any]]) -> int:
+        """Index several transactions of one user (e.g. a backfill); returns how many were used."""
+        transactions = list(transactions)
+        with self._lock:
+            if self._db is None:
+                updated, used = self._merge(user_id, transactions)
+                if updated:
+                    self._seq += 1
+                    self._versions[user_id] = self._seq
+            else:
+                try:
+                    # The write lock is held from the re-read to the commit, so two
+                    # processes recording the same merchant merge instead of
+                    # overwriting each other's counts
+                    self._db.execute("BEGIN IMMEDIATE")
+                    self._sync()
+                    updated, used = self._merge(user_id, transactions)
+                    version = self._store(user_id, updated) if updated else None
+                    self._db.commit()
+                except sqlite3.Error:
+                    self._db.rollback()
+                    raise
+                if version is not None:
+                    # Everything up to our rows was synced under the write lock
+                    self._seq = version
+                    self._versions[user_id] = version
+
+            if updated:
+                self._profiles[user_id].update(updated)
+                self._matchers.pop(user_id, None)
+            self._stats["records"] += used
+            return used
+
+    def version(self, user_id: str) -> int:
+        """
+        Change counter of a user's profiles, including changes made by other
+        processes; 0 if the user has none. Results that used the index are
+        cached under it, so a new verified transaction invalidates them.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._sync()
+            return self._versions.get(user_id, 0)
+
+    def lookup(self, user_id: str, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the user's known merchant in OCR/ASR text.
+
+        Returns:
+            {"merchant_name", "category", "transaction_type", "payment_method",
+             "amount_min", "amount_max", "count"} for the longest merchant key
+            found in the text (category etc. None when history disagrees),
+            or None if no known merchant appears
+        """
+        with self._lock:
+            self._stats["lookups"] += 1
+            if self._db is not None:
+                self._sync()
+            matcher = self._matcher(user_id)
+            if matcher is None:
+                return None
+
+            keys = [key for _, _, key in matcher.finditer(" " + " ".join(_tokens(text)) + " ")]
+            if not keys:
+                return None
+            profile = self._profiles[user_id][max(keys, key=len)]
+            self._stats["hits"] += 1
+
+        return {
+            "merchant_name": profile["name"],
+            "category": _dominant(profile["categories"]),
+            "transaction_type": _dominant(profile["types"]),
+            "payment_method": _dominant(profile["payment_methods"]),
+            "amount_min": profile["amount_min"],
+            "amount_max": profile["amount_max"],
+            "count": profile["count"],
+        }
+
+    def counters(self) -> Dict[str, int]:
+        """Lookup/hit/record counters of this process."""
+        with self._lock:
+            return dict(self._stats)
+
+    def stats(self, merge: Iterable[Dict[str, int]] = ()) -> Dict[str, Any]:
+        """
+        Lookup/hit counters and index size.
+
+        Args:
+            merge: counters() of other processes sharing the index file (e.g.
+                forked parser workers), added to this process's counters
+        """
+        with self._lock:
+            if self._db is not None:
+                self._sync()
+            stats = dict(self._stats)
+            for counters in merge:
+                for name, value in counters.items():
+                    stats[name] = stats.get(name, 0) + value
+            stats["users"] = len(self._profiles)
+            stats["merchants"] = sum(len(profiles) for profiles in self._profiles.values())
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 4) if stats["lookups"] else 0.0
+        return stats
+
+
+def apply_profile(rules_result: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fill a rule-based result from a known merchant's profile.
+
+    Category, type and payment method come from the user's verified history
+    where the rules were unsure; an amount the rules found ambiguous is
+    accepted when it lies in the merchant's typical range.
+    """
+    result = dict(rules_result)
+    field_confidence = dict(rules_result["field_confidence"])
+
+    result["merchant_name"] = profile["merchant_name"]
+    field_confidence["merchant_name"] = 0.95
+    for field in ("category", "transaction_type", "payment_method"):
+        if profile[field] and (field_confidence[field] < CONFIDENCE_THRESHOLD or not result.get(field)):
+            result[field] = profile[field]
+            field_confidence[field] = 0.95
+
+    amount = result.get("amount")
+    if (amount is not None and field_confidence["amount"] < CONFIDENCE_THRESHOLD
+            and profile["amount_min"] is not None
+            and profile["amount_min"] / AMOUNT_RANGE_SLACK <= amount <= profile["amount_max"] * AMOUNT_RANGE_SLACK):
+        field_confidence["amount"] = CONFIDENCE_THRESHOLD
+
+    result["field_confidence"] = field_confidence
+    result["confidence"] = round(min(0.9, sum(field_confidence[f] for f in REQUIRED_FIELDS) / len(REQUIRED_FIELDS)), 2)
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Backfill the merchant index from exported transactions")
+    arg_parser.add_argument("transactions", help="JSON list of transactions table rows (user_id, merchant_name, ...)")
+    arg_parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="SQLite index file")
+    args = arg_parser.parse_args()
+
+    with open(args.transactions) as f:
+        rows = json.load(f)
+    by_user: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        if row.get("user_id") and row.get("verified"):
+            by_user[row["user_id"]].append(row)
+
+    index = MerchantIndex(args.index)
+    for user_id, transactions in by_user.items():
+        index.record_many(user_id, transactions)
+    print(f"Indexed {sum(len(t) for t in by_user.values())} verified transactions: {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
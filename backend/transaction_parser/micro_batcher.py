@@ -0,0 +1,149 @@
+"""
+Micro Batcher - Dynamic Request Batching
+========================================
+
+Under load, several uploads arrive within a few milliseconds of each other.
+Running them one at a time leaves the batched OCR/Whisper paths idle. The
+micro batcher queues requests, collects whatever arrives within a short
+window (or until the batch is full), hands the whole batch to one batched
+parser call and resolves each request's future with its own result.
+
+The batch function runs off the event loop (on an executor or a worker
+pool), so the endpoints stay responsive while the models work.
+
+Usage:
+    batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=10)
+    batcher.start()                     # inside the running event loop
+    result = await batcher.submit(path)
+    await batcher.stop()
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """Collect concurrent requests into batches for one batched call."""
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_concurrent_batches: int = 1
+    ):
+        """
+        Args:
+            run_batch: Coroutine function taking a list of items and returning
+                one result per item, in order
+            max_batch_size: Dispatch as soon as this many items are queued
+            max_wait_ms: Longest time the first item of a batch waits for company
+            max_concurrent_batches: Batches allowed in flight at once (e.g. the
+                number of worker processes); further requests keep queueing and
+                form larger batches meanwhile
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"requests": 0, "batches": 0, "max_batch": 0}
+
+    def start(self):
+        """Start the dispatch loop (must be called from the running event loop)."""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop dispatching; queued requests that were not sent fail with CancelledError."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result."""
+        if self._task is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        """Wait for one item, then gather more until the window closes or the batch is full."""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                # Still take anything already queued without waiting
+                if self._queue.empty():
+                    break
+                batch.append(self._queue.get_nowait())
+                continue
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """Dispatch loop: one batch per free slot."""
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            # Requests whose client went away are dropped before the model sees them
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                self._slots.release()
+                continue
+            asyncio.get_running_loop().create_task(self._execute(batch))
+
+    async def _execute(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run one batch and resolve its futures."""
+        self._stats["requests"] += len(batch)
+        self._stats["batches"] += 1
+        self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Return request/batch counters and the queue length."""
+        stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize() if self._queue is not None else 0
+        stats["mean_batch"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
@@ -0,0 +1,225 @@
+"""
+OCR Preprocessing - Image Normalization and Receipt Line Segmentation
+=====================================================================
+
+Phone photos arrive at 12 MP+, sideways (EXIF orientation), low-contrast and
+slightly rotated. normalize_image bounds the cost of every upload: JPEGs are
+decoded at reduced resolution via Image.draft, so a large photo is never
+fully decoded, then the image is EXIF-rotated, capped in size, converted to
+grayscale, contrast-stretched and deskewed.
+
+TrOCR (microsoft/trocr-base-printed) is a single-text-line model: fed a whole
+receipt it returns one short line. This module finds the text lines on a
+receipt with a cheap horizontal projection profile and crops them, so all
+lines can be decoded together in one batched generate call.
+
+Usage:
+    from ocr_preprocessing import normalize_image, segment_lines
+
+    crops = segment_lines(normalize_image(upload_bytes))
+"""
+
+import io
+from typing import List, Tuple
+import numpy as np
+from PIL import Image, ImageOps
+
+# Longest side (in px) kept after decoding; receipts stay legible well below this
+MAX_IMAGE_SIDE = 2048
+# Percent of darkest/lightest pixels clipped when stretching contrast
+AUTOCONTRAST_CUTOFF = 1
+# Skew search range and resolution (degrees)
+MAX_SKEW_DEGREES = 5.0
+SKEW_STEP_DEGREES = 0.5
+# Ink pixels sampled for the skew search, bounds its cost on dense images
+SKEW_SAMPLE_POINTS = 20000
+
+# Rows need at least this fraction of their pixels inked to count as text
+MIN_ROW_INK_RATIO = 0.005
+# Blank gaps shorter than this (in px) are treated as part of the same line
+MAX_LINE_GAP = 2
+# Lines shorter than this (in px) are considered noise
+MIN_LINE_HEIGHT = 8
+# Padding (in px) kept around each crop
+LINE_PADDING = 4
+# Upper bound on lines per receipt, bounds OCR latency for very long bills
+MAX_LINES = 48
+# Of those, lines kept from the bottom of a longer receipt, where the total,
+# tax and payment method are printed; the rest come from the top (merchant)
+TAIL_LINES = 16
+
+
+def _otsu_threshold(gray: np.ndarray) -> int:
+    """Compute Otsu's binarization threshold for an 8-bit grayscale array."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 128
+
+    bins = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = total - weight_bg
+    cum_mean = np.cumsum(hist * bins)
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+
+    between_var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between_var))
+
+
+def _find_runs(mask: np.ndarray, max_gap: int) -> List[Tuple[int, int]]:
+    """Return [start, end) runs of True values, merging gaps up to max_gap."""
+    runs = []
+    start = None
+    gap = 0
+    for i, value in enumerate(mask):
+        if value:
+            if start is None:
+                start = i
+            gap = 0
+        elif start is not None:
+            gap += 1
+            if gap > max_gap:
+                runs.append((start, i - gap + 1))
+                start = None
+                gap = 0
+    if start is not None:
+        runs.append((start, len(mask) - gap))
+    return runs
+
+
+def estimate_skew(gray: Image.Image) -> float:
+    """
+    Estimate the rotation that levels the text lines of a grayscale image.
+
+    Ink pixels are projected onto the vertical axis along each candidate
+    slope; the slope whose row histogram is most peaked (sum of squared bin
+    counts) follows the text lines.
+
+    Returns:
+        Angle in degrees to pass to Image.rotate (counter-clockwise), 0 if no
+        skew is detected
+    """
+    pixels = np.asarray(gray, dtype=np.uint8)
+    ink = pixels < _otsu_threshold(pixels)
+    if ink.mean() > 0.5:
+        ink = ~ink
+
+    ys, xs = np.nonzero(ink)
+    if ys.size < 100:
+        return 0.0
+    if ys.size > SKEW_SAMPLE_POINTS:
+        picked = np.random.default_rng(0).choice(ys.size, SKEW_SAMPLE_POINTS, replace=False)
+        ys, xs = ys[picked], xs[picked]
+
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-MAX_SKEW_DEGREES, MAX_SKEW_DEGREES + 1e-9, SKEW_STEP_DEGREES):
+        rows = np.round(ys + xs * np.tan(np.radians(angle))).astype(np.int64)
+        hist = np.bincount(rows - rows.min())
+        score = float(np.dot(hist, hist))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+
+    # Lines descending by tan(a) per px are levelled along slope -a: rotate by a
+    return -best_angle
+
+
+def normalize_image(data: bytes, max_side: int = MAX_IMAGE_SIDE) -> Image.Image:
+    """
+    Decode and normalize an uploaded receipt image for OCR.
+
+    Args:
+        data: Encoded image (JPEG, PNG, BMP, TIFF, ...)
+        max_side: Longest side of the returned image
+
+    Returns:
+        RGB image (grayscale content), EXIF-rotated, at most max_side px on
+        its longest side, contrast-stretched and deskewed
+    """
+    image = Image.open(io.BytesIO(data))
+
+    # JPEG: let libjpeg decode luma only, at the smallest 1/2^n scale still >= max_side
+    if image.format == "JPEG":
+        image.draft("L", (max_side, max_side))
+
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.BILINEAR)
+
+    image = ImageOps.autocontrast(image, cutoff=AUTOCONTRAST_CUTOFF)
+
+    angle = estimate_skew(image)
+    if abs(angle) >= SKEW_STEP_DEGREES:
+        image = image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+
+    # TrOCR's processor expects three channels
+    return image.convert("RGB")
+
+
+def find_line_boxes(image: Image.Image) -> List[Tuple[int, int, int, int]]:
+    """
+    Find text line bounding boxes using a horizontal projection profile.
+
+    Args:
+        image: Receipt image (any mode)
+
+    Returns:
+        List of (left, top, right, bottom) boxes, top to bottom; at most
+        MAX_LINES, keeping the first and last lines of longer receipts
+    """
+    gray = np.asarray(image.convert("L"), dtype=np.uint8)
+    height, width = gray.shape
+    if height == 0 or width == 0:
+        return []
+
+    # Dark text on light paper is the common case; invert if the image is mostly dark
+    threshold = _otsu_threshold(gray)
+    ink = gray < threshold
+    if ink.mean() > 0.5:
+        ink = ~ink
+
+    row_profile = ink.sum(axis=1)
+    text_rows = row_profile > max(1, int(width * MIN_ROW_INK_RATIO))
+
+    boxes = []
+    for top, bottom in _find_runs(text_rows, MAX_LINE_GAP):
+        if bottom - top < MIN_LINE_HEIGHT:
+            continue
+
+        # Trim the line horizontally to its inked columns
+        columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+        if columns.size == 0:
+            continue
+        left, right = int(columns[0]), int(columns[-1]) + 1
+
+        boxes.append((
+            max(0, left - LINE_PADDING),
+            max(0, top - LINE_PADDING),
+            min(width, right + LINE_PADDING),
+            min(height, bottom + LINE_PADDING),
+        ))
+
+    if len(boxes) > MAX_LINES:
+        # Drop item lines from the middle rather than the totals at the bottom
+        boxes = boxes[:MAX_LINES - TAIL_LINES] + boxes[-TAIL_LINES:]
+    return boxes
+
+
+def segment_lines(image: Image.Image) -> List[Image.Image]:
+    """
+    Crop a receipt image into single text lines for TrOCR.
+
+    Falls back to the whole image when no lines are found, so callers always
+    get at least one crop.
+
+    Args:
+        image: RGB receipt image
+
+    Returns:
+        List of RGB line crops, top to bottom
+    """
+    boxes = find_line_boxes(image)
+    if not boxes:
+        return [image]
+    return [image.crop(box) for box in boxes]
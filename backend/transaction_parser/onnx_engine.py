@@ -0,0 +1,169 @@
+"""
+ONNX Runtime Engine - TrOCR and Whisper on onnxruntime
+======================================================
+
+Alternative execution engine for the two encoder-decoder models. The first
+load exports the model's encoder and decoder (with KV cache) graphs to ONNX
+via optimum and caches them on disk:
+
+    ~/.cache/agente/onnx/<model>/<precision>/
+        encoder_model.onnx, decoder_model_merged.onnx, config files,
+        export.json (written last, marks a complete export)
+
+Later loads (other workers, restarts) open the cached graphs directly;
+export_ort_model fills the cache without opening a session (e.g. in a
+parent process before forking workers).
+Generation runs through onnxruntime's CPU execution provider with all graph
+optimizations (constant folding, attention/GELU/LayerNorm fusion) enabled.
+The returned model keeps the transformers `generate()` interface, so
+TransactionParser calls it exactly like the eager model.
+
+Precision "int8" dynamically quantizes the exported graphs' weights
+(onnxruntime.quantization); "bf16" has no CPU kernels in onnxruntime and
+runs as fp32.
+
+Usage:
+    model = load_ort_model("microsoft/trocr-base-printed", "ocr")
+    generated_ids = model.generate(pixel_values)
+"""
+
+import os
+import json
+import shutil
+from typing import Optional
+
+# Execution engines for the OCR and Whisper models
+ENGINE_MODES = ("torch", "onnx")
+
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.expanduser("~/.cache/agente/onnx"))
+
+_MARKER = "export.json"
+
+
+def _model_class(kind: str):
+    """optimum ORTModel class for a parser model kind ("ocr" or "whisper")."""
+    from optimum.onnxruntime import ORTModelForVision2Seq, ORTModelForSpeechSeq2Seq
+    if kind == "ocr":
+        return ORTModelForVision2Seq
+    if kind == "whisper":
+        return ORTModelForSpeechSeq2Seq
+    raise ValueError(f"No ONNX engine for model kind '{kind}', expected 'ocr' or 'whisper'")
+
+
+def session_options(num_threads: Optional[int] = None):
+    """onnxruntime session options: all graph optimizations, optional intra-op thread cap."""
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    return options
+
+
+def artifact_dir(model_name: str, precision: str = "fp32", cache_dir: str = ONNX_CACHE_DIR) -> str:
+    """Directory holding the exported graphs of one model and precision."""
+    return os.path.join(cache_dir, model_name.replace("/", "--"), precision)
+
+
+def _is_exported(path: str) -> bool:
+    return os.path.exists(os.path.join(path, _MARKER))
+
+
+def _publish(tmp_dir: str, path: str):
+    """Move a finished export into place; another process may have won the race."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        os.rename(tmp_dir, path)
+    except OSError:
+        if not _is_exported(path):
+            raise
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _export(model_name: str, kind: str, path: str, token: Optional[str]):
+    """Export a Hub checkpoint's encoder/decoder graphs to ONNX (needs torch, runs once)."""
+    print(f"Exporting {model_name} to ONNX (one-time, cached in {path})...")
+    tmp_dir = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    model = _model_class(kind).from_pretrained(model_name, export=True, use_cache=True, token=token)
+    model.save_pretrained(tmp_dir)
+    with open(os.path.join(tmp_dir, _MARKER), "w") as f:
+        json.dump({"model": model_name, "kind": kind, "precision": "fp32"}, f)
+    _publish(tmp_dir, path)
+
+
+def _quantize(src: str, path: str):
+    """Write an int8 copy of an exported model (dynamic weight quantization of every graph)."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    print(f"Quantizing ONNX graphs to int8 (one-time, cached in {path})...")
+    tmp_dir = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.copytree(src, tmp_dir, ignore=shutil.ignore_patterns("*.onnx", "*.onnx_data", _MARKER))
+    for name in os.listdir(src):
+        if name.endswith(".onnx"):
+            quantize_dynamic(os.path.join(src, name), os.path.join(tmp_dir, name), weight_type=QuantType.QInt8)
+    with open(os.path.join(src, _MARKER)) as f:
+        marker = json.load(f)
+    with open(os.path.join(tmp_dir, _MARKER), "w") as f:
+        json.dump({**marker, "precision": "int8"}, f)
+    _publish(tmp_dir, path)
+
+
+def export_ort_model(
+    model_name: str,
+    kind: str,
+    precision: str = "fp32",
+    token: Optional[str] = None,
+    cache_dir: str = ONNX_CACHE_DIR
+) -> str:
+    """
+    Make sure a checkpoint's graphs are in the disk cache, without opening a session.
+
+    Returns:
+        Directory of the exported (and, for int8, quantized) graphs
+    """
+    if precision == "bf16":
+        print(f"bf16 is not supported by the ONNX engine on CPU, running {kind} in fp32")
+        precision = "fp32"
+
+    fp32_path = artifact_dir(model_name, "fp32", cache_dir)
+    if not _is_exported(fp32_path):
+        _export(model_name, kind, fp32_path, token)
+    if precision != "int8":
+        return fp32_path
+    path = artifact_dir(model_name, "int8", cache_dir)
+    if not _is_exported(path):
+        _quantize(fp32_path, path)
+    return path
+
+
+def load_ort_model(
+    model_name: str,
+    kind: str,
+    precision: str = "fp32",
+    token: Optional[str] = None,
+    num_threads: Optional[int] = None,
+    cache_dir: str = ONNX_CACHE_DIR
+):
+    """
+    Load a TrOCR/Whisper checkpoint as an onnxruntime model, exporting it on first use.
+
+    Args:
+        model_name: Hugging Face checkpoint, e.g. "openai/whisper-small"
+        kind: "ocr" (vision encoder-decoder) or "whisper" (speech seq2seq)
+        precision: "fp32" or "int8"; "bf16" falls back to fp32
+        token: Hugging Face token for the export download
+        num_threads: Intra-op threads per session (default: all cores)
+        cache_dir: Root of the exported graph cache
+
+    Returns:
+        optimum ORTModel with the transformers generate() interface
+    """
+    path = export_ort_model(model_name, kind, precision, token, cache_dir)
+    return _model_class(kind).from_pretrained(
+        path,
+        provider="CPUExecutionProvider",
+        session_options=session_options(num_threads),
+        use_cache=True
+    )
@@ -0,0 +1,225 @@
+"""
+Parser Benchmark - Per-Stage Latency, Throughput and RSS of Both Parsers
+========================================================================
+
+Runs a corpus (see synthetic_corpus.py) through both TransactionParser
+variants and reports, per variant:
+
+    stages      p50/p95 latency of decode, OCR, ASR, rules, LLM and validate,
+                measured by timing the parser's own stage methods
+    images /    end-to-end p50/p95 latency and field accuracy
+    voice
+    throughput  items per second with 1, 4, 8, ... concurrent callers
+    peak RSS    of the benchmark process
+
+Variants:
+    local          transaction_parser.py (models loaded in this process)
+    local-onnx     the same with TrOCR and Whisper on ONNX Runtime (see
+                   onnx_engine.py); graphs are exported on the first run
+    inference-api  transaction_parser_inference_api.py; point HF_API_BASE at
+                   fake_inference_server.py to benchmark offline
+
+The result cache is disabled (PARSER_CACHE=0) so repeated inputs are parsed
+every time. Each variant runs in a fresh process. Write the report with
+--output and diff it between releases.
+
+Usage:
+    python synthetic_corpus.py benchmark_corpus
+    python parser_benchmark.py benchmark_corpus --variants local inference-api --output parser_report.json
+
+    # Eager PyTorch vs ONNX Runtime for OCR/ASR
+    python parser_benchmark.py benchmark_corpus --variants local local-onnx
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from benchmark_utils import field_matches, percentile, peak_rss_mb
+
+VARIANTS = ("local", "local-onnx", "inference-api")
+STAGE_NAMES = ("decode", "ocr", "asr", "rules", "llm", "validate")
+LLM_MODEL = "microsoft/Phi-3-mini-4k-instruct"
+
+
+class StageTimer:
+    """Collect wall-clock durations of wrapped parser methods by stage."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {name: [] for name in STAGE_NAMES}
+        self._lock = threading.Lock()
+
+    def wrap(self, owner: Any, method: str, stage: str, when: Callable[..., bool] = None):
+        """Replace owner.method with a timed version (only timed if when(*args) holds)."""
+        original = getattr(owner, method)
+
+        def timed(*args, **kwargs):
+            if when is not None and not when(*args, **kwargs):
+                return original(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.samples[stage].append(time.perf_counter() - start)
+
+        setattr(owner, method, timed)
+
+    def reset(self):
+        with self._lock:
+            for values in self.samples.values():
+                values.clear()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            stage: {
+                "calls": len(values),
+                "p50_seconds": round(percentile(values, 50), 4),
+                "p95_seconds": round(percentile(values, 95), 4),
+            }
+            for stage, values in self.samples.items() if values
+        }
+
+
+def _instrument(variant: str, parser, timer: StageTimer):
+    """Time the stage methods of one parser variant."""
+    timer.wrap(parser, "_regex_extract_transaction", "rules")
+    timer.wrap(parser, "_validate_and_clean_transaction", "validate")
+    if variant.startswith("local"):
+        timer.wrap(parser, "_decode_image", "decode")
+        timer.wrap(parser, "_decode_audio", "decode")
+        timer.wrap(parser, "_extract_text_from_images", "ocr")
+        timer.wrap(parser, "_transcribe_audios", "asr")
+        timer.wrap(parser.extractor, "extract", "llm")
+    else:
+        # Uploads go to the API as-is, so there is no local decode stage
+        timer.wrap(parser, "_extract_text_from_image", "ocr")
+        timer.wrap(parser, "_transcribe_audio", "asr")
+        timer.wrap(parser, "_call_inference_api", "llm", when=lambda model, *_: model == LLM_MODEL)
+
+
+def _make_parser(variant: str):
+    if variant == "local-onnx":
+        from transaction_parser import TransactionParser
+        return TransactionParser(engine={"ocr": "onnx", "whisper": "onnx"})
+    if variant == "local":
+        from transaction_parser import TransactionParser
+    else:
+        from transaction_parser_inference_api import TransactionParser
+    return TransactionParser()
+
+
+def _run_variant(variant: str, manifest: Dict[str, Any], base_dir: str,
+                 concurrencies: List[int]) -> Dict[str, Any]:
+    """Benchmark one parser variant (in a child process)."""
+    os.environ["PARSER_CACHE"] = "0"
+    report: Dict[str, Any] = {"variant": variant}
+
+    start = time.perf_counter()
+    parser = _make_parser(variant)
+    if variant.startswith("local"):
+        report["model_status"] = parser.warmup()
+    report["load_seconds"] = round(time.perf_counter() - start, 3)
+
+    timer = StageTimer()
+    _instrument(variant, parser, timer)
+
+    jobs = []
+    for kind, parse in (("images", parser.parse_image), ("voice", parser.parse_voice)):
+        for item in manifest.get(kind, []):
+            with open(os.path.join(base_dir, item["path"]), "rb") as f:
+                jobs.append((kind, parse, f.read(), item.get("expected", {})))
+
+    # Sequential pass: per-stage and end-to-end latency plus accuracy
+    for kind in ("images", "voice"):
+        latencies = []
+        matched = 0
+        total = 0
+        errors = 0
+        for _, parse, data, expected in (job for job in jobs if job[0] == kind):
+            start = time.perf_counter()
+            result = parse(data)
+            latencies.append(time.perf_counter() - start)
+            errors += "error" in result
+            for field, value in expected.items():
+                total += 1
+                matched += field_matches(value, result.get(field))
+        if latencies:
+            report[kind] = {
+                "count": len(latencies),
+                "errors": errors,
+                "field_accuracy": round(matched / total, 4) if total else None,
+                "p50_seconds": round(percentile(latencies, 50), 3),
+                "p95_seconds": round(percentile(latencies, 95), 3),
+            }
+    report["stages"] = timer.report()
+
+    # Throughput: every job once per concurrency level
+    report["throughput"] = {}
+    for concurrency in concurrencies:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start = time.perf_counter()
+            list(executor.map(lambda job: job[1](job[2]), jobs))
+            elapsed = time.perf_counter() - start
+        report["throughput"][str(concurrency)] = {
+            "items": len(jobs),
+            "seconds": round(elapsed, 3),
+            "items_per_second": round(len(jobs) / elapsed, 3) if elapsed else None,
+        }
+
+    report["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark both TransactionParser variants on a corpus")
+    arg_parser.add_argument("corpus", help="Corpus directory with manifest.json (see synthetic_corpus.py)")
+    arg_parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS))
+    arg_parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 8])
+    arg_parser.add_argument("--receipts", type=int, default=24, help="Receipts to render if the corpus is missing")
+    arg_parser.add_argument("--output", help="Write the JSON report to this file")
+    args = arg_parser.parse_args()
+
+    manifest_path = os.path.join(args.corpus, "manifest.json")
+    if not os.path.exists(manifest_path):
+        from synthetic_corpus import build_corpus
+        print(f"No corpus at {args.corpus}, rendering one")
+        build_corpus(args.corpus, args.receipts)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    # Spawn (not fork) so each variant starts from a clean process
+    context = multiprocessing.get_context("spawn")
+    reports = []
+    for variant in args.variants:
+        print(f"\n--- Benchmarking parser: {variant} ---")
+        with context.Pool(1) as pool:
+            reports.append(pool.apply(_run_variant, (variant, manifest, base_dir, args.concurrency)))
+
+    print("\n" + "=" * 72)
+    print(f"{'variant':<14} {'stage':<9} {'calls':>6} {'p50 (s)':>9} {'p95 (s)':>9}")
+    print("-" * 72)
+    for report in reports:
+        for stage, stats in report["stages"].items():
+            print(f"{report['variant']:<14} {stage:<9} {stats['calls']:>6} "
+                  f"{stats['p50_seconds']:>9.4f} {stats['p95_seconds']:>9.4f}")
+    print("-" * 72)
+    for report in reports:
+        rates = ", ".join(f"c={c}: {stats['items_per_second']}/s" for c, stats in report["throughput"].items())
+        print(f"{report['variant']:<14} {rates}  (peak RSS {report['peak_rss_mb']:.0f} MB)")
+    print("=" * 72)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"corpus": os.path.abspath(args.corpus), "reports": reports}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Parser Metrics - Stage Timings and Counters in Prometheus Format
+================================================================
+
+Both parsers record into the process-wide METRICS registry:
+
+    parser_stage_seconds      histogram per stage: model_load, decode,
+                              ocr_generate, asr_generate, llm_generate,
+                              json_extract, regex, merchant_lookup, validate
+    parser_tokens_total       tokens generated (and LLM prompt tokens) per stage
+    parser_extraction_total   how each text was resolved: rules,
+                              merchant_index, llm, fallback_json (LLM answer
+                              not valid JSON) or fallback_error (LLM failed),
+                              i.e. fallback rates
+    parser_request_seconds    end-to-end latency per server endpoint/status
+
+The servers expose METRICS.render() on /metrics. The registry has no
+dependencies; in worker-pool mode each forked worker forwards its samples
+to the parent with every result (see worker_pool.py), so the parent's
+/metrics covers all workers.
+
+Usage:
+    with METRICS.time("decode", parser="local"):
+        image = normalize_image(data)
+    METRICS.count("parser_extraction_total", path="rules")
+    print(METRICS.render())
+"""
+
+import time
+import threading
+import contextlib
+from typing import Dict, List, Optional, Tuple
+
+# Histogram upper bounds in seconds, from fast decodes to cold model loads
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "parser_stage_seconds": ("histogram", "Duration of one parser pipeline stage"),
+    "parser_request_seconds": ("histogram", "End-to-end request latency per endpoint"),
+    "parser_tokens_total": ("counter", "Tokens processed by model stages"),
+    "parser_extraction_total": ("counter", "Texts resolved per extraction path (rules, merchant_index, llm, fallbacks)"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Tuple[str, str] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class ParserMetrics:
+    """Thread-safe histogram/counter registry rendered as Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> labels -> [bucket counts..., sum, count]
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        # When set (in pool workers) samples are queued for the parent instead
+        self._forwarded: Optional[list] = None
+
+    def _apply(self, event: tuple):
+        kind, name, labels, value = event
+        if kind == "observe":
+            series = self._histograms.setdefault(name, {})
+            values = series.setdefault(labels, [0.0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    values[i] += 1
+            values[-2] += value
+            values[-1] += 1
+        else:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0.0) + value
+
+    def _record(self, event: tuple):
+        with self._lock:
+            if self._forwarded is not None:
+                self._forwarded.append(event)
+            else:
+                self._apply(event)
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Add one sample to a histogram."""
+        self._record(("observe", name, _labels(labels), seconds))
+
+    def count(self, name: str, amount: float = 1, **labels):
+        """Increase a counter."""
+        self._record(("count", name, _labels(labels), amount))
+
+    @contextlib.contextmanager
+    def time(self, stage: str, **labels):
+        """Time a block as one parser_stage_seconds sample (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("parser_stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    def forward(self):
+        """Queue samples for drain() instead of recording them (forked pool workers)."""
+        # Called right after a fork: a lock held by another parent thread would never be released
+        self._lock = threading.Lock()
+        self._forwarded = []
+
+    def drain(self) -> list:
+        """Return and clear the samples queued since the last drain."""
+        with self._lock:
+            if self._forwarded is None:
+                return []
+            events, self._forwarded = self._forwarded, []
+            return events
+
+    def merge(self, events: list):
+        """Record samples drained in another process."""
+        with self._lock:
+            for event in events:
+                self._apply(event)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name in sorted(set(self._histograms) | set(self._counters)):
+                kind, description = HELP.get(name, ("counter" if name in self._counters else "histogram", name))
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                for labels, values in sorted(self._histograms.get(name, {}).items()):
+                    for bound, bucket in zip(BUCKETS, values):
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {bucket:g}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {values[-1]:g}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {values[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = ParserMetrics()
@@ -0,0 +1,111 @@
+"""
+Precision Report - Accuracy/Latency Comparison of fp32, bf16 and int8
+=====================================================================
+
+Runs a fixed set of receipts and voice notes through TransactionParser once
+per precision mode and reports field accuracy, latency and peak RSS. Each
+mode runs in a fresh process so model weights and RSS don't leak between runs,
+with the result cache disabled (PARSER_CACHE=0) so every input is parsed.
+
+The manifest is a JSON file listing the inputs and the fields expected from
+each of them:
+
+    {
+      "images": [{"path": "receipts/dmart.jpg", "expected": {"amount": 845.0, "category": "Groceries"}}],
+      "voice":  [{"path": "voice/petrol.wav", "expected": {"amount": 200.0, "category": "Fuel"}}]
+    }
+
+Usage:
+    python precision_report.py manifest.json --modes fp32 bf16 int8 --output report.json
+"""
+
+import os
+import json
+import time
+import argparse
+import multiprocessing
+from typing import Dict, Any
+
+from benchmark_utils import field_matches, percentile, peak_rss_mb
+
+
+def _run_mode(mode: str, manifest: Dict[str, Any], base_dir: str) -> Dict[str, Any]:
+    """Run every manifest item under one precision mode (in a child process)."""
+    # Cached results would skip the models and hide the mode's latency and accuracy
+    os.environ["PARSER_CACHE"] = "0"
+    from transaction_parser import TransactionParser
+
+    parser = TransactionParser(precision={"ocr": mode, "whisper": mode, "llm": mode})
+    report = {"mode": mode}
+
+    for kind, parse in (("images", parser.parse_image), ("voice", parser.parse_voice)):
+        items = manifest.get(kind, [])
+        if not items:
+            continue
+
+        latencies = []
+        matched = 0
+        total = 0
+        for item in items:
+            path = os.path.join(base_dir, item["path"])
+            start = time.perf_counter()
+            result = parse(path)
+            latencies.append(time.perf_counter() - start)
+
+            for field, expected in item.get("expected", {}).items():
+                total += 1
+                if field_matches(expected, result.get(field)):
+                    matched += 1
+
+        report[kind] = {
+            "count": len(items),
+            "field_accuracy": round(matched / total, 4) if total else None,
+            # First call includes model load, so it is reported separately
+            "first_call_seconds": round(latencies[0], 3),
+            "p50_seconds": round(percentile(latencies[1:] or latencies, 50), 3),
+            "p95_seconds": round(percentile(latencies[1:] or latencies, 95), 3),
+        }
+
+    report["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare parser precision modes")
+    arg_parser.add_argument("manifest", help="JSON manifest of receipts/voice notes with expected fields")
+    arg_parser.add_argument("--modes", nargs="+", default=["fp32", "bf16", "int8"])
+    arg_parser.add_argument("--output", help="Write the JSON report to this file")
+    args = arg_parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(args.manifest))
+
+    # Spawn (not fork) so each mode starts from a clean process
+    context = multiprocessing.get_context("spawn")
+    reports = []
+    for mode in args.modes:
+        print(f"\n--- Running precision mode: {mode} ---")
+        with context.Pool(1) as pool:
+            reports.append(pool.apply(_run_mode, (mode, manifest, base_dir)))
+
+    print("\n" + "=" * 72)
+    print(f"{'mode':<6} {'kind':<7} {'accuracy':>9} {'p50 (s)':>9} {'p95 (s)':>9} {'RSS (MB)':>10}")
+    print("-" * 72)
+    for report in reports:
+        for kind in ("images", "voice"):
+            if kind in report:
+                stats = report[kind]
+                accuracy = stats["field_accuracy"] if stats["field_accuracy"] is not None else float("nan")
+                print(f"{report['mode']:<6} {kind:<7} {accuracy:>9.2%} {stats['p50_seconds']:>9.3f} "
+                      f"{stats['p95_seconds']:>9.3f} {report['peak_rss_mb']:>10.1f}")
+    print("=" * 72)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
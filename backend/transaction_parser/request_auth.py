@@ -0,0 +1,121 @@
+"""
+Request Auth - Who a Parse Request Belongs To
+=============================================
+
+The merchant index personalises parsing per user and the result cache is
+scoped per user, so the user id must not be whatever the client claims.
+The parser servers take it from the same bearer token the main API issues
+at login (frontend: localStorage "auth_token"):
+
+    PARSER_AUTH_SECRET          HS256 secret shared with the API that signs
+                                the tokens; the user is the token's
+                                PARSER_AUTH_USER_CLAIM claim (default "sub")
+    PARSER_TRUST_CLIENT_USER_ID=1
+                                development only: accept the client's
+                                user_id form/body field without a token
+
+With neither set, requests are anonymous: parsing works, but no merchant
+index is used and verified transactions cannot be posted.
+
+Verified transactions can also arrive from the database itself: a
+database webhook on the transactions table (e.g. a Supabase database
+webhook) posts each inserted/updated row, authenticated with the
+MERCHANT_INDEX_WEBHOOK_SECRET header value.
+
+Usage:
+    user_id = resolve_user(request.headers.get("authorization"), form_user_id)
+"""
+
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+from typing import Any, Dict, Optional
+
+AUTH_SECRET = os.getenv("PARSER_AUTH_SECRET", "")
+AUTH_USER_CLAIM = os.getenv("PARSER_AUTH_USER_CLAIM", "sub")
+TRUST_CLIENT_USER_ID = os.getenv("PARSER_TRUST_CLIENT_USER_ID", "0") == "1"
+WEBHOOK_SECRET = os.getenv("MERCHANT_INDEX_WEBHOOK_SECRET", "")
+
+
+class AuthError(ValueError):
+    """The request's credentials are missing, invalid or contradict the claimed user."""
+
+
+def _b64decode(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + "=" * (-len(part) % 4))
+
+
+def verify_token(token: str, secret: str) -> Dict[str, Any]:
+    """Check an HS256 JWT's signature and expiry and return its claims."""
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64decode(header_b64))
+        claims = json.loads(_b64decode(payload_b64))
+        signature = _b64decode(signature_b64)
+    except ValueError:
+        raise AuthError("Malformed bearer token")
+
+    if header.get("alg") != "HS256":
+        raise AuthError(f"Unsupported token algorithm '{header.get('alg')}'")
+    expected = hmac.new(secret.encode(), f"{header_b64}.{payload_b64}".encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise AuthError("Invalid token signature")
+    if "exp" in claims and float(claims["exp"]) < time.time():
+        raise AuthError("Token expired")
+    return claims
+
+
+def resolve_user(authorization: Optional[str], claimed_user_id: Optional[str] = None) -> Optional[str]:
+    """
+    User a request acts for, or None for an anonymous request.
+
+    Args:
+        authorization: The Authorization header ("Bearer <token>")
+        claimed_user_id: user_id the client sent in the form/body, if any
+
+    Raises:
+        AuthError: invalid token, or a claimed user_id that is not the token's
+    """
+    if AUTH_SECRET:
+        if not authorization:
+            return None
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise AuthError("Expected 'Authorization: Bearer <token>'")
+        user_id = verify_token(token.strip(), AUTH_SECRET).get(AUTH_USER_CLAIM)
+        if not user_id:
+            raise AuthError(f"Token has no '{AUTH_USER_CLAIM}' claim")
+        user_id = str(user_id)
+        if claimed_user_id and claimed_user_id != user_id:
+            raise AuthError("user_id does not match the signed-in user")
+        return user_id
+
+    if TRUST_CLIENT_USER_ID:
+        return claimed_user_id or None
+    return None
+
+
+def check_webhook_secret(value: Optional[str]) -> bool:
+    """True if a webhook request carries the configured shared secret."""
+    return bool(WEBHOOK_SECRET) and value is not None and hmac.compare_digest(value, WEBHOOK_SECRET)
+
+
+def newly_verified_row(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    The transactions row of a database webhook payload if this change verified it.
+
+    Payloads look like {"type": "INSERT" | "UPDATE", "table": "transactions",
+    "record": {...}, "old_record": {...}}; a row counts once, when it is
+    inserted verified or flips to verified.
+    """
+    record = payload.get("record") or {}
+    if not record.get("verified") or not record.get("user_id"):
+        return None
+    if payload.get("type") == "UPDATE" and (payload.get("old_record") or {}).get("verified"):
+        return None
+    if payload.get("type") not in ("INSERT", "UPDATE"):
+        return None
+    return record
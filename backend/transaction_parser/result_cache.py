@@ -0,0 +1,217 @@
+"""
+Result Cache - Content-addressed Parse Results
+==============================================
+
+Users re-upload the same receipt and the frontend retries on timeouts. This
+module caches parse results keyed on the SHA-256 of the uploaded bytes plus
+the parser's model/version fingerprint, so a repeat upload returns in
+milliseconds instead of re-running OCR/ASR and the LLM.
+
+Two tiers:
+    - in-memory LRU (per process)
+    - size-bounded SQLite store on disk (shared across restarts/processes)
+
+The disk tier runs in WAL mode with a busy timeout so the server and its
+worker processes can share one file. A cache must never fail a parse: if
+the disk tier errors anyway, it is logged and the cache continues memory
+only.
+
+Usage:
+    cache = ResultCache(disk_path="parse_cache.sqlite")
+    key = cache.make_key(data, "image", parser_fingerprint)
+    result = cache.get(key)
+    if result is None:
+        result = ...
+        cache.put(key, result)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Any
+
+# Bump when the result format changes so old entries stop matching
+CACHE_VERSION = "1"
+
+MEMORY_ITEMS = int(os.getenv("PARSER_CACHE_MEMORY_ITEMS", "512"))
+DISK_MAX_BYTES = int(os.getenv("PARSER_CACHE_DISK_MAX_MB", "64")) * 1024 * 1024
+DEFAULT_DISK_PATH = os.path.expanduser("~/.cache/agente/parse_results.sqlite")
+
+# Results carrying this key (degraded fallbacks, e.g. rules-only after an LLM
+# error) are returned to the caller but never cached; see mark_uncacheable
+NO_CACHE = "_no_cache"
+
+# Seconds a writer waits for another process's lock before giving up
+DISK_BUSY_TIMEOUT = 5.0
+# Disk hits only refresh an entry's LRU timestamp when it is older than this
+ACCESS_RESOLUTION = 300.0
+
+
+def mark_uncacheable(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Flag a degraded result so a transient failure is not pinned in the cache."""
+    result[NO_CACHE] = True
+    return result
+
+
+class ResultCache:
+    """Two-tier (memory LRU + SQLite) cache of parse results."""
+
+    def __init__(
+        self,
+        memory_items: int = MEMORY_ITEMS,
+        disk_path: Optional[str] = DEFAULT_DISK_PATH,
+        disk_max_bytes: int = DISK_MAX_BYTES
+    ):
+        """
+        Args:
+            memory_items: Maximum entries kept in the in-memory LRU
+            disk_path: SQLite file for the disk tier, or None for memory only
+            disk_max_bytes: Size bound for the disk tier; least recently used
+                entries are evicted beyond it
+        """
+        self.memory_items = memory_items
+        self.disk_path = disk_path
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        self._db = None
+        if disk_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+                self._db = sqlite3.connect(disk_path, timeout=DISK_BUSY_TIMEOUT, check_same_thread=False)
+                # Readers don't block the writer (and vice versa) across worker processes
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Disk cache unavailable ({disk_path}): {e}, using memory only")
+                self._db = None
+
+    def _disable_disk(self, error: sqlite3.Error):
+        """Fall back to memory only after a disk tier failure (lock held)."""
+        print(f"Disk cache error ({self.disk_path}): {error}, using memory only")
+        try:
+            self._db.close()
+        except sqlite3.Error:
+            pass
+        self._db = None
+        self._stats["disk_errors"] = self._stats.get("disk_errors", 0) + 1
+
+    @staticmethod
+    def make_key(data: bytes, kind: str, fingerprint: str) -> str:
+        """Build a cache key from the upload bytes, input kind and parser fingerprint."""
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{CACHE_VERSION}:{kind}:{fingerprint}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the cached result, or None on a miss."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return json.loads(value)
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT value, accessed FROM results WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        # The memory tier absorbs repeat hits, so a coarse LRU timestamp is enough
+                        now = time.time()
+                        if now - row[1] > ACCESS_RESOLUTION:
+                            self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+                            self._db.commit()
+                        self._remember(key, row[0])
+                        self._stats["disk_hits"] += 1
+                        return json.loads(row[0])
+                except sqlite3.Error as e:
+                    self._disable_disk(e)
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result in both tiers (results marked with NO_CACHE are skipped)."""
+        if result.get(NO_CACHE):
+            return
+        value = json.dumps(result)
+        with self._lock:
+            self._remember(key, value)
+            self._stats["writes"] += 1
+
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                        (key, value, len(value), time.time())
+                    )
+                    self._evict_disk()
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._disable_disk(e)
+
+    def _remember(self, key: str, value: str):
+        """Insert into the memory LRU, evicting the oldest entries (lock held)."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        """Drop least recently used disk entries until under the size bound (lock held)."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        while total > self.disk_max_bytes:
+            row = self._db.execute(
+                "SELECT key, size FROM results ORDER BY accessed LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (row[0],))
+            total -= row[1]
+            self._stats["evictions"] += 1
+
+    def counters(self) -> Dict[str, int]:
+        """Hit/miss counters and memory tier size, without touching the disk tier."""
+        with self._lock:
+            counters = dict(self._stats)
+            counters["memory_items"] = len(self._memory)
+        return counters
+
+    def stats(self, merge: Iterable[Dict[str, int]] = ()) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and tier sizes.
+
+        Args:
+            merge: counters() of other processes sharing the disk tier (e.g.
+                forked parser workers), added to this process's counters
+        """
+        stats = self.counters()
+        for counters in merge:
+            for name, value in counters.items():
+                stats[name] = stats.get(name, 0) + value
+        with self._lock:
+            if self._db is not None:
+                try:
+                    count, size = self._db.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+                    ).fetchone()
+                    stats["disk_items"] = count
+                    stats["disk_bytes"] = size
+                except sqlite3.Error as e:
+                    self._disable_disk(e)
+
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
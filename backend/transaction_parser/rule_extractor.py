@@ -0,0 +1,372 @@
+"""
+Rule-based Transaction Extractor
+================================
+
+Deterministic first tier of the extraction pipeline. Pulls amount, type,
+category, payment method, merchant, date and time out of OCR/ASR text with
+regexes and keyword tables, and scores each field so the parser can decide
+whether an LLM call is needed at all.
+
+Most voice notes look like "spent 200 on petrol"; those resolve here without
+any model call.
+
+Everything is compiled once at import and each text is scanned twice:
+
+    - one Aho-Corasick pass over the lowercased text finds every type,
+      category and payment keyword as a whole word (overlapping ones
+      included); plural and inflected forms are listed as keywords
+    - one combined regex finds dates, times, amounts (with their currency /
+      keyword context) and merchant names
+
+Amounts may use Indian (1,20,000) or international (120,000) digit grouping.
+
+Usage:
+    from rule_extractor import extract_transaction, extract_transactions, needs_llm
+
+    result = extract_transaction("spent 200 on petrol")
+    if needs_llm(result):
+        ...
+
+    # Thousands of texts (e.g. an imported SMS log) in one call
+    results = extract_transactions(sms_texts)
+"""
+
+import re
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+# Fields that must be confidently known to skip the LLM
+REQUIRED_FIELDS = ("amount", "transaction_type", "category")
+
+# Minimum per-field confidence for the rules result to be used as-is
+CONFIDENCE_THRESHOLD = 0.8
+
+# Keywords match whole words only, so inflected forms are spelled out
+INCOME_KEYWORDS = ["received", "earned", "earnings", "income", "salary", "payment received", "credited",
+                   "got paid", "payout", "payouts"]
+EXPENSE_KEYWORDS = ["spent", "paid", "purchase", "purchased", "bought", "expense", "expenses", "debited",
+                    "bill", "bills", "billed", "recharge", "recharged", "total", "invoice", "gst"]
+
+CATEGORY_KEYWORDS = {
+    "Food": ["food", "restaurant", "restaurants", "mcdonald", "mcdonalds", "pizza", "pizzas", "lunch",
+             "dinner", "breakfast", "snack", "snacks", "biryani"],
+    "Fuel": ["fuel", "petrol", "diesel", "gas", "gasoline", "cng"],
+    "Groceries": ["grocery", "groceries", "supermarket", "big bazaar", "dmart", "vegetables"],
+    "Rent": ["rent", "rental"],
+    "Maintenance": ["maintenance", "repair", "repairs", "repaired", "service", "serviced", "servicing",
+                    "puncture", "tyre", "tyres"],
+    "Phone": ["phone", "mobile", "telecom", "recharge", "recharged", "airtel", "jio"],
+    "EMI": ["emi", "emis", "loan", "installment", "installments", "instalment"],
+    "Salary": ["salary"],
+    "Delivery": ["delivery", "deliveries", "uber", "ola", "swiggy", "zomato", "rapido", "dunzo"],
+    "Freelance": ["freelance", "project", "projects", "client", "clients"],
+}
+
+PAYMENT_KEYWORDS = {
+    "UPI": ["upi", "gpay", "google pay", "phonepe", "paytm", "bhim"],
+    "Cash": ["cash"],
+    "Card": ["card", "cards", "credit card", "debit card", "visa", "mastercard", "rupay"],
+    "Bank Transfer": ["bank transfer", "neft", "imps", "rtgs"],
+}
+
+# Indian (1,20,000) or international (120,000) grouping, or plain digits
+_NUMBER = r'(?:\d{1,2}(?:,\d{2})+,\d{3}|\d{1,3}(?:,\d{3})+|\d+)(?!\d)(?:\.\d{1,2})?'
+
+CURRENCY_PREFIXES = r'₹|\bRs\.?|\bINR'
+CURRENCY_SUFFIXES = r'rupees|rs\b|inr\b|₹'
+AMOUNT_LABELS = r'grand total|net amount|total|amount'
+AMOUNT_VERBS = r'spent|paid|pay|received|earned|got|credited|debited|bought \w+ (?:for|worth)'
+AMOUNT_SUFFIX_VERBS = r'paid|spent|received|earned|credited|debited'
+# Capitalised name word; inner capitals and apostrophes allowed (McDonald's, Haldiram's)
+MERCHANT_WORD = r"[A-Z][a-z]+(?:[A-Z][a-z]+)*(?:['’][a-z]+)?"
+
+# One scan for everything positional; alternatives earlier in the list win at the same offset
+TRANSACTION_PATTERN = re.compile(
+    r'\b(?:(?P<date_iso>\d{4}-\d{2}-\d{2})|(?P<date_dmy_slash>\d{2}/\d{2}/\d{4})|(?P<date_dmy_dash>\d{2}-\d{2}-\d{4}))\b'
+    r'|\b(?P<hour>[01]?\d|2[0-3]):(?P<minute>[0-5]\d)\b'
+    r'|(?i:(?P<currency>' + CURRENCY_PREFIXES + r')\s*'
+    r'|\b(?P<label>' + AMOUNT_LABELS + r')\s*:?\s*'
+    r'|\b(?P<verb>' + AMOUNT_VERBS + r')\s+)?'
+    r'(?P<amount>' + _NUMBER + r')'
+    r'(?i:\s*(?:(?P<currency_suffix>' + CURRENCY_SUFFIXES + r')|(?P<verb_suffix>' + AMOUNT_SUFFIX_VERBS + r')))?'
+    r'|(?:at|from|to)\s+(?P<merchant>' + MERCHANT_WORD + r'(?:\s+' + MERCHANT_WORD + r')*)'
+    r'|(?P<shop>' + MERCHANT_WORD + r'(?:\s+' + MERCHANT_WORD + r')*)\s+(?:restaurant|store|shop)'
+)
+
+DATE_FORMATS = [
+    ("date_iso", "%Y-%m-%d"),
+    ("date_dmy_slash", "%d/%m/%Y"),
+    ("date_dmy_dash", "%d-%m-%Y"),
+]
+
+# Characters around a bare number that mark it as part of a date, time or ID
+_BARE_BEFORE = set("0123456789:/.-")
+_BARE_AFTER = set("0123456789:/-")
+_BARE_MAX_DIGITS = 7
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton reporting every keyword occurrence in one pass."""
+
+    def __init__(self, keywords: Dict[str, List[Any]]):
+        """
+        Args:
+            keywords: Lowercase keyword -> payloads reported when it matches
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+
+        for keyword, payloads in keywords.items():
+            state = 0
+            for char in keyword:
+                if char not in self._goto[state]:
+                    self._goto[state][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = self._goto[state][char]
+            self._out[state].extend((len(keyword), payload) for payload in payloads)
+
+        # Breadth-first failure links; outputs of the fallback state are inherited
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, payload) for every keyword occurrence, in order of their end."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, payload in out[state]:
+                yield end - length, end, payload
+
+
+def _build_keyword_automaton() -> KeywordAutomaton:
+    keywords: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+    for keyword in INCOME_KEYWORDS:
+        keywords[keyword].append(("type", "income"))
+    for keyword in EXPENSE_KEYWORDS:
+        keywords[keyword].append(("type", "expense"))
+    for category, words in CATEGORY_KEYWORDS.items():
+        for keyword in words:
+            keywords[keyword].append(("category", category))
+    for method, words in PAYMENT_KEYWORDS.items():
+        for keyword in words:
+            keywords[keyword].append(("payment", method))
+    return KeywordAutomaton(keywords)
+
+
+KEYWORDS = _build_keyword_automaton()
+_PAYMENT_ORDER = {method: i for i, method in enumerate(PAYMENT_KEYWORDS)}
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _match_keywords(text_lower: str) -> Dict[str, Dict[str, int]]:
+    """Earliest position of each keyword value matched as a whole word, per group."""
+    found: Dict[str, Dict[str, int]] = {"type": {}, "category": {}, "payment": {}}
+    for start, end, (group, value) in KEYWORDS.finditer(text_lower):
+        # Whole words only: "rent" doesn't match "current", "ola" doesn't match "olamide"
+        if start and _is_word_char(text_lower[start - 1]):
+            continue
+        if end < len(text_lower) and _is_word_char(text_lower[end]):
+            continue
+        if start < found[group].get(value, len(text_lower)):
+            found[group][value] = start
+    return found
+
+
+def _parse_number(value: str) -> float:
+    return float(value.replace(",", ""))
+
+
+def _amount_strength(match: re.Match) -> Optional[float]:
+    """Confidence from the amount's context; None for a bare number."""
+    if match.group("currency") or match.group("currency_suffix"):
+        return 0.95
+    if match.group("label") or match.group("verb"):
+        return 0.9
+    if match.group("verb_suffix"):
+        return 0.85
+    return None
+
+
+def _is_bare_amount(text: str, match: re.Match) -> bool:
+    """A standalone number that is not part of a date, time or long ID."""
+    start, end = match.span("amount")
+    if start and text[start - 1] in _BARE_BEFORE:
+        return False
+    if end < len(text) and text[end] in _BARE_AFTER:
+        return False
+    return len(match.group("amount").split(".")[0].replace(",", "")) <= _BARE_MAX_DIGITS
+
+
+def _pick_amount(strong: Dict[float, set], bare: set) -> Tuple[Any, float]:
+    """Return (amount, confidence); ambiguous candidates lower the confidence."""
+    if strong:
+        confidence = max(strong)
+        values = strong[confidence]
+        if len(values) == 1:
+            return next(iter(values)), confidence
+        # Several different amounts with the same strength (e.g. item lines);
+        # the largest is usually the total but let the LLM confirm it
+        return max(values), 0.5
+
+    bare.discard(0.0)
+    if len(bare) == 1:
+        return bare.pop(), 0.7
+    if bare:
+        return max(bare), 0.3
+    return None, 0.0
+
+
+def _extract_type(found: Dict[str, int]) -> Tuple[str, float]:
+    """Return (transaction_type, confidence)."""
+    is_income = "income" in found
+    is_expense = "expense" in found
+    if is_income and not is_expense:
+        return "income", 0.9
+    if is_expense and not is_income:
+        return "expense", 0.9
+    if is_income and is_expense:
+        return "expense", 0.4
+    # Receipts rarely say "paid"; expense is the safe default
+    return "expense", 0.6
+
+
+def _extract_category(found: Dict[str, int]) -> Tuple[str, float]:
+    """Return (category, confidence); more than one matching category is ambiguous."""
+    if not found:
+        return "Misc", 0.2
+    category = min(found, key=found.get)
+    return category, 0.9 if len(found) == 1 else 0.5
+
+
+def _extract_payment(found: Dict[str, int]) -> Tuple[str, float]:
+    """Return the first PAYMENT_KEYWORDS method whose keywords appear in the text."""
+    if not found:
+        return "", 0.0
+    return min(found, key=_PAYMENT_ORDER.get), 0.9
+
+
+def _extract(text: str, now: datetime) -> Dict[str, Any]:
+    """Rule-based extraction of one text (see extract_transaction)."""
+    found = _match_keywords(text.lower())
+    transaction_type, type_conf = _extract_type(found["type"])
+    category, category_conf = _extract_category(found["category"])
+    payment_method, payment_conf = _extract_payment(found["payment"])
+
+    strong_amounts: Dict[float, set] = defaultdict(set)
+    bare_amounts = set()
+    dates: Dict[str, str] = {}
+    time_match = None
+    merchant = shop = None
+
+    for match in TRANSACTION_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if match.group("amount"):
+            strength = _amount_strength(match)
+            if strength is not None:
+                strong_amounts[strength].add(_parse_number(match.group("amount")))
+            elif _is_bare_amount(text, match):
+                bare_amounts.add(_parse_number(match.group("amount")))
+        elif kind in ("hour", "minute"):
+            time_match = time_match or match
+        elif kind == "merchant":
+            merchant = merchant or match.group("merchant")
+        elif kind == "shop":
+            shop = shop or match.group("shop")
+        elif kind is not None:
+            dates.setdefault(kind, match.group(kind))
+
+    amount, amount_conf = _pick_amount(strong_amounts, bare_amounts)
+
+    merchant_name, merchant_conf = "", 0.0
+    if merchant or shop:
+        merchant_name, merchant_conf = merchant or shop, 0.6
+
+    transaction_date, date_conf = now.strftime("%Y-%m-%d"), 0.0
+    for group, fmt in DATE_FORMATS:
+        if group in dates:
+            try:
+                transaction_date = datetime.strptime(dates[group], fmt).strftime("%Y-%m-%d")
+                date_conf = 0.9
+                break
+            except ValueError:
+                pass
+
+    transaction_time, time_conf = now.strftime("%H:%M"), 0.0
+    if time_match:
+        transaction_time, time_conf = f"{int(time_match.group('hour')):02d}:{time_match.group('minute')}", 0.9
+
+    field_confidence = {
+        "amount": amount_conf,
+        "transaction_type": type_conf,
+        "category": category_conf,
+        "merchant_name": merchant_conf,
+        "payment_method": payment_conf,
+        "transaction_date": date_conf,
+        "transaction_time": time_conf,
+    }
+
+    return {
+        "amount": amount,
+        "transaction_type": transaction_type,
+        "category": category,
+        "merchant_name": merchant_name,
+        "description": text[:100],
+        "payment_method": payment_method,
+        "location": "",
+        "transaction_date": transaction_date,
+        "transaction_time": transaction_time,
+        "confidence": round(min(0.9, sum(field_confidence[f] for f in REQUIRED_FIELDS) / len(REQUIRED_FIELDS)), 2),
+        "field_confidence": field_confidence,
+    }
+
+
+def extract_transaction(text: str) -> Dict[str, Any]:
+    """
+    Extract transaction fields from text with rules only.
+
+    Args:
+        text: OCR or ASR output
+
+    Returns:
+        Transaction dictionary (same fields as the LLM path) plus
+        "field_confidence", a per-field score between 0 and 1
+    """
+    return _extract(text, datetime.now())
+
+
+def extract_transactions(texts: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Extract transaction fields from many texts (e.g. an imported SMS log).
+
+    Same result per text as extract_transaction; undated texts all get the
+    date/time the batch started.
+    """
+    now = datetime.now()
+    return [_extract(text, now) for text in texts]
+
+
+def needs_llm(result: Dict[str, Any], threshold: float = CONFIDENCE_THRESHOLD) -> bool:
+    """Return True if any required field is missing or below the confidence threshold."""
+    field_confidence = result.get("field_confidence", {})
+    return any(
+        result.get(field) in (None, "") or field_confidence.get(field, 0.0) < threshold
+        for field in REQUIRED_FIELDS
+    )
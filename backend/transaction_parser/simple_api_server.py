@@ -7,13 +7,59 @@ This allows the frontend to call the parser via API.
 
 Usage:
     uvicorn simple_api_server:app --reload --port 8000
+
+    # Load and warm all models at startup; /health/ready reports 503 until done
+    PARSER_PRELOAD=1 uvicorn simple_api_server:app --port 8000
+
+    # Serve from 8 forked worker processes, each pinned to its own CPU slice
+    PARSER_WORKERS=8 PARSER_PRELOAD=1 uvicorn simple_api_server:app --port 8000
+
+    # Batch concurrent uploads: wait up to 10 ms for up to 8 requests per model call
+    MICRO_BATCH_MAX_SIZE=8 MICRO_BATCH_WAIT_MS=10 uvicorn simple_api_server:app --port 8000
+
+    # Fail requests whose parser job takes longer than 60 s with 504
+    PARSER_JOB_TIMEOUT=60 uvicorn simple_api_server:app --port 8000
+
+    # Run TrOCR and Whisper on ONNX Runtime (graphs exported once to ~/.cache/agente/onnx)
+    OCR_ENGINE=onnx WHISPER_ENGINE=onnx PARSER_PRELOAD=1 uvicorn simple_api_server:app --port 8000
+
+    # Route each stage between local models and the Inference API, with hedging
+    PARSER_BACKEND=hybrid HUGGINGFACE_TOKEN=... uvicorn simple_api_server:app --port 8000
+
+    # Per-stage latency histograms, token counts and fallback rates for Prometheus
+    curl http://localhost:8000/metrics
+
+    # Parse with the signed-in user's merchant history, and feed it verified
+    # transactions (user from the bearer token, see request_auth.py)
+    PARSER_AUTH_SECRET=... uvicorn simple_api_server:app --port 8000
+    curl -H "Authorization: Bearer $TOKEN" -F file=@receipt.jpg http://localhost:8000/api/parse-image
+    curl -X POST -H "Authorization: Bearer $TOKEN" -H 'Content-Type: application/json' \
+         http://localhost:8000/api/verified-transactions \
+         -d '{"transactions": [{"merchant_name": "DMart", "category": "Groceries", "amount": 845, "verified": true}]}'
+
+    # Or let the database push verified rows (webhook on the transactions table
+    # to /api/hooks/transactions with an X-Webhook-Secret header)
+    MERCHANT_INDEX_WEBHOOK_SECRET=... uvicorn simple_api_server:app --port 8000
 """
 
 import os
-import tempfile
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, UploadFile, File, Form, Header, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
 from transaction_parser import TransactionParser
+from worker_pool import ParserWorkerPool
+from micro_batcher import MicroBatcher
+from bulk_ingest import BulkPipeline, expand_uploads
+from streaming_transcriber import StreamingTranscriber
+from hybrid_router import HybridParser
+from parser_metrics import METRICS
+from request_auth import AuthError, resolve_user, check_webhook_secret, newly_verified_row
 import uvicorn
 
 app = FastAPI()
@@ -27,60 +73,287 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize parser (models loaded on first use)
+# Eagerly load and warm models at startup instead of on the first request
+PRELOAD_MODELS = os.getenv("PARSER_PRELOAD", "0") == "1"
+
+# Number of forked model worker processes (0 = run the parser in this process)
+PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", "0"))
+
+# "local" runs every stage on this machine; "hybrid" routes OCR/ASR/LLM per call
+# between the local models and the Inference API (single-process only)
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "local")
+if PARSER_BACKEND not in ("local", "hybrid"):
+    raise ValueError(f"Invalid PARSER_BACKEND '{PARSER_BACKEND}', expected 'local' or 'hybrid'")
+if PARSER_BACKEND == "hybrid" and PARSER_WORKERS > 0:
+    print("PARSER_BACKEND=hybrid runs in-process, ignoring PARSER_WORKERS")
+    PARSER_WORKERS = 0
+
+# Longest a parser job may take before the request fails with 504 (0 = no limit)
+PARSER_JOB_TIMEOUT = float(os.getenv("PARSER_JOB_TIMEOUT", "120"))
+
+# Dynamic micro-batching of concurrent uploads (max batch size 1 disables it)
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "8"))
+MICRO_BATCH_WAIT_MS = float(os.getenv("MICRO_BATCH_WAIT_MS", "10"))
+
+# Initialize parser (models loaded on first use unless PRELOAD_MODELS is set)
 parser = TransactionParser()
 
+# In worker-pool mode the parser above only loads weights; workers fork from it
+pool = ParserWorkerPool(parser, PARSER_WORKERS, warmup=PRELOAD_MODELS) if PARSER_WORKERS > 0 else None
+
+# In-process mode runs model calls on one dedicated thread, off the event loop
+model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="parser") if pool is None else None
+
+# Hybrid mode shares the model thread for its local stages
+if PARSER_BACKEND == "hybrid":
+    from transaction_parser_inference_api import TransactionParser as InferenceApiParser
+    remote_parser = InferenceApiParser(cache=parser.cache, merchant_index=parser.merchant_index)
+    router = HybridParser(parser, remote_parser, local_executor=model_executor)
+else:
+    router = None
+
+async def _await_job(job, name: str):
+    """
+    Await a parser job for at most PARSER_JOB_TIMEOUT seconds.
+    
+    Raises TimeoutError when it takes longer; the job itself is not
+    interrupted, its result is discarded.
+    """
+    try:
+        return await asyncio.wait_for(job, PARSER_JOB_TIMEOUT or None)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Parser job '{name}' did not finish within {PARSER_JOB_TIMEOUT:g} s")
+
+async def run_parser(method: str, *args):
+    """Run a parser method in the worker pool if enabled, otherwise on the model thread."""
+    if pool is not None:
+        return await _await_job(asyncio.wrap_future(pool.submit(method, *args)), method)
+    return await _await_job(
+        asyncio.get_running_loop().run_in_executor(model_executor, getattr(parser, method), *args), method
+    )
+
+def _batch_runner(method: str):
+    """Batch function for MicroBatcher calling a list-taking parser method on (content, user_id) items."""
+    async def run_batch(items):
+        return await run_parser(method, [content for content, _ in items], [user_id for _, user_id in items])
+    return run_batch
+
+# One batch in flight per worker process (or on the single model thread)
+image_batcher = MicroBatcher(
+    _batch_runner("parse_images"), MICRO_BATCH_MAX_SIZE, MICRO_BATCH_WAIT_MS,
+    max_concurrent_batches=max(1, PARSER_WORKERS)
+)
+voice_batcher = MicroBatcher(
+    _batch_runner("parse_voices"), MICRO_BATCH_MAX_SIZE, MICRO_BATCH_WAIT_MS,
+    max_concurrent_batches=max(1, PARSER_WORKERS)
+)
+
+@app.on_event("startup")
+async def preload_models():
+    """Warm all models in the background so the server can answer health checks meanwhile."""
+    loop = asyncio.get_running_loop()
+    if pool is not None:
+        loop.run_in_executor(None, pool.start)
+    elif PRELOAD_MODELS:
+        loop.run_in_executor(model_executor, parser.warmup)
+    
+    image_batcher.start()
+    voice_batcher.start()
+
+@app.on_event("shutdown")
+async def stop_workers():
+    """Stop the batchers and worker processes on server shutdown."""
+    await image_batcher.stop()
+    await voice_batcher.stop()
+    if pool is not None:
+        pool.shutdown()
+    else:
+        model_executor.shutdown(wait=False)
+    if router is not None:
+        router.shutdown()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record end-to-end latency per route and status for /metrics."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    METRICS.observe("parser_request_seconds", time.perf_counter() - start,
+                    path=route.path if route else "unmatched", status=response.status_code)
+    return response
+
 @app.get("/")
 def root():
     return {
         "message": "Transaction Parser API",
         "endpoints": {
             "parse_image": "/api/parse-image",
-            "parse_voice": "/api/parse-voice"
+            "parse_voice": "/api/parse-voice",
+            "parse_batch": "/api/parse-batch",
+            "parse_voice_stream": "/ws/parse-voice",
+            "health": "/health",
+            "ready": "/health/ready",
+            "cache_stats": "/api/cache-stats",
+            "router_stats": "/api/router-stats",
+            "batch_stats": "/api/batch-stats",
+            "verified_transactions": "/api/verified-transactions",
+            "transactions_webhook": "/api/hooks/transactions",
+            "merchant_index_stats": "/api/merchant-index-stats",
+            "metrics": "/metrics"
         }
     }
 
+@app.get("/api/router-stats")
+def router_stats():
+    """Per-stage local/remote latency, queue depth and hedge counts (hybrid mode)."""
+    if router is None:
+        return {"backend": PARSER_BACKEND}
+    return {"backend": PARSER_BACKEND, **router.stats()}
+
+@app.get("/api/cache-stats")
+def cache_stats():
+    """Parse result cache hit/miss counters (of every worker in worker-pool mode)."""
+    if pool is None or parser.cache is None:
+        return parser.cache_stats()
+    # Workers serve the requests; disk tier sizes come from the shared file
+    return {"enabled": True, **parser.cache.stats(merge=pool.worker_counters("cache"))}
+
+@app.get("/api/batch-stats")
+def batch_stats():
+    """Micro-batcher request/batch counters."""
+    return {
+        "max_batch_size": MICRO_BATCH_MAX_SIZE,
+        "max_wait_ms": MICRO_BATCH_WAIT_MS,
+        "image": image_batcher.stats(),
+        "voice": voice_batcher.stats()
+    }
+
+@app.get("/api/merchant-index-stats")
+def merchant_index_stats():
+    """Per-user merchant index size and lookup hit rate (of every worker in worker-pool mode)."""
+    if parser.merchant_index is None:
+        return {"enabled": False}
+    merge = pool.worker_counters("merchant_index") if pool is not None else ()
+    return {"enabled": True, **parser.merchant_index.stats(merge=merge)}
+
+def request_user(request: Request, user_id: Optional[str] = Form(None)) -> Optional[str]:
+    """User a parse request acts for, from its bearer token (see request_auth.py)."""
+    try:
+        return resolve_user(request.headers.get("authorization"), user_id)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+class VerifiedTransactions(BaseModel):
+    transactions: List[Dict[str, Any]]
+    # Only honoured with PARSER_TRUST_CLIENT_USER_ID=1 or when it matches the token
+    user_id: Optional[str] = None
+
+@app.post("/api/verified-transactions")
+def verified_transactions(body: VerifiedTransactions, request: Request):
+    """
+    Add the signed-in user's verified transactions (rows of the transactions
+    table) to the merchant index, so repeat merchants skip LLM classification.
+    
+    Worker processes pick the update up from the shared index file.
+    """
+    if parser.merchant_index is None:
+        raise HTTPException(status_code=503, detail="Merchant index is disabled (MERCHANT_INDEX=0)")
+    try:
+        user_id = resolve_user(request.headers.get("authorization"), body.user_id)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Sign-in required to update the merchant index")
+    indexed = parser.merchant_index.record_many(user_id, body.transactions)
+    return {"received": len(body.transactions), "indexed": indexed}
+
+@app.post("/api/hooks/transactions")
+def transactions_webhook(payload: Dict[str, Any], x_webhook_secret: Optional[str] = Header(None)):
+    """
+    Database webhook on the transactions table: index each row once, when it
+    is inserted verified or becomes verified, without the client having to
+    post it. Authenticated with the MERCHANT_INDEX_WEBHOOK_SECRET value in
+    the X-Webhook-Secret header.
+    """
+    if not check_webhook_secret(x_webhook_secret):
+        raise HTTPException(status_code=403, detail="Invalid or unconfigured webhook secret")
+    if parser.merchant_index is None:
+        raise HTTPException(status_code=503, detail="Merchant index is disabled (MERCHANT_INDEX=0)")
+    row = newly_verified_row(payload)
+    indexed = row is not None and parser.merchant_index.record(str(row["user_id"]), row)
+    return {"indexed": bool(indexed)}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: per-stage latency histograms, token counts and fallback rates."""
+    return Response(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health")
+def health():
+    """Liveness check: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def health_ready():
+    """
+    Readiness check for the orchestrator.
+    
+    With PARSER_PRELOAD=1 this returns 503 until every model is loaded and
+    warmed; without it models load lazily and the server is always ready.
+    In worker-pool mode it returns 503 until every worker is up.
+    """
+    if pool is not None:
+        ready = pool.is_ready()
+        models = pool.model_status
+    else:
+        ready = parser.is_ready() if PRELOAD_MODELS else True
+        models = parser.model_status
+    body = {
+        "ready": ready,
+        "preload": PRELOAD_MODELS,
+        "workers": PARSER_WORKERS,
+        "models": models
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
 @app.post("/api/parse-image")
-async def parse_image(file: UploadFile = File(...)):
+async def parse_image(file: UploadFile = File(...), user_id: Optional[str] = Depends(request_user)):
     """
     Parse an image (receipt/bill) to extract transaction details.
     
-    Accepts: JPEG, PNG, BMP, TIFF
+    Accepts: JPEG, PNG, BMP, TIFF; with a bearer token, the signed-in user's
+    merchant index is used
     Returns: JSON with transaction fields
     """
     # Validate file type
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    # Create temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file.filename.split('.')[-1]}") as tmp_file:
-        tmp_path = tmp_file.name
+    try:
+        # Decode the upload straight from memory (no temp file)
+        content = await file.read()
         
-        try:
-            # Save uploaded file
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            # Parse image
-            result = parser.parse_image(tmp_path)
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+        # Parse image
+        if router is not None:
+            job = asyncio.get_running_loop().run_in_executor(None, router.parse_image, content, user_id)
+            result = await _await_job(job, "parse_image")
+        else:
+            result = await image_batcher.submit((content, user_id))
         
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+        return result
+        
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
 @app.post("/api/parse-voice")
-async def parse_voice(file: UploadFile = File(...)):
+async def parse_voice(file: UploadFile = File(...), user_id: Optional[str] = Depends(request_user)):
     """
     Parse a voice recording to extract transaction details.
     
-    Accepts: WAV, MP3, FLAC
+    Accepts: WAV, MP3, FLAC; with a bearer token, the signed-in user's merchant
+    index is used
     Returns: JSON with transaction fields
     """
     # Validate file type
@@ -88,29 +361,110 @@ async def parse_voice(file: UploadFile = File(...)):
     if not file.content_type or file.content_type not in valid_audio_types:
         raise HTTPException(status_code=400, detail="File must be an audio file (WAV, MP3, FLAC)")
     
-    # Create temporary file
-    file_ext = file.filename.split('.')[-1] if '.' in file.filename else 'wav'
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_ext}") as tmp_file:
-        tmp_path = tmp_file.name
+    try:
+        # Decode the upload straight from memory (no temp file)
+        content = await file.read()
         
-        try:
-            # Save uploaded file
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            # Parse audio
-            result = parser.parse_voice(tmp_path)
-            
-            return result
+        # Parse audio
+        if router is not None:
+            job = asyncio.get_running_loop().run_in_executor(None, router.parse_voice, content, user_id)
+            result = await _await_job(job, "parse_voice")
+        else:
+            result = await voice_batcher.submit((content, user_id))
+        
+        return result
+        
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
+
+@app.post("/api/parse-batch")
+async def parse_batch(files: List[UploadFile] = File(...), user_id: Optional[str] = Depends(request_user)):
+    """
+    Parse many receipts/voice notes in one request (e.g. onboarding imports).
+    
+    Accepts: any mix of images, audio files and zip archives of them; with a
+    bearer token, the signed-in user's merchant index is used
+    Returns: NDJSON stream, one {"index", "name", "kind", "result"} line per
+    file, written as soon as that file is parsed (completion order)
+    """
+    uploads = [(file.filename or f"file-{i}", file.content_type, await file.read()) for i, file in enumerate(files)]
+    items = expand_uploads(uploads)
+    if not items:
+        raise HTTPException(status_code=400, detail="No files to parse")
+    
+    # OCR/ASR and extraction run where the models live; extraction of one
+    # batch overlaps recognition of the next across worker processes
+    pipeline = BulkPipeline(parser, run_parser, extract_concurrency=max(1, PARSER_WORKERS), user_id=user_id)
+    
+    async def stream():
+        async for record in pipeline.run(items):
+            yield json.dumps(record) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.websocket("/ws/parse-voice")
+async def parse_voice_stream(websocket: WebSocket, sample_rate: int = 16000, sample_format: str = "s16le", token: Optional[str] = None):
+    """
+    Live voice entry: transcribe PCM while the user speaks.
+    
+    Protocol:
+        client -> binary frames of mono PCM (s16le or f32le at sample_rate)
+        client -> text frame {"event": "end"} when the user stops talking
+        server -> {"type": "partial", "text": ..., "draft": {known fields}} as speech arrives
+        server -> {"type": "final", "text": ..., "result": {transaction}} then closes
+    
+    A bearer token in the Authorization header (or the token query parameter,
+    for browsers) selects the user's merchant index for the final parse; an
+    invalid token closes the socket with 1008.
+    """
+    await websocket.accept()
+    authorization = websocket.headers.get("authorization") or (f"Bearer {token}" if token else None)
+    try:
+        user_id = resolve_user(authorization)
+    except AuthError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1008)
+        return
+    try:
+        stream = StreamingTranscriber(run_parser, sample_rate, sample_format, user_id=user_id)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+        return
+    
+    async def send_update():
+        await websocket.send_json(await stream.update())
+    
+    # At most one draft update in flight; audio keeps arriving meanwhile
+    update_task = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
             
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
+            if message.get("bytes"):
+                stream.add_pcm(message["bytes"])
+                if stream.should_update() and (update_task is None or update_task.done()):
+                    update_task = asyncio.create_task(send_update())
+            elif message.get("text") and json.loads(message["text"]).get("event") == "end":
+                break
         
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+        if update_task is not None:
+            await update_task
+        await websocket.send_json(await stream.finish())
+        await websocket.close()
+    
+    except WebSocketDisconnect:
+        if update_task is not None:
+            update_task.cancel()
+    except Exception as e:
+        if update_task is not None:
+            update_task.cancel()
+        await websocket.send_json({"type": "error", "detail": f"Error processing audio stream: {str(e)}"})
+        await websocket.close(code=1011)
 
 if __name__ == "__main__":
     print("\n" + "="*60)
@@ -119,6 +473,16 @@ if __name__ == "__main__":
     print("\nEndpoints:")
     print("  POST /api/parse-image - Parse receipt/bill images")
     print("  POST /api/parse-voice - Parse voice recordings")
+    print("  POST /api/parse-batch - Parse many files / zip archives (NDJSON stream)")
+    print("  WS   /ws/parse-voice  - Live voice transcription with partial drafts")
+    print("  POST /api/verified-transactions - Feed verified transactions to the merchant index")
+    print("  POST /api/hooks/transactions    - Database webhook for verified transaction rows")
+    print("  GET  /health/ready    - Readiness (models loaded and warmed)")
+    print("  GET  /metrics         - Prometheus stage timings, token counts, fallback rates")
+    print(f"\nModel preload: {'enabled' if PRELOAD_MODELS else 'disabled (set PARSER_PRELOAD=1)'}")
+    print(f"Worker processes: {PARSER_WORKERS or 'none (set PARSER_WORKERS=N)'}")
+    print(f"Backend: {PARSER_BACKEND}")
+    print(f"Micro-batching: up to {MICRO_BATCH_MAX_SIZE} requests within {MICRO_BATCH_WAIT_MS:g} ms")
     print("\nServer will be available at: http://localhost:8000")
     print("API docs at: http://localhost:8000/docs")
     print("\n" + "-"*60 + "\n")
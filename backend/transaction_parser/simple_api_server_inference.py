@@ -7,13 +7,24 @@ Perfect for avoiding DLL issues on Windows.
 
 Usage:
     uvicorn simple_api_server_inference:app --reload --port 8000
+
+    # Per-stage latency histograms and fallback rates for Prometheus
+    curl http://localhost:8000/metrics
+
+    # Parse with the signed-in user's merchant history (see request_auth.py)
+    PARSER_AUTH_SECRET=... uvicorn simple_api_server_inference:app --port 8000
+    curl -H "Authorization: Bearer $TOKEN" -F file=@receipt.jpg http://localhost:8000/api/parse-image
 """
 
-import os
-import tempfile
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, UploadFile, File, Form, Header, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from pydantic import BaseModel
 from transaction_parser_inference_api import TransactionParser
+from parser_metrics import METRICS
+from request_auth import AuthError, resolve_user, check_webhook_secret, newly_verified_row
 import uvicorn
 
 app = FastAPI()
@@ -30,6 +41,21 @@ app.add_middleware(
 # Initialize parser (uses Inference API, no local models)
 parser = TransactionParser()
 
+@app.on_event("shutdown")
+async def close_clients():
+    """Close pooled Inference API connections on server shutdown."""
+    await parser.aclose()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record end-to-end latency per route and status for /metrics."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    METRICS.observe("parser_request_seconds", time.perf_counter() - start,
+                    path=route.path if route else "unmatched", status=response.status_code)
+    return response
+
 @app.get("/")
 def root():
     return {
@@ -37,51 +63,121 @@ def root():
         "note": "Using Hugging Face Inference API - no local PyTorch needed!",
         "endpoints": {
             "parse_image": "/api/parse-image",
-            "parse_voice": "/api/parse-voice"
+            "parse_voice": "/api/parse-voice",
+            "health": "/health",
+            "ready": "/health/ready",
+            "cache_stats": "/api/cache-stats",
+            "verified_transactions": "/api/verified-transactions",
+            "transactions_webhook": "/api/hooks/transactions",
+            "merchant_index_stats": "/api/merchant-index-stats",
+            "metrics": "/metrics"
         }
     }
 
+@app.get("/api/cache-stats")
+def cache_stats():
+    """Parse result cache hit/miss counters."""
+    return parser.cache_stats()
+
+@app.get("/api/merchant-index-stats")
+def merchant_index_stats():
+    """Per-user merchant index size and lookup hit rate."""
+    if parser.merchant_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **parser.merchant_index.stats()}
+
+def request_user(request: Request, user_id: Optional[str] = Form(None)) -> Optional[str]:
+    """User a parse request acts for, from its bearer token (see request_auth.py)."""
+    try:
+        return resolve_user(request.headers.get("authorization"), user_id)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+class VerifiedTransactions(BaseModel):
+    transactions: List[Dict[str, Any]]
+    # Only honoured with PARSER_TRUST_CLIENT_USER_ID=1 or when it matches the token
+    user_id: Optional[str] = None
+
+@app.post("/api/verified-transactions")
+def verified_transactions(body: VerifiedTransactions, request: Request):
+    """
+    Add the signed-in user's verified transactions (rows of the transactions
+    table) to the merchant index, so repeat merchants skip LLM classification.
+    """
+    if parser.merchant_index is None:
+        raise HTTPException(status_code=503, detail="Merchant index is disabled (MERCHANT_INDEX=0)")
+    try:
+        user_id = resolve_user(request.headers.get("authorization"), body.user_id)
+    except AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Sign-in required to update the merchant index")
+    indexed = parser.merchant_index.record_many(user_id, body.transactions)
+    return {"received": len(body.transactions), "indexed": indexed}
+
+@app.post("/api/hooks/transactions")
+def transactions_webhook(payload: Dict[str, Any], x_webhook_secret: Optional[str] = Header(None)):
+    """
+    Database webhook on the transactions table: index each row once, when it
+    is inserted verified or becomes verified, without the client having to
+    post it. Authenticated with the MERCHANT_INDEX_WEBHOOK_SECRET value in
+    the X-Webhook-Secret header.
+    """
+    if not check_webhook_secret(x_webhook_secret):
+        raise HTTPException(status_code=403, detail="Invalid or unconfigured webhook secret")
+    if parser.merchant_index is None:
+        raise HTTPException(status_code=503, detail="Merchant index is disabled (MERCHANT_INDEX=0)")
+    row = newly_verified_row(payload)
+    indexed = row is not None and parser.merchant_index.record(str(row["user_id"]), row)
+    return {"indexed": bool(indexed)}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: per-stage latency histograms, token counts and fallback rates."""
+    return Response(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health")
+def health():
+    """Liveness check: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def health_ready():
+    """Readiness check: models are hosted remotely, so nothing needs warming."""
+    return {"ready": True, "preload": False, "models": {}}
+
 @app.post("/api/parse-image")
-async def parse_image(file: UploadFile = File(...)):
+async def parse_image(file: UploadFile = File(...), user_id: Optional[str] = Depends(request_user)):
     """
     Parse an image (receipt/bill) to extract transaction details.
     
-    Accepts: JPEG, PNG, BMP, TIFF
+    Accepts: JPEG, PNG, BMP, TIFF; with a bearer token, the signed-in user's
+    merchant index is used
     Returns: JSON with transaction fields
     """
     # Validate file type
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
     
-    # Create temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file.filename.split('.')[-1]}") as tmp_file:
-        tmp_path = tmp_file.name
+    try:
+        # Decode the upload straight from memory (no temp file)
+        content = await file.read()
         
-        try:
-            # Save uploaded file
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            # Parse image
-            result = parser.parse_image(tmp_path)
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+        # Parse image
+        result = await parser.parse_image_async(content, user_id)
         
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+        return result
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
 @app.post("/api/parse-voice")
-async def parse_voice(file: UploadFile = File(...)):
+async def parse_voice(file: UploadFile = File(...), user_id: Optional[str] = Depends(request_user)):
     """
     Parse a voice recording to extract transaction details.
     
-    Accepts: WAV, MP3, FLAC
+    Accepts: WAV, MP3, FLAC; with a bearer token, the signed-in user's merchant
+    index is used
     Returns: JSON with transaction fields
     """
     # Validate file type
@@ -89,29 +185,17 @@ async def parse_voice(file: UploadFile = File(...)):
     if not file.content_type or file.content_type not in valid_audio_types:
         raise HTTPException(status_code=400, detail="File must be an audio file (WAV, MP3, FLAC)")
     
-    # Create temporary file
-    file_ext = file.filename.split('.')[-1] if '.' in file.filename else 'wav'
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_ext}") as tmp_file:
-        tmp_path = tmp_file.name
+    try:
+        # Decode the upload straight from memory (no temp file)
+        content = await file.read()
+        
+        # Parse audio
+        result = await parser.parse_voice_async(content, user_id)
         
-        try:
-            # Save uploaded file
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            # Parse audio
-            result = parser.parse_voice(tmp_path)
-            
-            return result
-            
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
+        return result
         
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
 
 if __name__ == "__main__":
     print("\n" + "="*60)
@@ -121,6 +205,9 @@ if __name__ == "__main__":
     print("\nEndpoints:")
     print("  POST /api/parse-image - Parse receipt/bill images")
     print("  POST /api/parse-voice - Parse voice recordings")
+    print("  POST /api/verified-transactions - Feed verified transactions to the merchant index")
+    print("  POST /api/hooks/transactions    - Database webhook for verified transaction rows")
+    print("  GET  /metrics         - Prometheus stage timings and fallback rates")
     print("\nServer will be available at: http://localhost:8000")
     print("API docs at: http://localhost:8000/docs")
     print("\n" + "-"*60 + "\n")
@@ -0,0 +1,193 @@
+"""
+Streaming Transcriber - Incremental Whisper over Live PCM
+=========================================================
+
+parse_voice only starts after the whole recording is uploaded and decoded.
+For live voice entry the client streams PCM chunks over a WebSocket while
+the user speaks; this module transcribes them incrementally:
+
+    - audio accumulates in an uncommitted buffer
+    - every STEP_SECONDS of new audio the buffer is re-transcribed as a draft
+    - once the speaker pauses (or the buffer reaches WINDOW_SECONDS) the audio
+      up to that point is committed: transcribed one last time, appended to
+      the final text and dropped from the buffer
+
+After every update the rule-based extractor runs over the text so far and
+the fields it already knows are sent back as a partial transaction draft.
+When the user stops, only the short uncommitted tail is left to transcribe,
+so the final parse is close to instant.
+
+Model calls go through a `run_model(method, *args)` coroutine, like
+bulk_ingest.BulkPipeline, so the server can use its model thread or pool.
+
+Usage:
+    stream = StreamingTranscriber(run_model, sample_rate=16000)
+    stream.add_pcm(chunk)
+    if stream.should_update():
+        partial = await stream.update()
+    final = await stream.finish()
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import numpy as np
+
+from audio_preprocessing import detect_speech, resample, TARGET_SAMPLE_RATE
+from rule_extractor import extract_transaction
+from result_cache import NO_CACHE
+
+# Re-transcribe the draft after this much new audio (seconds)
+STEP_SECONDS = 1.0
+# Longest uncommitted buffer; Whisper sees at most 30 s
+WINDOW_SECONDS = 20.0
+# Silence after speech that commits everything before it (seconds)
+COMMIT_PAUSE_SECONDS = 0.6
+# Upper bound on a single streaming session (seconds of audio)
+MAX_STREAM_SECONDS = 300.0
+
+SAMPLE_FORMATS = {"s16le": np.int16, "f32le": np.float32}
+
+
+class StreamingTranscriber:
+    """Incremental transcription and draft extraction for one voice stream."""
+
+    def __init__(
+        self,
+        run_model: Callable[..., Awaitable[Any]],
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        sample_format: str = "s16le",
+        user_id: Optional[str] = None
+    ):
+        """
+        Args:
+            run_model: Coroutine `run_model(method_name, *args)` running a
+                TransactionParser method where the models live
+            sample_rate: Sample rate of the incoming PCM
+            sample_format: "s16le" (16-bit signed) or "f32le" (32-bit float), mono
+            user_id: Speaking user, for their merchant index in the final parse
+        """
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unknown sample format '{sample_format}', expected one of {list(SAMPLE_FORMATS)}")
+        self.run_model = run_model
+        self.sample_rate = sample_rate
+        self.sample_format = sample_format
+        self.user_id = user_id
+
+        self.committed_text: List[str] = []
+        self.draft_text = ""
+        self.total_seconds = 0.0
+        self._chunks: List[np.ndarray] = []
+        self._pending = b""
+        self._buffered = 0
+        self._since_update = 0
+
+    def add_pcm(self, data: bytes):
+        """Append a chunk of raw PCM (any length, split samples are carried over)."""
+        dtype = SAMPLE_FORMATS[self.sample_format]
+        width = np.dtype(dtype).itemsize
+        data = self._pending + data
+        usable = len(data) - len(data) % width
+        self._pending = data[usable:]
+        if usable == 0:
+            return
+
+        samples = np.frombuffer(data[:usable], dtype=dtype).astype(np.float32)
+        if dtype == np.int16:
+            samples /= 32768.0
+
+        self.total_seconds += len(samples) / self.sample_rate
+        if self.total_seconds > MAX_STREAM_SECONDS:
+            raise ValueError(f"Stream exceeds {MAX_STREAM_SECONDS:.0f} s of audio")
+
+        self._chunks.append(samples)
+        self._buffered += len(samples)
+        self._since_update += len(samples)
+
+    def should_update(self) -> bool:
+        """True once STEP_SECONDS of audio arrived since the last draft."""
+        return self._since_update >= STEP_SECONDS * self.sample_rate
+
+    def _buffer(self) -> np.ndarray:
+        """Uncommitted audio at 16 kHz."""
+        if not self._chunks:
+            return np.zeros(0, dtype=np.float32)
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+        return resample(self._chunks[0], self.sample_rate, TARGET_SAMPLE_RATE)
+
+    def _drop(self, samples_16k: int):
+        """Remove committed audio (given in 16 kHz samples) from the buffer front."""
+        if not self._chunks:
+            return
+        cut = min(len(self._chunks[0]), int(round(samples_16k * self.sample_rate / TARGET_SAMPLE_RATE)))
+        # Chunks that arrived while the commit was transcribed stay queued behind it
+        self._chunks[0] = self._chunks[0][cut:]
+        self._buffered -= cut
+
+    async def _transcribe(self, audio: np.ndarray) -> str:
+        """Transcribe 16 kHz audio with the parser's Whisper path."""
+        if len(audio) == 0:
+            return ""
+        texts = await self.run_model("_transcribe_audios", [audio])
+        return texts[0].strip()
+
+    def _commit_point(self, audio: np.ndarray) -> int:
+        """Sample offset (16 kHz) up to which the buffer can be committed, 0 for none."""
+        pause = int(COMMIT_PAUSE_SECONDS * TARGET_SAMPLE_RATE)
+        segments = detect_speech(audio, TARGET_SAMPLE_RATE)
+        # Last speech segment followed by a long enough pause
+        for _, end in reversed(segments):
+            if len(audio) - end >= pause:
+                return end
+        if len(audio) >= WINDOW_SECONDS * TARGET_SAMPLE_RATE:
+            return len(audio)
+        return 0
+
+    def text(self) -> str:
+        """Committed text plus the current draft of the tail."""
+        return " ".join(part for part in self.committed_text + [self.draft_text] if part)
+
+    def draft(self) -> Dict[str, Any]:
+        """Fields the rule-based extractor already recognizes in the text so far."""
+        result = extract_transaction(self.text())
+        confidence = result.pop("field_confidence")
+        fields = {field: result[field] for field, score in confidence.items() if score > 0}
+        fields["field_confidence"] = {field: score for field, score in confidence.items() if score > 0}
+        return fields
+
+    async def update(self) -> Dict[str, Any]:
+        """Commit finished speech, re-transcribe the tail and return a partial message."""
+        self._since_update = 0
+        audio = self._buffer()
+
+        commit = self._commit_point(audio)
+        if commit:
+            committed = await self._transcribe(audio[:commit])
+            if committed:
+                self.committed_text.append(committed)
+            self._drop(commit)
+            audio = audio[commit:]
+
+        self.draft_text = await self._transcribe(audio) if detect_speech(audio, TARGET_SAMPLE_RATE) else ""
+        return {"type": "partial", "text": self.text(), "draft": self.draft()}
+
+    async def finish(self) -> Dict[str, Any]:
+        """Transcribe the remaining tail and run the full parse on the final text."""
+        self._pending = b""
+        tail = await self._transcribe(self._buffer())
+        self._chunks = []
+        self._buffered = 0
+        if tail:
+            self.committed_text.append(tail)
+        self.draft_text = ""
+
+        text = self.text()
+        if len(text) < 5:
+            result = {
+                "error": "Could not transcribe audio. Please ensure the recording is clear.",
+                "confidence": 0.0
+            }
+        else:
+            result = await self.run_model("_parse_text_to_transaction", text, self.user_id)
+            # Live results are never cached; drop the fallback marker (see result_cache.py)
+            result.pop(NO_CACHE, None)
+        return {"type": "final", "text": text, "result": result}
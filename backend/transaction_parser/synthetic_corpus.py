@@ -0,0 +1,233 @@
+"""
+Synthetic Corpus - Rendered Receipts and Fixture Voice Clips
+============================================================
+
+Builds a reproducible benchmark corpus without shipping private receipts:
+
+    receipts  rendered with PIL from a set of receipt specs, varying font,
+              resolution, background noise, blur, rotation and JPEG quality
+    voice     fixture sentences (VOICE_FIXTURES) synthesized to WAV with
+              espeak-ng/espeak when available; otherwise speech-like tone
+              clips of similar length, which still exercise decode/VAD/ASR
+              latency but have no expected fields
+
+The corpus directory gets a manifest.json in the format precision_report.py
+reads, with the fields expected from each item.
+
+Usage:
+    python synthetic_corpus.py benchmark_corpus --receipts 24 --seed 7
+"""
+
+import os
+import json
+import random
+import shutil
+import argparse
+import subprocess
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Merchant, category, items (name, price), payment method
+RECEIPT_SPECS = [
+    ("DMART", "Groceries", [("Milk 1L", 45.0), ("Bread", 30.0), ("Eggs 12", 84.0)], "UPI"),
+    ("INDIAN OIL", "Fuel", [("Petrol 12.5L", 1312.5)], "Card"),
+    ("CAFE COFFEE DAY", "Food", [("Cappuccino", 180.0), ("Sandwich", 160.0)], "Cash"),
+    ("BIG BAZAAR", "Groceries", [("Rice 5kg", 420.0), ("Atta 5kg", 265.0), ("Oil 1L", 155.0)], "UPI"),
+    ("SWIGGY", "Food", [("Biryani", 249.0), ("Delivery fee", 30.0)], "UPI"),
+    ("AIRTEL", "Phone", [("Prepaid recharge", 299.0)], "UPI"),
+    ("MRF TYRES", "Maintenance", [("Puncture repair", 150.0), ("Air check", 0.0)], "Cash"),
+    ("APOLLO PHARMACY", "Other", [("Paracetamol", 32.0), ("Bandage", 45.0)], "Card"),
+]
+
+# Sentences for voice fixtures with the fields expected from them
+VOICE_FIXTURES = [
+    ("I spent 500 rupees on food at McDonald's today",
+     {"amount": 500, "transaction_type": "expense", "category": "Food"}),
+    ("Received 2000 from Uber delivery",
+     {"amount": 2000, "transaction_type": "income", "category": "Delivery"}),
+    ("Paid 1500 for fuel at Indian Oil",
+     {"amount": 1500, "transaction_type": "expense", "category": "Fuel"}),
+    ("Bought groceries worth 800 rupees from Big Bazaar",
+     {"amount": 800, "transaction_type": "expense", "category": "Groceries"}),
+    ("Swiggy payout credited 3450 for this week",
+     {"amount": 3450, "transaction_type": "income", "category": "Delivery"}),
+    ("Paid 299 for phone recharge using UPI",
+     {"amount": 299, "transaction_type": "expense", "category": "Phone", "payment_method": "UPI"}),
+]
+
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationMono-Regular.ttf",
+    "/usr/share/fonts/truetype/freefont/FreeMono.ttf",
+    "/Library/Fonts/Courier New.ttf",
+    "C:/Windows/Fonts/consola.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+# Receipt width in px before scaling, and the scale factors sampled
+BASE_WIDTH = 576
+SCALES = [0.75, 1.0, 1.5, 2.5]
+
+
+def available_fonts() -> List[Optional[str]]:
+    """TrueType fonts found on this machine; None stands for PIL's built-in font."""
+    fonts = [path for path in FONT_CANDIDATES if os.path.exists(path)]
+    return fonts or [None]
+
+
+def _font(path: Optional[str], size: int):
+    if path is None:
+        try:
+            return ImageFont.load_default(size=size)
+        except TypeError:  # Pillow < 10.1 has no sized default font
+            return ImageFont.load_default()
+    return ImageFont.truetype(path, size)
+
+
+def receipt_lines(spec, day: date) -> List[str]:
+    """Text lines of a receipt spec."""
+    merchant, _, items, payment = spec
+    total = sum(price for _, price in items)
+    lines = [merchant, "TAX INVOICE", day.strftime("%d/%m/%Y") + "  14:32", "-" * 28]
+    lines += [f"{name:<18}{price:>10.2f}" for name, price in items]
+    lines += ["-" * 28, f"{'TOTAL':<18}{total:>10.2f}", f"PAID BY {payment}", "THANK YOU VISIT AGAIN"]
+    return lines
+
+
+def render_receipt(spec, day: date, font_path: Optional[str] = None, scale: float = 1.0,
+                   rotation: float = 0.0, noise: float = 0.0, blur: float = 0.0) -> Image.Image:
+    """
+    Render one receipt.
+
+    Args:
+        spec: Entry of RECEIPT_SPECS
+        day: Printed date
+        font_path: TrueType font, or None for PIL's default
+        scale: Resolution multiplier over BASE_WIDTH
+        rotation: Degrees (counter-clockwise), as from a hand-held photo
+        noise: Standard deviation of Gaussian pixel noise (0-255 scale)
+        blur: Gaussian blur radius in px
+    """
+    width = int(BASE_WIDTH * scale)
+    size = max(10, int(24 * scale))
+    font = _font(font_path, size)
+    lines = receipt_lines(spec, day)
+    line_height = int(size * 1.5)
+    margin = int(32 * scale)
+
+    image = Image.new("L", (width, margin * 2 + line_height * len(lines)), color=246)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((margin, margin + i * line_height), line, fill=20, font=font)
+
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    if noise:
+        pixels = np.asarray(image, dtype=np.float32)
+        pixels += np.random.default_rng(int(noise * 1000) + width).normal(0, noise, pixels.shape)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    if rotation:
+        image = image.rotate(rotation, resample=Image.BILINEAR, expand=True, fillcolor=200)
+    return image.convert("RGB")
+
+
+def _tts_command() -> Optional[str]:
+    for command in ("espeak-ng", "espeak"):
+        if shutil.which(command):
+            return command
+    return None
+
+
+def synthesize_voice(text: str, path: str) -> bool:
+    """Speak text to a WAV file with espeak-ng/espeak; False if no TTS is installed."""
+    command = _tts_command()
+    if command is None:
+        return False
+    subprocess.run([command, "-s", "150", "-w", path, text], check=True, capture_output=True)
+    return True
+
+
+def tone_clip(seconds: float, sr: int = 16000, seed: int = 0) -> np.ndarray:
+    """Speech-like stand-in: syllable-gated harmonics with pauses and noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sr
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    syllables = (np.sin(2 * np.pi * 4 * t) > 0) & (np.sin(2 * np.pi * 0.4 * t) > -0.6)
+    audio = 0.25 * voiced * syllables + 0.005 * rng.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+def build_corpus(out_dir: str, receipts: int = 24, seed: int = 7) -> Dict[str, Any]:
+    """
+    Write receipts, voice clips and manifest.json to out_dir.
+
+    Returns:
+        The manifest ({"images": [...], "voice": [...]} with paths relative to out_dir)
+    """
+    rng = random.Random(seed)
+    fonts = available_fonts()
+    os.makedirs(os.path.join(out_dir, "receipts"), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, "voice"), exist_ok=True)
+    manifest: Dict[str, Any] = {"images": [], "voice": []}
+
+    for i in range(receipts):
+        spec = RECEIPT_SPECS[i % len(RECEIPT_SPECS)]
+        day = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+        image = render_receipt(
+            spec, day,
+            font_path=rng.choice(fonts),
+            scale=rng.choice(SCALES),
+            rotation=rng.uniform(-4, 4),
+            noise=rng.choice([0.0, 6.0, 14.0]),
+            blur=rng.choice([0.0, 0.0, 0.8]),
+        )
+        name = f"receipts/receipt_{i:03d}.jpg"
+        image.save(os.path.join(out_dir, name), quality=rng.choice([60, 80, 95]))
+        manifest["images"].append({
+            "path": name,
+            "expected": {
+                "amount": round(sum(price for _, price in spec[2]), 2),
+                "category": spec[1],
+                "transaction_date": day.isoformat(),
+            },
+        })
+
+    for i, (text, expected) in enumerate(VOICE_FIXTURES):
+        name = f"voice/voice_{i:02d}.wav"
+        path = os.path.join(out_dir, name)
+        if synthesize_voice(text, path):
+            manifest["voice"].append({"path": name, "text": text, "expected": expected})
+        else:
+            # No TTS: keep a same-length stand-in for latency, without expected fields
+            sf.write(path, tone_clip(len(text.split()) * 0.4 + 1.0, seed=i), 16000)
+            manifest["voice"].append({"path": name, "text": text, "expected": {}})
+
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Render a synthetic receipt/voice benchmark corpus")
+    arg_parser.add_argument("out_dir")
+    arg_parser.add_argument("--receipts", type=int, default=24)
+    arg_parser.add_argument("--seed", type=int, default=7)
+    args = arg_parser.parse_args()
+
+    manifest = build_corpus(args.out_dir, args.receipts, args.seed)
+    spoken = sum(1 for item in manifest["voice"] if item["expected"])
+    print(f"Wrote {len(manifest['images'])} receipts and {len(manifest['voice'])} voice clips "
+          f"({spoken} synthesized speech) to {args.out_dir}")
+    if not spoken:
+        print("No espeak-ng/espeak found: voice clips are tone stand-ins (latency only)")
+
+
+if __name__ == "__main__":
+    main()
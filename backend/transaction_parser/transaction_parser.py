@@ -12,14 +12,25 @@ Usage:
     
     # Voice parsing
     result = parser.parse_voice("recording.wav")
+
+    # Batch image parsing (one OCR forward pass per batch)
+    results = parser.parse_images(["receipt1.jpg", "receipt2.jpg"])
+
+    # TrOCR and Whisper on ONNX Runtime instead of eager PyTorch
+    parser = TransactionParser(engine={"ocr": "onnx", "whisper": "onnx"})
 """
 
 import os
+import io
 import json
 import re
-from typing import Dict, Optional, Any
+import copy
+import time
+import contextlib
+from typing import Dict, List, Optional, Any, Tuple, Union
 from pathlib import Path
 from PIL import Image
+import numpy as np
 import torch
 from transformers import (
     TrOCRProcessor,
@@ -28,41 +39,232 @@ from transformers import (
     AutoModelForSpeechSeq2Seq,
     AutoTokenizer,
     AutoModelForCausalLM,
+    DynamicCache,
+    LogitsProcessorList,
+    StoppingCriteriaList,
     pipeline
 )
-import librosa
-import soundfile as sf
+from ocr_preprocessing import normalize_image, segment_lines
+from audio_preprocessing import decode_audio, split_speech_windows
+from rule_extractor import extract_transaction, needs_llm, CONFIDENCE_THRESHOLD
+from result_cache import ResultCache, DEFAULT_DISK_PATH, NO_CACHE, mark_uncacheable
+from constrained_decoding import TransactionJsonConstraint, build_token_strings
+from extractors import create_extractor
+from uploads import UploadSource, read_upload, describe_upload
+from parser_metrics import METRICS
+from merchant_index import MerchantIndex, apply_profile, DEFAULT_INDEX_PATH
+from onnx_engine import ENGINE_MODES, load_ort_model, export_ort_model
 
 # Hugging Face token (get from environment variable)
 HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN", None)
 
+# Model checkpoints
+OCR_MODEL_NAME = "microsoft/trocr-base-printed"
+WHISPER_MODEL_NAME = "openai/whisper-small"
+LLM_MODEL_NAME = "microsoft/Phi-3-mini-4k-instruct"
+LLM_FALLBACK_MODEL_NAME = "microsoft/Phi-2"
+
+# Extraction prompt. Everything before {text} is identical for every request,
+# so its KV cache is computed once per process and reused (see _prepare_prompt_cache)
+LLM_SYSTEM_PROMPT = "You are a helpful assistant that extracts transaction information from text and returns only valid JSON."
+LLM_PROMPT_TEMPLATE = """Extract transaction details from the following text and return ONLY a valid JSON object with these fields:
+- amount (number, required)
+- transaction_type ("income" or "expense", required)
+- category (string, one of: Food, Fuel, Rent, Groceries, Maintenance, Phone, EMI, Misc, Delivery, Freelance, Salary, Other)
+- merchant_name (string, optional)
+- description (string, optional)
+- payment_method (string, one of: UPI, Cash, Card, Bank Transfer, optional)
+- location (string, optional)
+- transaction_date (string in YYYY-MM-DD format, use today if not mentioned: 2024-01-15)
+- transaction_time (string in HH:MM format, use current time if not mentioned: 14:30)
+
+Text: {text}
+
+Return ONLY the JSON object, no other text:"""
+
+# Reuse the static prompt prefix KV cache across requests (set LLM_PROMPT_CACHE=0 to disable)
+LLM_PROMPT_CACHE = os.getenv("LLM_PROMPT_CACHE", "1") == "1"
+
+# Constrain LLM output to the transaction JSON schema and stop when it closes
+# (set LLM_CONSTRAINED_DECODING=0 for free-running sampling)
+LLM_CONSTRAINED_DECODING = os.getenv("LLM_CONSTRAINED_DECODING", "1") == "1"
+
+# Second-tier field extractor: causal-lm, token-classification, seq2seq or rules
+EXTRACTOR_BACKEND = os.getenv("EXTRACTOR_BACKEND", "causal-lm")
+
+# Cache parse results by upload content (set PARSER_CACHE=0 to disable)
+PARSER_CACHE = os.getenv("PARSER_CACHE", "1") == "1"
+PARSER_CACHE_PATH = os.getenv("PARSER_CACHE_PATH", DEFAULT_DISK_PATH)
+
+# Per-user merchant index from verified transactions, consulted before the LLM
+MERCHANT_INDEX = os.getenv("MERCHANT_INDEX", "1") == "1"
+MERCHANT_INDEX_PATH = os.getenv("MERCHANT_INDEX_PATH", DEFAULT_INDEX_PATH)
+
+# Maximum number of line crops stacked into a single OCR generate call
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "32"))
+
+# Maximum number of 30 s audio windows stacked into a single Whisper generate call
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))
+
+# Split receipts into text lines before OCR (TrOCR only reads one line at a time)
+OCR_SEGMENT_LINES = os.getenv("OCR_SEGMENT_LINES", "1") == "1"
+
+# Normalize uploads before OCR (reduced-resolution JPEG decode, EXIF rotation,
+# size cap, grayscale, contrast stretch, deskew)
+OCR_NORMALIZE_IMAGES = os.getenv("OCR_NORMALIZE_IMAGES", "1") == "1"
+
+# Inference precision per model: "fp32", "bf16" (autocast) or "int8" (dynamic
+# quantization of Linear layers, CPU only)
+PRECISION_MODES = ("fp32", "bf16", "int8")
+DEFAULT_PRECISION = {
+    "ocr": os.getenv("OCR_PRECISION", "fp32"),
+    "whisper": os.getenv("WHISPER_PRECISION", "fp32"),
+    "llm": os.getenv("LLM_PRECISION", "fp32"),
+}
+
+# Execution engine of the encoder-decoder models: "torch" (eager generate) or
+# "onnx" (exported graphs on ONNX Runtime's CPU provider, see onnx_engine.py)
+DEFAULT_ENGINE = {
+    "ocr": os.getenv("OCR_ENGINE", "torch"),
+    "whisper": os.getenv("WHISPER_ENGINE", "torch"),
+}
+
 class TransactionParser:
     """Main parser class for image and voice transaction input."""
     
-    def __init__(self):
-        """Initialize models (lazy loading on first use)."""
+    def __init__(
+        self,
+        precision: Optional[Dict[str, str]] = None,
+        cache: Optional[ResultCache] = None,
+        extractor: Optional[str] = None,
+        merchant_index: Optional[MerchantIndex] = None,
+        engine: Optional[Dict[str, str]] = None
+    ):
+        """
+        Initialize models (lazy loading on first use).
+        
+        Args:
+            precision: Optional per-model precision overrides, e.g.
+                {"llm": "int8", "whisper": "bf16"}. Defaults come from the
+                OCR_PRECISION / WHISPER_PRECISION / LLM_PRECISION env vars.
+            cache: Optional result cache; by default one is created unless
+                PARSER_CACHE=0.
+            extractor: Field extractor backend used when rules are not
+                confident (see extractors.py); defaults to EXTRACTOR_BACKEND.
+            merchant_index: Optional per-user merchant index; by default one
+                is created unless MERCHANT_INDEX=0.
+            engine: Optional per-model engine overrides, e.g.
+                {"ocr": "onnx", "whisper": "onnx"}. Defaults come from the
+                OCR_ENGINE / WHISPER_ENGINE env vars.
+        """
         self.ocr_processor = None
         self.ocr_model = None
         self.whisper_processor = None
         self.whisper_model = None
         self.llm_tokenizer = None
         self.llm_model = None
+        # Static prompt prefix: token ids, its KV cache, and the chat-template text after {text}
+        self._prompt_prefix_ids = None
+        self._prompt_cache = None
+        self._prompt_suffix = None
+        # Decoded text of every vocabulary entry, built once for constrained decoding
+        self._token_strings = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Per-model load/warmup timings, filled in by warmup()
+        self.model_status: Dict[str, Dict[str, Any]] = {}
+        
+        self.precision = {**DEFAULT_PRECISION, **(precision or {})}
+        for name, mode in self.precision.items():
+            if mode not in PRECISION_MODES:
+                raise ValueError(f"Invalid precision '{mode}' for {name}, expected one of {PRECISION_MODES}")
+        
+        self.engine = {**DEFAULT_ENGINE, **(engine or {})}
+        for name, mode in self.engine.items():
+            if mode not in ENGINE_MODES:
+                raise ValueError(f"Invalid engine '{mode}' for {name}, expected one of {ENGINE_MODES}")
+        # Intra-op threads of ONNX Runtime sessions (None = all cores); set per worker
+        self.onnx_threads: Optional[int] = None
+        
+        self.extractor = create_extractor(extractor or EXTRACTOR_BACKEND, self)
+        
+        # Results depend on models, precision and preprocessing, so all of them go in the key
+        self.fingerprint = "|".join([
+            OCR_MODEL_NAME, WHISPER_MODEL_NAME, LLM_MODEL_NAME, self.extractor.name,
+            ",".join(f"{k}={v}" for k, v in sorted(self.precision.items())),
+            ",".join(f"{k}-engine={v}" for k, v in sorted(self.engine.items())),
+            f"segment={int(OCR_SEGMENT_LINES)}",
+            f"normalize={int(OCR_NORMALIZE_IMAGES)}",
+        ])
+        if cache is None and PARSER_CACHE:
+            cache = ResultCache(disk_path=PARSER_CACHE_PATH)
+        self.cache = cache
+        if merchant_index is None and MERCHANT_INDEX:
+            merchant_index = MerchantIndex(disk_path=MERCHANT_INDEX_PATH)
+        self.merchant_index = merchant_index
+        
         print(f"Using device: {self.device}")
+        print(f"Precision: {self.precision}")
+        print(f"Engine: {self.engine}")
+        print(f"Extractor backend: {self.extractor.name}")
+    
+    def _apply_precision(self, model, name: str):
+        """Quantize a freshly loaded model if its precision mode asks for it."""
+        if self.precision[name] == "int8":
+            if self.device != "cpu":
+                print(f"int8 dynamic quantization is CPU-only, running {name} in default precision")
+                return model
+            print(f"Applying dynamic int8 quantization to {name}")
+            return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+    
+    def _precision_context(self, name: str):
+        """Return the autocast context to run a model's forward passes under."""
+        if self.precision[name] == "bf16" and self.engine.get(name, "torch") == "torch":
+            return torch.autocast(device_type=self.device, dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+    
+    def _model_device(self, name: str) -> str:
+        """Device a model's inputs go to (ONNX Runtime sessions run on the CPU provider)."""
+        return "cpu" if self.engine.get(name, "torch") == "onnx" else self.device
+    
+    def reload_onnx_models(self, num_threads: Optional[int] = None):
+        """
+        Drop ONNX Runtime sessions so they reopen from the on-disk graph cache.
+        
+        ORT thread pools do not survive a fork, so pool workers call this
+        with their CPU count before their first request.
+        """
+        self.onnx_threads = num_threads
+        if self.engine["ocr"] == "onnx":
+            self.ocr_processor = None
+            self.ocr_model = None
+        if self.engine["whisper"] == "onnx":
+            self.whisper_processor = None
+            self.whisper_model = None
     
     def _load_ocr_models(self):
         """Load OCR models (TrOCR) for image text extraction."""
         if self.ocr_processor is None:
             print("Loading OCR models...")
+            start = time.perf_counter()
             try:
                 self.ocr_processor = TrOCRProcessor.from_pretrained(
-                    "microsoft/trocr-base-printed",
+                    OCR_MODEL_NAME,
                     token=HF_TOKEN
                 )
-                self.ocr_model = VisionEncoderDecoderModel.from_pretrained(
-                    "microsoft/trocr-base-printed",
-                    token=HF_TOKEN
-                ).to(self.device)
+                if self.engine["ocr"] == "onnx":
+                    self.ocr_model = load_ort_model(
+                        OCR_MODEL_NAME, "ocr", self.precision["ocr"],
+                        token=HF_TOKEN, num_threads=self.onnx_threads
+                    )
+                else:
+                    self.ocr_model = VisionEncoderDecoderModel.from_pretrained(
+                        OCR_MODEL_NAME,
+                        token=HF_TOKEN
+                    ).to(self.device)
+                    self.ocr_model = self._apply_precision(self.ocr_model, "ocr")
+                METRICS.observe("parser_stage_seconds", time.perf_counter() - start,
+                                stage="model_load", parser="local", model="ocr", engine=self.engine["ocr"])
                 print("OCR models loaded successfully")
             except Exception as e:
                 print(f"Error loading OCR models: {e}")
@@ -72,15 +274,25 @@ class TransactionParser:
         """Load Whisper models for speech-to-text."""
         if self.whisper_processor is None:
             print("Loading Whisper models...")
+            start = time.perf_counter()
             try:
                 self.whisper_processor = AutoProcessor.from_pretrained(
-                    "openai/whisper-small",
+                    WHISPER_MODEL_NAME,
                     token=HF_TOKEN
                 )
-                self.whisper_model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                    "openai/whisper-small",
-                    token=HF_TOKEN
-                ).to(self.device)
+                if self.engine["whisper"] == "onnx":
+                    self.whisper_model = load_ort_model(
+                        WHISPER_MODEL_NAME, "whisper", self.precision["whisper"],
+                        token=HF_TOKEN, num_threads=self.onnx_threads
+                    )
+                else:
+                    self.whisper_model = AutoModelForSpeechSeq2Seq.from_pretrained(
+                        WHISPER_MODEL_NAME,
+                        token=HF_TOKEN
+                    ).to(self.device)
+                    self.whisper_model = self._apply_precision(self.whisper_model, "whisper")
+                METRICS.observe("parser_stage_seconds", time.perf_counter() - start,
+                                stage="model_load", parser="local", model="whisper", engine=self.engine["whisper"])
                 print("Whisper models loaded successfully")
             except Exception as e:
                 print(f"Error loading Whisper models: {e}")
@@ -90,9 +302,10 @@ class TransactionParser:
         """Load LLM models (Phi-3-mini) for text parsing."""
         if self.llm_tokenizer is None:
             print("Loading LLM models...")
+            start = time.perf_counter()
             try:
                 # Using Phi-3-mini for parsing
-                model_name = "microsoft/Phi-3-mini-4k-instruct"
+                model_name = LLM_MODEL_NAME
                 self.llm_tokenizer = AutoTokenizer.from_pretrained(
                     model_name,
                     token=HF_TOKEN,
@@ -107,13 +320,16 @@ class TransactionParser:
                 )
                 if self.device == "cpu":
                     self.llm_model = self.llm_model.to(self.device)
+                self.llm_model = self._apply_precision(self.llm_model, "llm")
+                METRICS.observe("parser_stage_seconds", time.perf_counter() - start,
+                                stage="model_load", parser="local", model="llm")
                 print("LLM models loaded successfully")
             except Exception as e:
                 print(f"Error loading LLM models: {e}")
                 # Fallback to a simpler model if Phi-3 fails
                 print("Trying fallback model...")
                 try:
-                    model_name = "microsoft/Phi-2"
+                    model_name = LLM_FALLBACK_MODEL_NAME
                     self.llm_tokenizer = AutoTokenizer.from_pretrained(
                         model_name,
                         token=HF_TOKEN,
@@ -125,199 +341,446 @@ class TransactionParser:
                         trust_remote_code=True,
                         torch_dtype=torch.float32,
                     ).to(self.device)
+                    self.llm_model = self._apply_precision(self.llm_model, "llm")
+                    METRICS.observe("parser_stage_seconds", time.perf_counter() - start,
+                                    stage="model_load", parser="local", model="llm")
                     print("Fallback LLM models loaded successfully")
                 except Exception as e2:
                     print(f"Fallback also failed: {e2}")
                     raise
     
-    def _extract_text_from_image(self, image_path: str) -> str:
+    def _warmup_ocr(self):
+        """Run a tiny TrOCR generate so the first real request skips lazy init."""
+        dummy = Image.new("RGB", (384, 384), "white")
+        pixel_values = self.ocr_processor(images=dummy, return_tensors="pt").pixel_values
+        with torch.no_grad(), self._precision_context("ocr"):
+            self.ocr_model.generate(pixel_values.to(self._model_device("ocr")), max_new_tokens=2)
+    
+    def _warmup_whisper(self):
+        """Run a tiny Whisper generate on one second of silence."""
+        silence = np.zeros(16000, dtype=np.float32)
+        inputs = self.whisper_processor(silence, sampling_rate=16000, return_tensors="pt")
+        inputs = {k: v.to(self._model_device("whisper")) for k, v in inputs.items()}
+        with torch.no_grad(), self._precision_context("whisper"):
+            self.whisper_model.generate(**inputs, max_new_tokens=2)
+    
+    def _warmup_llm(self):
+        """Prefill the cached prompt prefix and run a single-token LLM generate."""
+        self._prepare_prompt_cache()
+        inputs = self.llm_tokenizer("Hello", return_tensors="pt").to(self.device)
+        with torch.no_grad(), self._precision_context("llm"):
+            self.llm_model.generate(
+                **inputs,
+                max_new_tokens=1,
+                do_sample=False,
+                pad_token_id=self.llm_tokenizer.eos_token_id
+            )
+    
+    def load_models(self, onnx_sessions: bool = True):
+        """
+        Load every model without running it (e.g. before forking workers).
+        
+        Args:
+            onnx_sessions: False to only export ONNX-engine models to the
+                graph cache without opening ONNX Runtime sessions, which are
+                not fork-safe (pool workers open their own)
+        """
+        for name, model_name, load in (("ocr", OCR_MODEL_NAME, self._load_ocr_models),
+                                       ("whisper", WHISPER_MODEL_NAME, self._load_whisper_models)):
+            if self.engine[name] == "onnx" and not onnx_sessions:
+                export_ort_model(model_name, name, self.precision[name], token=HF_TOKEN)
+            else:
+                load()
+        self.extractor.load()
+    
+    def warmup(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Eagerly load every model and warm it with a dummy forward pass.
+        
+        Returns:
+            Per-model status, e.g.
+            {"ocr": {"ready": True, "load_seconds": 4.2, "warmup_seconds": 0.8}, ...};
+            the field extractor reports under "llm" (the /health/ready schema)
+            with its backend name in "extractor"
+        """
+        stages = [
+            ("ocr", self._load_ocr_models, self._warmup_ocr),
+            ("whisper", self._load_whisper_models, self._warmup_whisper),
+            ("llm", self.extractor.load, self.extractor.warmup),
+        ]
+        
+        for name, load, warm in stages:
+            self.model_status[name] = {"ready": False}
+            try:
+                start = time.perf_counter()
+                load()
+                loaded = time.perf_counter()
+                warm()
+                warmed = time.perf_counter()
+                
+                self.model_status[name] = {
+                    "ready": True,
+                    "load_seconds": round(loaded - start, 3),
+                    "warmup_seconds": round(warmed - loaded, 3),
+                }
+                print(f"Model '{name}' ready (load {loaded - start:.1f}s, warmup {warmed - loaded:.1f}s)")
+            except Exception as e:
+                print(f"Error warming up model '{name}': {e}")
+                self.model_status[name] = {"ready": False, "error": str(e)}
+        self.model_status["llm"]["extractor"] = self.extractor.name
+        
+        return self.model_status
+    
+    def is_ready(self) -> bool:
+        """Return True once warmup() has loaded and warmed every model."""
+        return (
+            len(self.model_status) == 3
+            and all(status.get("ready") for status in self.model_status.values())
+        )
+    
+    def _decode_image(self, data: bytes) -> Image.Image:
+        """Decode an uploaded image from memory."""
+        with METRICS.time("decode", parser="local", kind="image"):
+            if OCR_NORMALIZE_IMAGES:
+                return normalize_image(data)
+            return Image.open(io.BytesIO(data)).convert("RGB")
+    
+    def _decode_audio(self, data: bytes) -> np.ndarray:
+        """Decode an uploaded recording from memory to 16 kHz mono."""
+        with METRICS.time("decode", parser="local", kind="voice"):
+            return decode_audio(data, 16000)
+    
+    def _count_tokens(self, generated_ids, tokenizer) -> int:
+        """Number of non-padding tokens in a batch of generated sequences."""
+        if tokenizer.pad_token_id is None:
+            return int(generated_ids.numel())
+        return int((generated_ids != tokenizer.pad_token_id).sum().item())
+    
+    def _extract_text_from_image(self, image: UploadSource) -> str:
         """Extract text from image using TrOCR."""
+        return self._extract_text_from_images([image])[0]
+    
+    def _extract_text_from_images(self, images: List[Union[UploadSource, Image.Image]]) -> List[str]:
+        """
+        Extract text from several images with batched TrOCR calls.
+        
+        Each receipt is split into text lines first, then the line crops of
+        all images are decoded together and re-joined per image.
+        """
         self._load_ocr_models()
         
         try:
-            # Load and preprocess image
-            image = Image.open(image_path).convert("RGB")
+            # Load and preprocess images (uploads are decoded here, PIL images pass through)
+            images = [
+                image if isinstance(image, Image.Image) else self._decode_image(read_upload(image))
+                for image in images
+            ]
+            images = [image.convert("RGB") for image in images]
+            
+            # Segment each receipt into line crops, remembering which image they came from
+            crops = []
+            owners = []
+            for index, image in enumerate(images):
+                lines = segment_lines(image) if OCR_SEGMENT_LINES else [image]
+                crops.extend(lines)
+                owners.extend([index] * len(lines))
             
-            # Process image
-            pixel_values = self.ocr_processor(images=image, return_tensors="pt").pixel_values
-            pixel_values = pixel_values.to(self.device)
+            line_texts = []
+            for start in range(0, len(crops), OCR_BATCH_SIZE):
+                chunk = crops[start:start + OCR_BATCH_SIZE]
+                
+                # Process images into a single stacked pixel_values tensor
+                pixel_values = self.ocr_processor(images=chunk, return_tensors="pt").pixel_values
+                pixel_values = pixel_values.to(self._model_device("ocr"))
+                
+                # Generate text for the whole chunk at once
+                with torch.no_grad(), self._precision_context("ocr"), METRICS.time("ocr_generate", parser="local", engine=self.engine["ocr"]):
+                    generated_ids = self.ocr_model.generate(pixel_values)
+                METRICS.count("parser_tokens_total", self._count_tokens(generated_ids, self.ocr_processor.tokenizer),
+                              stage="ocr_generate", direction="output")
+                generated_texts = self.ocr_processor.batch_decode(generated_ids, skip_special_tokens=True)
+                
+                line_texts.extend(text.strip() for text in generated_texts)
             
-            # Generate text
-            generated_ids = self.ocr_model.generate(pixel_values)
-            generated_text = self.ocr_processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+            # Re-assemble full receipt text, one OCR line per text line
+            texts = [[] for _ in images]
+            for owner, line_text in zip(owners, line_texts):
+                if line_text:
+                    texts[owner].append(line_text)
             
-            return generated_text.strip()
+            return ["\n".join(lines) for lines in texts]
         except Exception as e:
             print(f"Error extracting text from image: {e}")
             raise
     
-    def _transcribe_audio(self, audio_path: str) -> str:
+    def _transcribe_audio(self, audio: UploadSource) -> str:
         """Transcribe audio to text using Whisper."""
+        return self._transcribe_audios([audio])[0]
+    
+    def _transcribe_audios(self, audios: List[Union[UploadSource, np.ndarray]]) -> List[str]:
+        """
+        Transcribe several recordings with batched Whisper calls.
+        
+        Silence is trimmed and long recordings are split into 30 s windows;
+        the windows of all recordings are transcribed together and joined
+        back per recording, in order.
+        """
         self._load_whisper_models()
         
         try:
-            # Load audio file
-            audio, sr = librosa.load(audio_path, sr=16000)
+            # Load audio (uploads are decoded here, 16 kHz arrays pass through)
+            audios = [
+                audio if isinstance(audio, np.ndarray) else self._decode_audio(read_upload(audio))
+                for audio in audios
+            ]
             
-            # Process audio
-            inputs = self.whisper_processor(audio, sampling_rate=16000, return_tensors="pt")
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            # Drop silence and pack speech into Whisper-sized windows, remembering their recording
+            windows = []
+            owners = []
+            for index, audio in enumerate(audios):
+                speech = split_speech_windows(audio, 16000)
+                windows.extend(speech)
+                owners.extend([index] * len(speech))
             
-            # Generate transcription
-            with torch.no_grad():
-                generated_ids = self.whisper_model.generate(**inputs)
+            window_texts = []
+            for start in range(0, len(windows), WHISPER_BATCH_SIZE):
+                chunk = windows[start:start + WHISPER_BATCH_SIZE]
+                
+                # Process the windows into a single batch of input features
+                inputs = self.whisper_processor(chunk, sampling_rate=16000, return_tensors="pt")
+                inputs = {k: v.to(self._model_device("whisper")) for k, v in inputs.items()}
+                
+                # Generate transcription
+                with torch.no_grad(), self._precision_context("whisper"), METRICS.time("asr_generate", parser="local", engine=self.engine["whisper"]):
+                    generated_ids = self.whisper_model.generate(**inputs)
+                METRICS.count("parser_tokens_total", self._count_tokens(generated_ids, self.whisper_processor.tokenizer),
+                              stage="asr_generate", direction="output")
+                
+                window_texts.extend(self.whisper_processor.batch_decode(
+                    generated_ids, skip_special_tokens=True
+                ))
             
-            transcription = self.whisper_processor.batch_decode(
-                generated_ids, skip_special_tokens=True
-            )[0]
+            # Stitch windows back into one transcription per recording
+            texts = [[] for _ in audios]
+            for owner, window_text in zip(owners, window_texts):
+                if window_text.strip():
+                    texts[owner].append(window_text.strip())
             
-            return transcription.strip()
+            return [" ".join(parts) for parts in texts]
         except Exception as e:
             print(f"Error transcribing audio: {e}")
             raise
     
-    def _parse_text_to_transaction(self, text: str) -> Dict[str, Any]:
-        """Parse extracted text to structured transaction data using LLM."""
-        self._load_llm_models()
+    def _format_llm_prompt(self, text: str) -> str:
+        """Render the extraction prompt through the model's chat template."""
+        messages = [
+            {"role": "system", "content": LLM_SYSTEM_PROMPT},
+            {"role": "user", "content": LLM_PROMPT_TEMPLATE.format(text=text)}
+        ]
+        return self.llm_tokenizer.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=True
+        )
+    
+    def _prepare_prompt_cache(self):
+        """
+        Prefill the static part of the prompt once and keep its KV cache.
         
-        # Create prompt for LLM
-        prompt = f"""Extract transaction details from the following text and return ONLY a valid JSON object with these fields:
-- amount (number, required)
-- transaction_type ("income" or "expense", required)
-- category (string, one of: Food, Fuel, Rent, Groceries, Maintenance, Phone, EMI, Misc, Delivery, Freelance, Salary, Other)
-- merchant_name (string, optional)
-- description (string, optional)
-- payment_method (string, one of: UPI, Cash, Card, Bank Transfer, optional)
-- location (string, optional)
-- transaction_date (string in YYYY-MM-DD format, use today if not mentioned: 2024-01-15)
-- transaction_time (string in HH:MM format, use current time if not mentioned: 14:30)
-
-Text: {text}
-
-Return ONLY the JSON object, no other text:"""
+        The chat template is rendered around a placeholder and split there:
+        the part before it never changes, so its past_key_values are reused
+        and each request only prefills its own text plus the short suffix.
+        """
+        if self._prompt_cache is not None or not LLM_PROMPT_CACHE:
+            return
         
         try:
-            # Tokenize input
-            messages = [
-                {"role": "system", "content": "You are a helpful assistant that extracts transaction information from text and returns only valid JSON."},
-                {"role": "user", "content": prompt}
-            ]
+            placeholder = "<<TRANSACTION_TEXT>>"
+            prefix, suffix = self._format_llm_prompt(placeholder).split(placeholder)
             
-            # Format for Phi-3
-            formatted_prompt = self.llm_tokenizer.apply_chat_template(
-                messages, tokenize=False, add_generation_prompt=True
-            )
+            prefix_ids = self.llm_tokenizer(prefix, return_tensors="pt").input_ids.to(self.device)
+            with torch.no_grad(), self._precision_context("llm"):
+                outputs = self.llm_model(
+                    input_ids=prefix_ids,
+                    past_key_values=DynamicCache(),
+                    use_cache=True
+                )
             
-            inputs = self.llm_tokenizer(formatted_prompt, return_tensors="pt").to(self.device)
+            self._prompt_prefix_ids = prefix_ids
+            self._prompt_cache = outputs.past_key_values
+            self._prompt_suffix = suffix
             
-            # Generate response
-            with torch.no_grad():
-                outputs = self.llm_model.generate(
-                    **inputs,
-                    max_new_tokens=256,
-                    temperature=0.1,
-                    do_sample=True,
+            # Smoke-test generate() with the cache, some remote model code rejects it
+            with torch.no_grad(), self._precision_context("llm"):
+                self.llm_model.generate(
+                    **self._build_llm_inputs("test"),
+                    max_new_tokens=1,
+                    do_sample=False,
                     pad_token_id=self.llm_tokenizer.eos_token_id
                 )
-            
-            # Decode response
-            response = self.llm_tokenizer.decode(outputs[0][inputs['input_ids'].shape[1]:], skip_special_tokens=True)
-            
-            # Extract JSON from response
-            json_match = re.search(r'\{[^{}]*\}', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                transaction_data = json.loads(json_str)
-            else:
-                # Fallback: try to parse the whole response
-                transaction_data = json.loads(response.strip())
-            
-            # Validate and clean data
-            return self._validate_and_clean_transaction(transaction_data, text)
-            
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            # Fallback: use regex-based extraction
-            return self._regex_extract_transaction(text)
+            print(f"Cached prompt prefix ({prefix_ids.shape[1]} tokens)")
         except Exception as e:
-            print(f"Error parsing text with LLM: {e}")
-            # Fallback: use regex-based extraction
-            return self._regex_extract_transaction(text)
+            print(f"Prompt prefix cache unavailable, prefilling full prompts: {e}")
+            self._prompt_prefix_ids = None
+            self._prompt_cache = None
+            self._prompt_suffix = None
     
-    def _regex_extract_transaction(self, text: str) -> Dict[str, Any]:
-        """Fallback: Extract transaction data using regex patterns."""
-        from datetime import datetime
+    def _build_llm_inputs(self, text: str) -> Dict[str, Any]:
+        """Build generate() inputs, reusing the cached prompt prefix when available."""
+        self._prepare_prompt_cache()
         
-        result = {
-            "amount": None,
-            "transaction_type": "expense",
-            "category": "Misc",
-            "merchant_name": "",
-            "description": text[:100],
-            "payment_method": "",
-            "location": "",
-            "transaction_date": datetime.now().strftime("%Y-%m-%d"),
-            "transaction_time": datetime.now().strftime("%H:%M"),
-            "confidence": 0.5
-        }
+        if self._prompt_cache is None:
+            return dict(self.llm_tokenizer(self._format_llm_prompt(text), return_tensors="pt").to(self.device))
         
-        # Extract amount (look for ₹, Rs, rupees, etc.)
-        amount_patterns = [
-            r'₹\s*(\d+(?:\.\d{2})?)',
-            r'Rs\.?\s*(\d+(?:\.\d{2})?)',
-            r'(\d+(?:\.\d{2})?)\s*(?:rupees|rs|₹)',
-            r'(\d+(?:\.\d{2})?)\s*(?:paid|spent|received|earned)',
-        ]
+        # Only the request text and the fixed suffix need prefilling
+        suffix_ids = self.llm_tokenizer(
+            text + self._prompt_suffix, return_tensors="pt", add_special_tokens=False
+        ).input_ids.to(self.device)
+        input_ids = torch.cat([self._prompt_prefix_ids, suffix_ids], dim=1)
         
-        for pattern in amount_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    result["amount"] = float(match.group(1))
-                    break
-                except:
-                    pass
-        
-        # Determine transaction type
-        income_keywords = ["received", "earned", "income", "salary", "payment received"]
-        expense_keywords = ["spent", "paid", "purchase", "bought", "expense"]
-        
-        text_lower = text.lower()
-        if any(keyword in text_lower for keyword in income_keywords):
-            result["transaction_type"] = "income"
-        elif any(keyword in text_lower for keyword in expense_keywords):
-            result["transaction_type"] = "expense"
-        
-        # Extract category keywords
-        category_keywords = {
-            "Food": ["food", "restaurant", "mcdonald", "pizza", "lunch", "dinner", "breakfast"],
-            "Fuel": ["fuel", "petrol", "diesel", "gas", "gasoline"],
-            "Groceries": ["grocery", "groceries", "supermarket", "big bazaar"],
-            "Rent": ["rent", "rental"],
-            "Maintenance": ["maintenance", "repair"],
-            "Phone": ["phone", "mobile", "telecom"],
-            "Delivery": ["delivery", "uber", "ola", "swiggy", "zomato"],
-            "Freelance": ["freelance", "project", "client"],
+        return {
+            "input_ids": input_ids,
+            "attention_mask": torch.ones_like(input_ids),
+            # generate() extends the cache in place, so each request gets its own copy
+            "past_key_values": copy.deepcopy(self._prompt_cache),
         }
+    
+    def _generation_kwargs(self, prompt_length: int) -> Dict[str, Any]:
+        """Return decoding settings: schema-constrained greedy, or the original sampling."""
+        if LLM_CONSTRAINED_DECODING:
+            try:
+                if self._token_strings is None:
+                    self._token_strings = build_token_strings(self.llm_tokenizer)
+                
+                constraint = TransactionJsonConstraint(
+                    self._token_strings, prompt_length, self.llm_tokenizer.eos_token_id
+                )
+                return {
+                    "do_sample": False,
+                    "logits_processor": LogitsProcessorList([constraint]),
+                    "stopping_criteria": StoppingCriteriaList([constraint.stopping_criteria()]),
+                }
+            except Exception as e:
+                print(f"Constrained decoding unavailable, sampling freely: {e}")
         
-        for category, keywords in category_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                result["category"] = category
-                break
+        return {"do_sample": True, "temperature": 0.1}
+    
+    def _generate_fields(self, text: str) -> Dict[str, Any]:
+        """Extract raw transaction fields with the causal LM (the causal-lm backend)."""
+        self._load_llm_models()
         
-        # Extract merchant name (look for common patterns)
-        merchant_patterns = [
-            r'(?:at|from|to)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-            r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(?:restaurant|store|shop)',
-        ]
+        inputs = self._build_llm_inputs(text)
         
-        for pattern in merchant_patterns:
-            match = re.search(pattern, text)
-            if match:
-                result["merchant_name"] = match.group(1)
-                break
+        # Generate response
+        with torch.no_grad(), self._precision_context("llm"):
+            outputs = self.llm_model.generate(
+                **inputs,
+                **self._generation_kwargs(inputs["input_ids"].shape[1]),
+                max_new_tokens=256,
+                pad_token_id=self.llm_tokenizer.eos_token_id
+            )
         
-        return result
+        prompt_length = inputs['input_ids'].shape[1]
+        METRICS.count("parser_tokens_total", prompt_length, stage="llm_generate", direction="input")
+        METRICS.count("parser_tokens_total", outputs.shape[1] - prompt_length, stage="llm_generate", direction="output")
+        
+        # Decode response
+        response = self.llm_tokenizer.decode(outputs[0][prompt_length:], skip_special_tokens=True)
+        
+        # Extract JSON from response
+        with METRICS.time("json_extract", parser="local"):
+            json_match = re.search(r'\{[^{}]*\}', response, re.DOTALL)
+            if json_match:
+                return json.loads(json_match.group(0))
+            # Fallback: try to parse the whole response
+            return json.loads(response.strip())
+    
+    def _rules_tiers(self, text: str, user_id: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Tier 1 (rules) and 1b (the user's merchant index).
+        
+        Returns:
+            (result, final): final is True when no field needs the extractor
+        """
+        rules_result = self._regex_extract_transaction(text)
+        if not needs_llm(rules_result):
+            print("Rules resolved all required fields, skipping LLM")
+            METRICS.count("parser_extraction_total", parser="local", path="rules")
+            return rules_result, True
+        
+        rules_result = self._apply_merchant_index(text, rules_result, user_id)
+        if not needs_llm(rules_result):
+            print(f"Known merchant '{rules_result['merchant_name']}', skipping LLM")
+            METRICS.count("parser_extraction_total", parser="local", path="merchant_index")
+            return rules_result, True
+        return rules_result, False
+    
+    def _llm_extract(self, text: str, rules_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Tier 2: run the extractor backend and merge its fields with the rules.
+        
+        Raises on model failure or unparseable output (json.JSONDecodeError),
+        so callers such as the hybrid router can try another backend.
+        """
+        with METRICS.time("llm_generate", parser="local", backend=self.extractor.name):
+            transaction_data = self.extractor.extract(text)
+        
+        # Validate and clean data
+        with METRICS.time("validate", parser="local"):
+            result = self._validate_and_clean_transaction(transaction_data, text)
+        METRICS.count("parser_extraction_total", parser="local", path="llm")
+        return self._merge_with_rules(result, rules_result)
+    
+    def _parse_text_to_transaction(self, text: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Parse extracted text to structured transaction data.
+        
+        Rules run first, then the user's merchant index; the extractor
+        backend (the LLM by default) only runs when amount, type or category
+        is still missing or ambiguous.
+        """
+        rules_result, final = self._rules_tiers(text, user_id)
+        if final:
+            return rules_result
+        
+        try:
+            return self._llm_extract(text, rules_result)
+        except json.JSONDecodeError as e:
+            print(f"JSON parsing error: {e}")
+            METRICS.count("parser_extraction_total", parser="local", path="fallback_json")
+            # Fallback: use rule-based extraction
+            return mark_uncacheable(rules_result)
+        except Exception as e:
+            print(f"Error parsing text with {self.extractor.name} extractor: {e}")
+            METRICS.count("parser_extraction_total", parser="local", path="fallback_error")
+            # Fallback: use rule-based extraction
+            return mark_uncacheable(rules_result)
+    
+    def _apply_merchant_index(self, text: str, rules_result: Dict[str, Any], user_id: Optional[str]) -> Dict[str, Any]:
+        """Fill fields from the user's verified history if a known merchant appears in the text."""
+        if not user_id or self.merchant_index is None:
+            return rules_result
+        with METRICS.time("merchant_lookup", parser="local"):
+            profile = self.merchant_index.lookup(user_id, text)
+        return apply_profile(rules_result, profile) if profile else rules_result
+    
+    def record_verified_transaction(self, user_id: str, transaction: Dict[str, Any]) -> bool:
+        """Add a verified transaction to the user's merchant index; False if it was not indexed."""
+        if self.merchant_index is None:
+            return False
+        return self.merchant_index.record(user_id, transaction)
+    
+    def _regex_extract_transaction(self, text: str) -> Dict[str, Any]:
+        """Extract transaction data with deterministic rules (first tier and LLM fallback)."""
+        with METRICS.time("regex", parser="local"):
+            return extract_transaction(text)
+    
+    def _merge_with_rules(self, llm_result: Dict[str, Any], rules_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Prefer confident rule-based fields over the LLM, and fill fields the LLM left empty."""
+        field_confidence = rules_result["field_confidence"]
+        for field, confidence in field_confidence.items():
+            if rules_result.get(field) and (confidence >= CONFIDENCE_THRESHOLD or not llm_result.get(field)):
+                llm_result[field] = rules_result[field]
+        llm_result["field_confidence"] = field_confidence
+        return llm_result
     
     def _validate_and_clean_transaction(self, data: Dict[str, Any], original_text: str) -> Dict[str, Any]:
         """Validate and clean transaction data."""
@@ -384,12 +847,44 @@ Return ONLY the JSON object, no other text:"""
         
         return result
     
-    def parse_image(self, image_path: str) -> Dict[str, Any]:
+    def _cache_key(self, data: bytes, kind: str, user_id: Optional[str] = None) -> Optional[str]:
+        """Return the content-addressed cache key for upload bytes, or None if caching is off."""
+        if self.cache is None:
+            return None
+        # Results that may come from a user's merchant index are only shared with that
+        # user, and only until their index changes
+        if user_id and self.merchant_index is not None:
+            version = self.merchant_index.version(user_id)
+            return self.cache.make_key(data, kind, f"{self.fingerprint}|user={user_id}@{version}")
+        return self.cache.make_key(data, kind, self.fingerprint)
+    
+    def _cache_result(self, cache_key: Optional[str], result: Dict[str, Any]):
+        """
+        Store a parse result; a cache failure is logged and never fails the parse.
+        
+        Degraded fallback results (see mark_uncacheable) are not stored, so
+        a re-upload after a transient model/API failure is parsed again.
+        """
+        if result.pop(NO_CACHE, False) or not cache_key:
+            return
+        try:
+            self.cache.put(cache_key, result)
+        except Exception as e:
+            print(f"Could not cache parse result: {e}")
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return result cache hit/miss counters."""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def parse_image(self, image: UploadSource, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Parse image (receipt/bill) to extract transaction details.
         
         Args:
-            image_path: Path to the image file
+            image: Path to the image file, or its bytes / a binary file object
+            user_id: Uploading user, for their merchant index (optional)
             
         Returns:
             Dictionary with transaction fields:
@@ -407,10 +902,19 @@ Return ONLY the JSON object, no other text:"""
             }
         """
         try:
-            print(f"Processing image: {image_path}")
+            print(f"Processing image: {describe_upload(image)}")
+            data = read_upload(image)
+            
+            # Step 0: Identical uploads return the cached result
+            cache_key = self._cache_key(data, "image", user_id)
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    print("Cache hit, skipping OCR and LLM")
+                    return cached
             
             # Step 1: Extract text from image
-            extracted_text = self._extract_text_from_image(image_path)
+            extracted_text = self._extract_text_from_images([self._decode_image(data)])[0]
             print(f"Extracted text: {extracted_text}")
             
             if not extracted_text or len(extracted_text.strip()) < 5:
@@ -420,7 +924,9 @@ Return ONLY the JSON object, no other text:"""
                 }
             
             # Step 2: Parse text to transaction data
-            transaction_data = self._parse_text_to_transaction(extracted_text)
+            transaction_data = self._parse_text_to_transaction(extracted_text, user_id)
+            
+            self._cache_result(cache_key, transaction_data)
             
             print(f"Parsed transaction: {transaction_data}")
             return transaction_data
@@ -432,21 +938,111 @@ Return ONLY the JSON object, no other text:"""
                 "confidence": 0.0
             }
     
-    def parse_voice(self, audio_path: str) -> Dict[str, Any]:
+    def parse_images(self, images: List[UploadSource], user_ids: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Parse several images (receipts/bills) in one batched OCR pass.
+        
+        Images that cannot be opened get an error entry; the line crops of the
+        rest are stacked into batches of up to OCR_BATCH_SIZE for a single
+        generate call each.
+        
+        Args:
+            images: Paths to the image files, or their bytes / binary file objects
+            user_ids: Uploading user per image, for their merchant index (optional)
+            
+        Returns:
+            List of dictionaries in the same order as images, each in the
+            same format as parse_image
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(images)
+        user_ids = user_ids or [None] * len(images)
+        cache_keys: List[Optional[str]] = [None] * len(images)
+        decoded = []
+        indices = []
+        
+        # Step 0: Decode all uncached images up front so one bad file doesn't fail the batch
+        for i, source in enumerate(images):
+            try:
+                data = read_upload(source)
+                cache_keys[i] = self._cache_key(data, "image", user_ids[i])
+                if cache_keys[i]:
+                    cached = self.cache.get(cache_keys[i])
+                    if cached is not None:
+                        results[i] = cached
+                        continue
+                
+                decoded.append(self._decode_image(data))
+                indices.append(i)
+            except Exception as e:
+                print(f"Error opening image {describe_upload(source)}: {e}")
+                results[i] = {
+                    "error": f"Failed to process image: {str(e)}",
+                    "confidence": 0.0
+                }
+        
+        if decoded:
+            print(f"Processing {len(decoded)} images (OCR batch size {OCR_BATCH_SIZE})")
+            
+            # Step 1: Extract text from all images
+            try:
+                extracted_texts = self._extract_text_from_images(decoded)
+            except Exception as e:
+                for i in indices:
+                    results[i] = {
+                        "error": f"Failed to process image: {str(e)}",
+                        "confidence": 0.0
+                    }
+                return results
+            
+            # Step 2: Parse each text to transaction data
+            for i, extracted_text in zip(indices, extracted_texts):
+                print(f"Extracted text [{describe_upload(images[i])}]: {extracted_text}")
+                
+                if not extracted_text or len(extracted_text.strip()) < 5:
+                    results[i] = {
+                        "error": "Could not extract sufficient text from image. Please ensure the image is clear and contains readable text.",
+                        "confidence": 0.0
+                    }
+                    continue
+                
+                try:
+                    results[i] = self._parse_text_to_transaction(extracted_text, user_ids[i])
+                    self._cache_result(cache_keys[i], results[i])
+                except Exception as e:
+                    print(f"Error parsing image: {e}")
+                    results[i] = {
+                        "error": f"Failed to process image: {str(e)}",
+                        "confidence": 0.0
+                    }
+        
+        return results
+    
+    def parse_voice(self, audio: UploadSource, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Parse voice recording to extract transaction details.
         
         Args:
-            audio_path: Path to the audio file (WAV, MP3, etc.)
+            audio: Path to the audio file (WAV, MP3, etc.), or its bytes / a
+                binary file object
+            user_id: Recording user, for their merchant index (optional)
             
         Returns:
             Dictionary with transaction fields (same format as parse_image)
         """
         try:
-            print(f"Processing audio: {audio_path}")
+            print(f"Processing audio: {describe_upload(audio)}")
+            data = read_upload(audio)
+            
+            # Step 0: Identical uploads return the cached result
+            cache_key = self._cache_key(data, "voice", user_id)
+            if cache_key:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    print("Cache hit, skipping ASR and LLM")
+                    return cached
             
             # Step 1: Transcribe audio to text
-            transcribed_text = self._transcribe_audio(audio_path)
+            transcribed_text = self._transcribe_audios([self._decode_audio(data)])[0]
             print(f"Transcribed text: {transcribed_text}")
             
             if not transcribed_text or len(transcribed_text.strip()) < 5:
@@ -456,7 +1052,9 @@ Return ONLY the JSON object, no other text:"""
                 }
             
             # Step 2: Parse text to transaction data
-            transaction_data = self._parse_text_to_transaction(transcribed_text)
+            transaction_data = self._parse_text_to_transaction(transcribed_text, user_id)
+            
+            self._cache_result(cache_key, transaction_data)
             
             print(f"Parsed transaction: {transaction_data}")
             return transaction_data
@@ -468,6 +1066,81 @@ Return ONLY the JSON object, no other text:"""
                 "confidence": 0.0
             }
 
+    
+    def parse_voices(self, audios: List[UploadSource], user_ids: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """
+        Parse several voice recordings with batched Whisper calls.
+        
+        Args:
+            audios: Paths to the audio files, or their bytes / binary file objects
+            user_ids: Recording user per file, for their merchant index (optional)
+            
+        Returns:
+            List of dictionaries in the same order as audios, each in the
+            same format as parse_voice
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(audios)
+        user_ids = user_ids or [None] * len(audios)
+        cache_keys: List[Optional[str]] = [None] * len(audios)
+        decoded = []
+        indices = []
+        
+        # Step 0: Decode all uncached recordings up front so one bad file doesn't fail the batch
+        for i, source in enumerate(audios):
+            try:
+                data = read_upload(source)
+                cache_keys[i] = self._cache_key(data, "voice", user_ids[i])
+                if cache_keys[i]:
+                    cached = self.cache.get(cache_keys[i])
+                    if cached is not None:
+                        results[i] = cached
+                        continue
+                
+                decoded.append(self._decode_audio(data))
+                indices.append(i)
+            except Exception as e:
+                print(f"Error loading audio {describe_upload(source)}: {e}")
+                results[i] = {
+                    "error": f"Failed to process audio: {str(e)}",
+                    "confidence": 0.0
+                }
+        
+        if decoded:
+            print(f"Processing {len(decoded)} recordings (Whisper batch size {WHISPER_BATCH_SIZE})")
+            
+            # Step 1: Transcribe all recordings
+            try:
+                transcribed_texts = self._transcribe_audios(decoded)
+            except Exception as e:
+                for i in indices:
+                    results[i] = {
+                        "error": f"Failed to process audio: {str(e)}",
+                        "confidence": 0.0
+                    }
+                return results
+            
+            # Step 2: Parse each transcription to transaction data
+            for i, transcribed_text in zip(indices, transcribed_texts):
+                print(f"Transcribed text [{describe_upload(audios[i])}]: {transcribed_text}")
+                
+                if not transcribed_text or len(transcribed_text.strip()) < 5:
+                    results[i] = {
+                        "error": "Could not transcribe audio. Please ensure the recording is clear.",
+                        "confidence": 0.0
+                    }
+                    continue
+                
+                try:
+                    results[i] = self._parse_text_to_transaction(transcribed_text, user_ids[i])
+                    self._cache_result(cache_keys[i], results[i])
+                except Exception as e:
+                    print(f"Error parsing voice: {e}")
+                    results[i] = {
+                        "error": f"Failed to process audio: {str(e)}",
+                        "confidence": 0.0
+                    }
+        
+        return results
 
 # ============================================================================
 # Example Usage
@@ -483,4 +1156,8 @@ if __name__ == "__main__":
     # Example 2: Parse voice
     # result = parser.parse_voice("recording.wav")
     # print(json.dumps(result, indent=2))
+    
+    # Example 3: Parse a burst of receipts in one OCR batch
+    # results = parser.parse_images(["receipt1.jpg", "receipt2.jpg"])
+    # print(json.dumps(results, indent=2))
 
@@ -9,102 +9,171 @@ Usage:
     parser = TransactionParser()
     result = parser.parse_image("receipt.jpg")
     result = parser.parse_voice("recording.wav")
+
+    # Inside an event loop (e.g. FastAPI), without blocking it
+    result = await parser.parse_image_async(image_bytes)
 """
 
 import os
 import json
+import asyncio
 import re
 import base64
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
 from pathlib import Path
 from PIL import Image
 import requests
+from rule_extractor import extract_transaction, needs_llm, CONFIDENCE_THRESHOLD
+from result_cache import ResultCache, DEFAULT_DISK_PATH, NO_CACHE, mark_uncacheable
+from uploads import UploadSource, read_upload, describe_upload
+from inference_client import InferenceClient, AsyncInferenceClient
+from parser_metrics import METRICS
+from merchant_index import MerchantIndex, apply_profile, DEFAULT_INDEX_PATH
 
 # Hugging Face token (get from environment variable)
 HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN", None)
-HF_API_BASE = "https://api-inference.huggingface.co/models"
+# Override to point at a local stand-in, e.g. fake_inference_server.py:
+#   HF_API_BASE=http://localhost:8900/models
+HF_API_BASE = os.getenv("HF_API_BASE", "https://api-inference.huggingface.co/models")
+
+# Cache parse results by upload content (set PARSER_CACHE=0 to disable)
+PARSER_CACHE = os.getenv("PARSER_CACHE", "1") == "1"
+PARSER_CACHE_PATH = os.getenv("PARSER_CACHE_PATH", DEFAULT_DISK_PATH)
+
+# Per-user merchant index from verified transactions, consulted before the LLM
+MERCHANT_INDEX = os.getenv("MERCHANT_INDEX", "1") == "1"
+MERCHANT_INDEX_PATH = os.getenv("MERCHANT_INDEX_PATH", DEFAULT_INDEX_PATH)
+
+# Metrics stage of each remote model call
+API_STAGES = {
+    "microsoft/trocr-base-printed": "ocr_generate",
+    "openai/whisper-small": "asr_generate",
+    "microsoft/Phi-3-mini-4k-instruct": "llm_generate",
+}
 
 class TransactionParser:
     """Main parser class using Hugging Face Inference API."""
     
-    def __init__(self):
-        """Initialize with API endpoints."""
+    def __init__(
+        self,
+        cache: Optional[ResultCache] = None,
+        client: Optional[InferenceClient] = None,
+        merchant_index: Optional[MerchantIndex] = None
+    ):
+        """
+        Initialize with API endpoints.
+        
+        Args:
+            cache: Parse result cache (default: memory + disk unless PARSER_CACHE=0)
+            client: Pooled HTTP client (default: keep-alive session to HF_API_BASE)
+            merchant_index: Per-user merchant index (default: on unless MERCHANT_INDEX=0)
+        """
         self.headers = {"Authorization": f"Bearer {HF_TOKEN}"}
+        self.client = client or InferenceClient(HF_API_BASE, self.headers)
+        self._async_client: Optional[AsyncInferenceClient] = None
+        self.fingerprint = "inference-api|microsoft/trocr-base-printed|openai/whisper-small|microsoft/Phi-3-mini-4k-instruct"
+        if cache is None and PARSER_CACHE:
+            cache = ResultCache(disk_path=PARSER_CACHE_PATH)
+        self.cache = cache
+        if merchant_index is None and MERCHANT_INDEX:
+            merchant_index = MerchantIndex(disk_path=MERCHANT_INDEX_PATH)
+        self.merchant_index = merchant_index
         print("Using Hugging Face Inference API (no local models needed)")
     
+    @property
+    def async_client(self) -> AsyncInferenceClient:
+        """httpx-based client for the *_async methods, created on first use."""
+        if self._async_client is None:
+            self._async_client = AsyncInferenceClient(self.client.base_url, self.headers)
+        return self._async_client
+    
+    async def aclose(self):
+        """Close the async client's connections (call on server shutdown)."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+    
     def _call_inference_api(self, model: str, inputs: Any, task: str = None) -> Dict:
         """Call Hugging Face Inference API."""
-        url = f"{HF_API_BASE}/{model}"
-        if task:
-            url += f"?task={task}"
-        
         try:
-            response = requests.post(url, headers=self.headers, json=inputs, timeout=60)
-            response.raise_for_status()
-            return response.json()
+            with METRICS.time(API_STAGES.get(model, "api_call"), parser="inference-api"):
+                return self.client.post(model, json=inputs, params={"task": task} if task else None)
         except requests.exceptions.RequestException as e:
             print(f"API Error: {e}")
             if hasattr(e.response, 'text'):
                 print(f"Response: {e.response.text}")
             raise
     
-    def _extract_text_from_image(self, image_path: str) -> str:
+    async def _call_inference_api_async(self, model: str, inputs: Any, task: str = None) -> Dict:
+        """Call Hugging Face Inference API without blocking the event loop."""
+        try:
+            with METRICS.time(API_STAGES.get(model, "api_call"), parser="inference-api"):
+                return await self.async_client.post(model, json=inputs, params={"task": task} if task else None)
+        except Exception as e:
+            print(f"API Error: {e}")
+            raise
+    
+    def _generated_text(self, result: Any) -> str:
+        """Pull generated_text out of a text-generation / image-to-text response."""
+        if isinstance(result, list) and len(result) > 0:
+            return result[0].get("generated_text", "")
+        elif isinstance(result, dict):
+            return result.get("generated_text", "")
+        return str(result)
+    
+    def _transcription_text(self, result: Any) -> str:
+        """Pull the transcription out of a speech-recognition response."""
+        if isinstance(result, dict):
+            return result.get("text", "").strip()
+        return str(result).strip()
+    
+    def _ocr_payload(self, image: UploadSource) -> Dict[str, Any]:
+        """Build the TrOCR image-to-text request (base64-encoded image)."""
+        return {"inputs": base64.b64encode(read_upload(image)).decode()}
+    
+    def _extract_text_from_image(self, image: UploadSource) -> str:
         """Extract text from image using TrOCR via Inference API."""
         try:
-            # Read and encode image
-            with open(image_path, "rb") as f:
-                image_data = base64.b64encode(f.read()).decode()
-            
-            # Call TrOCR API
-            result = self._call_inference_api(
-                "microsoft/trocr-base-printed",
-                {"inputs": image_data}
-            )
-            
-            # Extract text from response
-            if isinstance(result, list) and len(result) > 0:
-                text = result[0].get("generated_text", "")
-            elif isinstance(result, dict):
-                text = result.get("generated_text", "")
-            else:
-                text = str(result)
-            
-            return text.strip()
+            result = self._call_inference_api("microsoft/trocr-base-printed", self._ocr_payload(image))
+            return self._generated_text(result).strip()
         except Exception as e:
             print(f"Error extracting text from image: {e}")
             raise
     
-    def _transcribe_audio(self, audio_path: str) -> str:
+    async def _extract_text_from_image_async(self, image: UploadSource) -> str:
+        """Async variant of _extract_text_from_image."""
+        try:
+            result = await self._call_inference_api_async("microsoft/trocr-base-printed", self._ocr_payload(image))
+            return self._generated_text(result).strip()
+        except Exception as e:
+            print(f"Error extracting text from image: {e}")
+            raise
+    
+    def _transcribe_audio(self, audio: UploadSource) -> str:
         """Transcribe audio to text using Whisper via Inference API."""
         try:
-            # Read audio file
-            with open(audio_path, "rb") as f:
-                audio_data = f.read()
-            
-            # Call Whisper API
-            url = f"{HF_API_BASE}/openai/whisper-small"
-            response = requests.post(
-                url,
-                headers=self.headers,
-                data=audio_data,
-                timeout=120
-            )
-            response.raise_for_status()
-            result = response.json()
-            
-            # Extract transcription
-            if isinstance(result, dict):
-                text = result.get("text", "")
-            else:
-                text = str(result)
-            
-            return text.strip()
+            # Whisper takes the raw audio bytes as the request body
+            data = read_upload(audio)
+            with METRICS.time("asr_generate", parser="inference-api"):
+                result = self.client.post("openai/whisper-small", data=data, timeout=120)
+            return self._transcription_text(result)
+        except Exception as e:
+            print(f"Error transcribing audio: {e}")
+            raise
+    
+    async def _transcribe_audio_async(self, audio: UploadSource) -> str:
+        """Async variant of _transcribe_audio."""
+        try:
+            data = read_upload(audio)
+            with METRICS.time("asr_generate", parser="inference-api"):
+                result = await self.async_client.post("openai/whisper-small", data=data, timeout=120)
+            return self._transcription_text(result)
         except Exception as e:
             print(f"Error transcribing audio: {e}")
             raise
     
-    def _parse_text_to_transaction(self, text: str) -> Dict[str, Any]:
-        """Parse extracted text to structured transaction data using LLM via Inference API."""
+    def _llm_payload(self, text: str) -> Dict[str, Any]:
+        """Build the Phi-3 text-generation request for a transaction text."""
         # Create prompt for LLM
         prompt = f"""Extract transaction details from the following text and return ONLY a valid JSON object with these fields:
 - amount (number, required)
@@ -121,30 +190,21 @@ Text: {text}
 
 Return ONLY the JSON object, no other text:"""
         
-        try:
-            # Use a text generation model via Inference API
-            # Using a smaller, faster model for parsing
-            result = self._call_inference_api(
-                "microsoft/Phi-3-mini-4k-instruct",
-                {
-                    "inputs": prompt,
-                    "parameters": {
-                        "max_new_tokens": 256,
-                        "temperature": 0.1,
-                        "return_full_text": False
-                    }
-                }
-            )
-            
-            # Extract response text
-            if isinstance(result, list) and len(result) > 0:
-                response_text = result[0].get("generated_text", "")
-            elif isinstance(result, dict):
-                response_text = result.get("generated_text", "")
-            else:
-                response_text = str(result)
-            
-            # Extract JSON from response
+        return {
+            "inputs": prompt,
+            "parameters": {
+                "max_new_tokens": 256,
+                "temperature": 0.1,
+                "return_full_text": False
+            }
+        }
+    
+    def _llm_transaction(self, result: Any, text: str, rules_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn the LLM response into a validated transaction merged with the rules fields."""
+        response_text = self._generated_text(result)
+        
+        # Extract JSON from response
+        with METRICS.time("json_extract", parser="inference-api"):
             json_match = re.search(r'\{[^{}]*\}', response_text, re.DOTALL)
             if json_match:
                 json_str = json_match.group(0)
@@ -152,93 +212,110 @@ Return ONLY the JSON object, no other text:"""
             else:
                 # Fallback: try to parse the whole response
                 transaction_data = json.loads(response_text.strip())
-            
-            # Validate and clean data
-            return self._validate_and_clean_transaction(transaction_data, text)
-            
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            # Fallback: use regex-based extraction
-            return self._regex_extract_transaction(text)
-        except Exception as e:
-            print(f"Error parsing text with LLM: {e}")
-            # Fallback: use regex-based extraction
-            return self._regex_extract_transaction(text)
-    
-    def _regex_extract_transaction(self, text: str) -> Dict[str, Any]:
-        """Fallback: Extract transaction data using regex patterns."""
-        from datetime import datetime
         
-        result = {
-            "amount": None,
-            "transaction_type": "expense",
-            "category": "Misc",
-            "merchant_name": "",
-            "description": text[:100],
-            "payment_method": "",
-            "location": "",
-            "transaction_date": datetime.now().strftime("%Y-%m-%d"),
-            "transaction_time": datetime.now().strftime("%H:%M"),
-            "confidence": 0.5
-        }
-        
-        # Extract amount (look for ₹, Rs, rupees, etc.)
-        amount_patterns = [
-            r'₹\s*(\d+(?:\.\d{2})?)',
-            r'Rs\.?\s*(\d+(?:\.\d{2})?)',
-            r'(\d+(?:\.\d{2})?)\s*(?:rupees|rs|₹)',
-            r'(\d+(?:\.\d{2})?)\s*(?:paid|spent|received|earned)',
-        ]
-        
-        for pattern in amount_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    result["amount"] = float(match.group(1))
-                    break
-                except:
-                    pass
-        
-        # Determine transaction type
-        income_keywords = ["received", "earned", "income", "salary", "payment received"]
-        expense_keywords = ["spent", "paid", "purchase", "bought", "expense"]
+        # Validate and clean data
+        with METRICS.time("validate", parser="inference-api"):
+            result = self._validate_and_clean_transaction(transaction_data, text)
+        METRICS.count("parser_extraction_total", parser="inference-api", path="llm")
+        return self._merge_with_rules(result, rules_result)
+    
+    def _rules_tiers(self, text: str, user_id: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Tier 1 (rules) and 1b (the user's merchant index).
         
-        text_lower = text.lower()
-        if any(keyword in text_lower for keyword in income_keywords):
-            result["transaction_type"] = "income"
-        elif any(keyword in text_lower for keyword in expense_keywords):
-            result["transaction_type"] = "expense"
+        Returns:
+            (result, final): final is True when no field needs the LLM
+        """
+        rules_result = self._regex_extract_transaction(text)
+        if not needs_llm(rules_result):
+            print("Rules resolved all required fields, skipping LLM")
+            METRICS.count("parser_extraction_total", parser="inference-api", path="rules")
+            return rules_result, True
         
-        # Extract category keywords
-        category_keywords = {
-            "Food": ["food", "restaurant", "mcdonald", "pizza", "lunch", "dinner", "breakfast"],
-            "Fuel": ["fuel", "petrol", "diesel", "gas", "gasoline"],
-            "Groceries": ["grocery", "groceries", "supermarket", "big bazaar"],
-            "Rent": ["rent", "rental"],
-            "Maintenance": ["maintenance", "repair"],
-            "Phone": ["phone", "mobile", "telecom"],
-            "Delivery": ["delivery", "uber", "ola", "swiggy", "zomato"],
-            "Freelance": ["freelance", "project", "client"],
-        }
+        rules_result = self._apply_merchant_index(text, rules_result, user_id)
+        if not needs_llm(rules_result):
+            print(f"Known merchant '{rules_result['merchant_name']}', skipping LLM")
+            METRICS.count("parser_extraction_total", parser="inference-api", path="merchant_index")
+            return rules_result, True
+        return rules_result, False
+    
+    def _llm_extract(self, text: str, rules_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Tier 2: ask the Inference API LLM and merge its fields with the rules.
         
-        for category, keywords in category_keywords.items():
-            if any(keyword in text_lower for keyword in keywords):
-                result["category"] = category
-                break
+        Raises on API failure or unparseable output (json.JSONDecodeError),
+        so callers such as the hybrid router can try another backend.
+        """
+        result = self._call_inference_api("microsoft/Phi-3-mini-4k-instruct", self._llm_payload(text))
+        return self._llm_transaction(result, text, rules_result)
+    
+    def _llm_fallback(self, error: Exception, rules_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Rules-only result after a failed LLM call (never cached)."""
+        if isinstance(error, json.JSONDecodeError):
+            print(f"JSON parsing error: {error}")
+            METRICS.count("parser_extraction_total", parser="inference-api", path="fallback_json")
+        else:
+            print(f"Error parsing text with LLM: {error}")
+            METRICS.count("parser_extraction_total", parser="inference-api", path="fallback_error")
+        return mark_uncacheable(rules_result)
+    
+    def _parse_text_to_transaction(self, text: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Parse extracted text to structured transaction data.
         
-        # Extract merchant name (look for common patterns)
-        merchant_patterns = [
-            r'(?:at|from|to)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)',
-            r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s+(?:restaurant|store|shop)',
-        ]
+        Rules run first, then the user's merchant index; the Inference API
+        LLM only runs when amount, type or category is still missing or
+        ambiguous.
+        """
+        rules_result, final = self._rules_tiers(text, user_id)
+        if final:
+            return rules_result
         
-        for pattern in merchant_patterns:
-            match = re.search(pattern, text)
-            if match:
-                result["merchant_name"] = match.group(1)
-                break
+        try:
+            return self._llm_extract(text, rules_result)
+        except Exception as e:
+            return self._llm_fallback(e, rules_result)
+    
+    async def _parse_text_to_transaction_async(self, text: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async variant of _parse_text_to_transaction (the merchant index lookup runs on a thread)."""
+        loop = asyncio.get_running_loop()
+        rules_result, final = await loop.run_in_executor(None, self._rules_tiers, text, user_id)
+        if final:
+            return rules_result
         
-        return result
+        try:
+            result = await self._call_inference_api_async("microsoft/Phi-3-mini-4k-instruct", self._llm_payload(text))
+            return self._llm_transaction(result, text, rules_result)
+        except Exception as e:
+            return self._llm_fallback(e, rules_result)
+    
+    def _apply_merchant_index(self, text: str, rules_result: Dict[str, Any], user_id: Optional[str]) -> Dict[str, Any]:
+        """Fill fields from the user's verified history if a known merchant appears in the text."""
+        if not user_id or self.merchant_index is None:
+            return rules_result
+        with METRICS.time("merchant_lookup", parser="inference-api"):
+            profile = self.merchant_index.lookup(user_id, text)
+        return apply_profile(rules_result, profile) if profile else rules_result
+    
+    def record_verified_transaction(self, user_id: str, transaction: Dict[str, Any]) -> bool:
+        """Add a verified transaction to the user's merchant index; False if it was not indexed."""
+        if self.merchant_index is None:
+            return False
+        return self.merchant_index.record(user_id, transaction)
+    
+    def _regex_extract_transaction(self, text: str) -> Dict[str, Any]:
+        """Extract transaction data with deterministic rules (first tier and LLM fallback)."""
+        with METRICS.time("regex", parser="inference-api"):
+            return extract_transaction(text)
+    
+    def _merge_with_rules(self, llm_result: Dict[str, Any], rules_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Prefer confident rule-based fields over the LLM, and fill fields the LLM left empty."""
+        field_confidence = rules_result["field_confidence"]
+        for field, confidence in field_confidence.items():
+            if rules_result.get(field) and (confidence >= CONFIDENCE_THRESHOLD or not llm_result.get(field)):
+                llm_result[field] = rules_result[field]
+        llm_result["field_confidence"] = field_confidence
+        return llm_result
     
     def _validate_and_clean_transaction(self, data: Dict[str, Any], original_text: str) -> Dict[str, Any]:
         """Validate and clean transaction data."""
@@ -305,78 +382,158 @@ Return ONLY the JSON object, no other text:"""
         
         return result
     
-    def parse_image(self, image_path: str) -> Dict[str, Any]:
+    def _cache_key(self, data: bytes, kind: str, user_id: Optional[str] = None) -> Optional[str]:
+        """Return the content-addressed cache key for upload bytes, or None if caching is off."""
+        if self.cache is None:
+            return None
+        # Results that may come from a user's merchant index are only shared with that
+        # user, and only until their index changes
+        if user_id and self.merchant_index is not None:
+            version = self.merchant_index.version(user_id)
+            return self.cache.make_key(data, kind, f"{self.fingerprint}|user={user_id}@{version}")
+        return self.cache.make_key(data, kind, self.fingerprint)
+    
+    def _cache_result(self, cache_key: Optional[str], result: Dict[str, Any]):
         """
-        Parse image (receipt/bill) to extract transaction details.
+        Store a parse result; a cache failure is logged and never fails the parse.
+        
+        Degraded fallback results (see mark_uncacheable) are not stored, so
+        a re-upload after a transient model/API failure is parsed again.
+        """
+        if result.pop(NO_CACHE, False) or not cache_key:
+            return
+        try:
+            self.cache.put(cache_key, result)
+        except Exception as e:
+            print(f"Could not cache parse result: {e}")
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return result cache hit/miss counters."""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def _read_cached(self, source: UploadSource, kind: str, user_id: Optional[str]) -> Tuple[bytes, Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Read an upload and look it up in the result cache (blocking I/O).
         
-        Args:
-            image_path: Path to the image file
-            
         Returns:
-            Dictionary with transaction fields
+            (data, cache_key, cached result or None)
         """
+        print(f"Processing {'image' if kind == 'image' else 'audio'}: {describe_upload(source)}")
+        data = read_upload(source)
+        
+        # Step 0: Identical uploads return the cached result
+        cache_key = self._cache_key(data, kind, user_id)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"Cache hit, skipping {'OCR' if kind == 'image' else 'ASR'} and LLM")
+                return data, cache_key, cached
+        return data, cache_key, None
+    
+    def _text_error(self, kind: str, text: str) -> Optional[Dict[str, Any]]:
+        """Error result if OCR/ASR produced too little text to parse, else None."""
+        if kind == "image":
+            print(f"Extracted text: {text}")
+            message = "Could not extract sufficient text from image. Please ensure the image is clear and contains readable text."
+        else:
+            print(f"Transcribed text: {text}")
+            message = "Could not transcribe audio. Please ensure the recording is clear."
+        if not text or len(text.strip()) < 5:
+            return {"error": message, "confidence": 0.0}
+        return None
+    
+    def _finish(self, cache_key: Optional[str], transaction_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Cache and return a parsed transaction (blocking I/O)."""
+        self._cache_result(cache_key, transaction_data)
+        print(f"Parsed transaction: {transaction_data}")
+        return transaction_data
+    
+    def _failure(self, kind: str, error: Exception) -> Dict[str, Any]:
+        """Error result for an exception anywhere in the parse flow."""
+        print(f"Error parsing {'image' if kind == 'image' else 'voice'}: {error}")
+        return {
+            "error": f"Failed to process {'image' if kind == 'image' else 'audio'}: {str(error)}",
+            "confidence": 0.0
+        }
+    
+    def _parse(self, source: UploadSource, kind: str, user_id: Optional[str]) -> Dict[str, Any]:
+        """Parse flow shared by parse_image and parse_voice."""
         try:
-            print(f"Processing image: {image_path}")
+            data, cache_key, cached = self._read_cached(source, kind, user_id)
+            if cached is not None:
+                return cached
             
-            # Step 1: Extract text from image
-            extracted_text = self._extract_text_from_image(image_path)
-            print(f"Extracted text: {extracted_text}")
-            
-            if not extracted_text or len(extracted_text.strip()) < 5:
-                return {
-                    "error": "Could not extract sufficient text from image. Please ensure the image is clear and contains readable text.",
-                    "confidence": 0.0
-                }
+            # Step 1: Extract text from the image / transcribe the audio
+            text = self._extract_text_from_image(data) if kind == "image" else self._transcribe_audio(data)
+            error = self._text_error(kind, text)
+            if error:
+                return error
             
             # Step 2: Parse text to transaction data
-            transaction_data = self._parse_text_to_transaction(extracted_text)
+            return self._finish(cache_key, self._parse_text_to_transaction(text, user_id))
+        except Exception as e:
+            return self._failure(kind, e)
+    
+    async def _parse_async(self, source: UploadSource, kind: str, user_id: Optional[str]) -> Dict[str, Any]:
+        """
+        Async variant of _parse: API calls are awaited, and the blocking
+        upload read, cache and merchant index I/O run on the default executor.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            data, cache_key, cached = await loop.run_in_executor(None, self._read_cached, source, kind, user_id)
+            if cached is not None:
+                return cached
             
-            print(f"Parsed transaction: {transaction_data}")
-            return transaction_data
+            if kind == "image":
+                text = await self._extract_text_from_image_async(data)
+            else:
+                text = await self._transcribe_audio_async(data)
+            error = self._text_error(kind, text)
+            if error:
+                return error
             
+            transaction_data = await self._parse_text_to_transaction_async(text, user_id)
+            return await loop.run_in_executor(None, self._finish, cache_key, transaction_data)
         except Exception as e:
-            print(f"Error parsing image: {e}")
-            return {
-                "error": f"Failed to process image: {str(e)}",
-                "confidence": 0.0
-            }
+            return self._failure(kind, e)
+    
+    def parse_image(self, image: UploadSource, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Parse image (receipt/bill) to extract transaction details.
+        
+        Args:
+            image: Path to the image file, or its bytes / a binary file object
+            user_id: Uploading user, for their merchant index (optional)
+            
+        Returns:
+            Dictionary with transaction fields
+        """
+        return self._parse(image, "image", user_id)
     
-    def parse_voice(self, audio_path: str) -> Dict[str, Any]:
+    def parse_voice(self, audio: UploadSource, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Parse voice recording to extract transaction details.
         
         Args:
-            audio_path: Path to the audio file (WAV, MP3, etc.)
+            audio: Path to the audio file (WAV, MP3, etc.), or its bytes / a
+                binary file object
+            user_id: Recording user, for their merchant index (optional)
             
         Returns:
             Dictionary with transaction fields (same format as parse_image)
         """
-        try:
-            print(f"Processing audio: {audio_path}")
-            
-            # Step 1: Transcribe audio to text
-            transcribed_text = self._transcribe_audio(audio_path)
-            print(f"Transcribed text: {transcribed_text}")
-            
-            if not transcribed_text or len(transcribed_text.strip()) < 5:
-                return {
-                    "error": "Could not transcribe audio. Please ensure the recording is clear.",
-                    "confidence": 0.0
-                }
-            
-            # Step 2: Parse text to transaction data
-            transaction_data = self._parse_text_to_transaction(transcribed_text)
-            
-            print(f"Parsed transaction: {transaction_data}")
-            return transaction_data
-            
-        except Exception as e:
-            print(f"Error parsing voice: {e}")
-            return {
-                "error": f"Failed to process audio: {str(e)}",
-                "confidence": 0.0
-            }
-
+        return self._parse(audio, "voice", user_id)
+    
+    async def parse_image_async(self, image: UploadSource, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async variant of parse_image; awaits the API instead of blocking."""
+        return await self._parse_async(image, "image", user_id)
+    
+    async def parse_voice_async(self, audio: UploadSource, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async variant of parse_voice; awaits the API instead of blocking."""
+        return await self._parse_async(audio, "voice", user_id)
 
 # ============================================================================
 # Example Usage
@@ -0,0 +1,43 @@
+"""
+Upload Sources - Path, Bytes or File-like Inputs
+================================================
+
+The parsers accept an upload as a filesystem path (the original API), raw
+bytes, or a binary file-like object such as FastAPI's UploadFile.file. The
+servers pass the request body straight through, so an upload is decoded
+from memory instead of being written to a temp file and read back.
+
+Usage:
+    data = read_upload(source)   # bytes, read once for hashing and decoding
+    print(f"Processing image: {describe_upload(source)}")
+"""
+
+import os
+from typing import BinaryIO, Union
+
+UploadSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+def read_upload(source: UploadSource) -> bytes:
+    """Return the full contents of an upload given as path, bytes or file-like object."""
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "read"):
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return source.read()
+    raise TypeError(f"Unsupported upload source: {type(source).__name__}")
+
+
+def describe_upload(source: UploadSource) -> str:
+    """Short description of an upload for log lines."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<{len(source)} bytes in memory>"
+    return f"<{getattr(source, 'name', type(source).__name__)}>"
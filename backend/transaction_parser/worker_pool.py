@@ -0,0 +1,276 @@
+"""
+Parser Worker Pool - Multi-process Inference
+============================================
+
+A single TransactionParser runs one inference at a time on one group of
+cores. This pool loads the models once in the parent process, then forks N
+workers that share the read-only weights copy-on-write. Each worker is
+pinned to its own slice of the CPUs and has its own inbox; the parent hands
+queued jobs to idle workers one at a time.
+
+Forking happens before any forward pass runs in the parent, because the
+OpenMP thread pool used by torch is not fork-safe once started; each worker
+warms its own copy after the fork. Metric samples recorded in a worker
+travel back with each result and are merged into the parent's registry;
+so do the worker's result cache and merchant index counters (see
+worker_counters()), which restart when a worker is replaced.
+
+The parent records which job it gave each worker before sending it, so a
+job is never in flight without an owner. The result collector checks the
+workers between results: when one dies (OOM kill, crash in native code)
+the job it held fails with an error and a replacement worker is forked in
+its slot.
+
+With the ONNX engine the parent only exports the graphs to the disk cache
+and opens no ONNX Runtime sessions, which are not fork-safe; each worker
+opens its own with its own thread count.
+
+Usage:
+    pool = ParserWorkerPool(parser, num_workers=8)
+    pool.start()
+    future = pool.submit("parse_image", "receipt.jpg")
+    result = future.result()
+    pool.shutdown()
+"""
+
+import os
+import queue
+import collections
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future, InvalidStateError
+from typing import Dict, List, Optional, Any
+
+from parser_metrics import METRICS
+
+_READY = "__ready__"
+
+# Seconds between liveness checks of the workers while no results arrive
+HEALTH_CHECK_INTERVAL = 1.0
+
+
+def _split_cpus(num_workers: int) -> List[Optional[List[int]]]:
+    """Split the CPUs this process may use into one contiguous slice per worker."""
+    if not hasattr(os, "sched_getaffinity"):
+        # CPU pinning is Linux-only; other platforms share all cores
+        return [None] * num_workers
+
+    cpus = sorted(os.sched_getaffinity(0))
+    per_worker = max(1, len(cpus) // num_workers)
+    return [
+        cpus[i * per_worker:(i + 1) * per_worker] or cpus
+        for i in range(num_workers)
+    ]
+
+
+def _counters(parser) -> Dict[str, Dict[str, int]]:
+    """Result cache and merchant index counters of this worker."""
+    counters = {}
+    if parser.cache is not None:
+        counters["cache"] = parser.cache.counters()
+    if getattr(parser, "merchant_index", None) is not None:
+        counters["merchant_index"] = parser.merchant_index.counters()
+    return counters
+
+
+def _worker_main(index: int, cpus: Optional[List[int]], parser, warmup: bool, inbox, results):
+    """Worker process loop: pin, warm up, then serve jobs until a None sentinel."""
+    import torch
+    from result_cache import ResultCache
+    from merchant_index import MerchantIndex
+
+    # Samples go back to the parent with each result instead of a local registry
+    METRICS.forward()
+
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+        torch.set_num_threads(len(cpus))
+
+    if "onnx" in getattr(parser, "engine", {}).values():
+        parser.reload_onnx_models(len(cpus) if cpus else None)
+
+    # SQLite connections must not cross a fork; give each worker its own
+    if parser.cache is not None:
+        parser.cache = ResultCache(
+            memory_items=parser.cache.memory_items,
+            disk_path=parser.cache.disk_path,
+            disk_max_bytes=parser.cache.disk_max_bytes
+        )
+    merchant_index = getattr(parser, "merchant_index", None)
+    if merchant_index is not None:
+        parser.merchant_index = MerchantIndex(disk_path=merchant_index.disk_path)
+
+    if warmup:
+        parser.warmup()
+    results.put((index, _READY, True, parser.model_status, METRICS.drain(), _counters(parser)))
+    print(f"Worker {index} ready (pid {os.getpid()}, cpus {cpus})")
+
+    while True:
+        task = inbox.get()
+        if task is None:
+            break
+        job_id, method, args = task
+        try:
+            ok, payload = True, getattr(parser, method)(*args)
+        except Exception as e:
+            ok, payload = False, f"{type(e).__name__}: {e}"
+        results.put((index, job_id, ok, payload, METRICS.drain(), _counters(parser)))
+
+
+def _resolve(future: Future, ok: bool, payload: Any):
+    """Set a job's outcome unless the caller already gave up on it (timeout/cancel)."""
+    try:
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+    except InvalidStateError:
+        pass
+
+
+class ParserWorkerPool:
+    """Dispatch parser calls to forked, CPU-pinned worker processes."""
+
+    def __init__(self, parser, num_workers: int, warmup: bool = True):
+        """
+        Args:
+            parser: TransactionParser whose models are loaded before forking
+            num_workers: Number of worker processes
+            warmup: Run a dummy forward pass in each worker before serving
+        """
+        self.parser = parser
+        self.num_workers = num_workers
+        self.warmup = warmup
+        self.model_status: Dict[str, Dict[str, Any]] = {}
+        self.restarts = 0
+
+        self._context = multiprocessing.get_context("fork")
+        self._results = self._context.Queue()
+        self._inboxes = []
+        # Jobs waiting for an idle worker, and the job each busy worker holds
+        self._pending = collections.deque()
+        self._running: Dict[int, int] = {}
+        self._cpus = _split_cpus(num_workers)
+        self._processes = []
+        self._ready = set()
+        self._closing = False
+        self._futures: Dict[int, Future] = {}
+        # Latest cache/merchant index counters reported by each worker
+        self._counters: Dict[int, Dict[str, Dict[str, int]]] = {}
+        self._job_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector = None
+
+    def start(self):
+        """Load models in this process, then fork the workers."""
+        print(f"Loading models before forking {self.num_workers} workers...")
+        self.parser.load_models(onnx_sessions=False)
+
+        self._inboxes = [None] * self.num_workers
+        self._processes = [self._spawn(index) for index in range(self.num_workers)]
+
+        self._collector = threading.Thread(target=self._collect_results, daemon=True)
+        self._collector.start()
+
+    def _spawn(self, index: int):
+        """Fork the worker for one slot, with a fresh inbox."""
+        # A worker killed mid-read can leave its old inbox unusable
+        self._inboxes[index] = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self._cpus[index], self.parser, self.warmup, self._inboxes[index], self._results),
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def _check_workers(self):
+        """Fail the job of every dead worker and fork a replacement (collector thread)."""
+        for index, process in enumerate(self._processes):
+            if process.is_alive() or self._closing:
+                continue
+            print(f"Worker {index} (pid {process.pid}) died with exit code {process.exitcode}, restarting")
+            self._counters.pop(index, None)
+            with self._lock:
+                self._ready.discard(index)
+                job_id = self._running.pop(index, None)
+                future = self._futures.pop(job_id, None) if job_id is not None else None
+            if future is not None:
+                _resolve(future, False, f"Worker {index} died (exit code {process.exitcode}) while running this job")
+            self.restarts += 1
+            self._processes[index] = self._spawn(index)
+
+    def _collect_results(self):
+        """Resolve futures as workers report results, and replace dead workers (runs in a thread)."""
+        while True:
+            try:
+                message = self._results.get(timeout=HEALTH_CHECK_INTERVAL)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            if message is None:
+                break
+            index, job_id, ok, payload, events, counters = message
+            METRICS.merge(events)
+            self._counters[index] = counters
+
+            if job_id == _READY:
+                with self._lock:
+                    self._ready.add(index)
+                    self.model_status = payload
+                    self._dispatch()
+                continue
+
+            with self._lock:
+                if self._running.get(index) == job_id:
+                    del self._running[index]
+                future = self._futures.pop(job_id, None)
+                self._dispatch()
+            if future is not None:
+                _resolve(future, ok, payload)
+            self._check_workers()
+
+    def _dispatch(self):
+        """Hand pending jobs to idle ready workers (lock held)."""
+        for index in sorted(self._ready):
+            if not self._pending:
+                break
+            if index in self._running:
+                continue
+            job = self._pending.popleft()
+            # Recorded before sending so a worker that dies holding it fails the job
+            self._running[index] = job[0]
+            self._inboxes[index].put(job)
+
+    def submit(self, method: str, *args) -> Future:
+        """Queue a parser call (e.g. "parse_image", path) and return its future."""
+        job_id = next(self._job_ids)
+        future = Future()
+        with self._lock:
+            self._futures[job_id] = future
+            self._pending.append((job_id, method, args))
+            self._dispatch()
+        return future
+
+    def worker_counters(self, component: str) -> List[Dict[str, int]]:
+        """Latest counters() of one component ("cache" or "merchant_index") from every live worker."""
+        return [counters[component] for counters in list(self._counters.values()) if component in counters]
+
+    def is_ready(self) -> bool:
+        """Return True once every worker is alive and warmed up."""
+        return (
+            len(self._ready) == self.num_workers
+            and all(process.is_alive() for process in self._processes)
+        )
+
+    def shutdown(self):
+        """Stop all workers and the result collector."""
+        self._closing = True
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
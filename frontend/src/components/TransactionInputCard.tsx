@@ -14,10 +14,17 @@ import { format } from "date-fns";
 import { cn } from "@/lib/utils";
 import db from "@/services/database";
 import { toast } from "sonner";
+import { TokenManager } from "@/services/api";
 
 // API endpoint for transaction parser (update this to match your server)
 const PARSER_API_URL = "http://localhost:8000/api";
 
+// The parser takes the user (for their merchant history) from the login token
+const parserAuthHeaders = (): Record<string, string> => {
+  const token = TokenManager.getToken();
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
+
 interface TransactionInputCardProps {
   onSuccess?: () => void;
 }
@@ -124,6 +131,7 @@ const TransactionInputCard = ({ onSuccess }: TransactionInputCardProps) => {
 
       const response = await fetch(`${PARSER_API_URL}/parse-image`, {
         method: "POST",
+        headers: parserAuthHeaders(),
         body: uploadFormData,
       });
 
@@ -219,6 +227,7 @@ const TransactionInputCard = ({ onSuccess }: TransactionInputCardProps) => {
 
       const response = await fetch(`${PARSER_API_URL}/parse-voice`, {
         method: "POST",
+        headers: parserAuthHeaders(),
         body: uploadFormData,
       });
 